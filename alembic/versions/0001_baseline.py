@@ -0,0 +1,146 @@
+"""基线：init_db 自动建表时的表结构
+
+已通过 init_db 自动建表的数据库，表已存在时跳过，可直接执行 alembic upgrade head。
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(name: str) -> bool:
+    # 离线模式（--sql）无法检查数据库，按空库生成完整建表语句
+    if op.get_context().as_sql:
+        return False
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade() -> None:
+    if not _has_table('job_logs'):
+        op.create_table(
+            'job_logs',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('job_id', sa.String(128), nullable=False),
+            sa.Column('status', sa.Boolean(), nullable=False),
+            sa.Column('message', sa.Text(), nullable=False),
+            sa.Column('duration', sa.Float(), nullable=True),
+            sa.Column('output', sa.Text(), nullable=True),
+            sa.Column('timestamp', sa.DateTime(), nullable=False),
+        )
+
+    if not _has_table('system_config'):
+        op.create_table(
+            'system_config',
+            sa.Column('key', sa.String(128), primary_key=True),
+            sa.Column('value', sa.Text(), nullable=False),
+            sa.Column('description', sa.String(255), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+        )
+
+    if not _has_table('ai_sessions'):
+        op.create_table(
+            'ai_sessions',
+            sa.Column('id', sa.String(64), primary_key=True),
+            sa.Column('title', sa.String(255), nullable=True),
+            sa.Column('provider', sa.String(64), nullable=False),
+            sa.Column('model', sa.String(128), nullable=False),
+            sa.Column('mode', sa.String(32), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+        )
+
+    if not _has_table('ai_messages'):
+        op.create_table(
+            'ai_messages',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('session_id', sa.String(64), nullable=False),
+            sa.Column('role', sa.String(32), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+        )
+        op.create_index('ix_ai_messages_session_id', 'ai_messages', ['session_id'])
+
+    if not _has_table('ai_tool_calls'):
+        op.create_table(
+            'ai_tool_calls',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('session_id', sa.String(64), nullable=False),
+            sa.Column('message_id', sa.Integer(), nullable=True),
+            sa.Column('tool_name', sa.String(128), nullable=False),
+            sa.Column('tool_args', sa.Text(), nullable=True),
+            sa.Column('tool_result', sa.Text(), nullable=True),
+            sa.Column('status', sa.String(32), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+        )
+        op.create_index('ix_ai_tool_calls_session_id', 'ai_tool_calls', ['session_id'])
+
+    if not _has_table('custom_tasks'):
+        op.create_table(
+            'custom_tasks',
+            sa.Column('name', sa.String(128), primary_key=True),
+            sa.Column('category', sa.String(64), nullable=False),
+            sa.Column('description', sa.String(255), nullable=True),
+            sa.Column('code', sa.Text(), nullable=False),
+            sa.Column('enabled', sa.Boolean(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+        )
+
+    if not _has_table('alert_channels'):
+        op.create_table(
+            'alert_channels',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('name', sa.String(64), nullable=False, unique=True),
+            sa.Column('type', sa.String(32), nullable=False),
+            sa.Column('config', sa.Text(), nullable=False),
+            sa.Column('enabled', sa.Boolean(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+        )
+
+    if not _has_table('alert_configs'):
+        op.create_table(
+            'alert_configs',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('job_id', sa.String(128), nullable=True),
+            sa.Column('rule_type', sa.String(32), nullable=False),
+            sa.Column('threshold', sa.Integer(), nullable=True),
+            sa.Column('channels', sa.Text(), nullable=False),
+            sa.Column('cooldown_minutes', sa.Integer(), nullable=False),
+            sa.Column('enabled', sa.Boolean(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+        )
+
+    if not _has_table('alert_history'):
+        op.create_table(
+            'alert_history',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('job_id', sa.String(128), nullable=False),
+            sa.Column('rule_type', sa.String(32), nullable=False),
+            sa.Column('channel_type', sa.String(32), nullable=False),
+            sa.Column('channel_id', sa.Integer(), nullable=True),
+            sa.Column('status', sa.Boolean(), nullable=False),
+            sa.Column('message', sa.Text(), nullable=False),
+            sa.Column('sent_at', sa.DateTime(), nullable=False),
+            sa.Column('error', sa.Text(), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    for table in ('alert_history', 'alert_configs', 'alert_channels', 'custom_tasks', 'ai_tool_calls',
+                  'ai_messages', 'ai_sessions', 'system_config', 'job_logs'):
+        if _has_table(table):
+            op.drop_table(table)
@@ -0,0 +1,42 @@
+"""job_logs / alert_history 查询索引
+
+日志列表按时间倒序分页、按任务 / 状态筛选，日志清理按时间删除，统计读取最早 / 最新日志，
+原先只有主键，都需要全表扫描。PostgreSQL 上使用 CREATE INDEX CONCURRENTLY，建索引期间不阻塞日志写入。
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_job_logs_timestamp_id', 'job_logs', ['timestamp', 'id']),
+    ('ix_job_logs_job_id_timestamp', 'job_logs', ['job_id', 'timestamp']),
+    ('ix_job_logs_status_timestamp', 'job_logs', ['status', 'timestamp']),
+    ('ix_alert_history_sent_at_id', 'alert_history', ['sent_at', 'id']),
+    ('ix_alert_history_job_id_sent_at', 'alert_history', ['job_id', 'sent_at']),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY 不能在事务中执行
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
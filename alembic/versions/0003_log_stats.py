@@ -0,0 +1,61 @@
+"""log_stats 日志汇总统计表
+
+/log-stats/ 原先每次请求对 job_logs 执行多次全表计数，改为读取日志写入 / 清理时增量维护的汇总行。
+升级时按现有日志一次性计算初始值（扫描一次 job_logs）。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(name: str) -> bool:
+    if op.get_context().as_sql:
+        return False
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade() -> None:
+    if _has_table('log_stats'):
+        return
+    op.create_table(
+        'log_stats',
+        sa.Column('job_id', sa.String(128), primary_key=True),
+        sa.Column('total_count', sa.Integer(), nullable=False),
+        sa.Column('success_count', sa.Integer(), nullable=False),
+        sa.Column('fail_count', sa.Integer(), nullable=False),
+        sa.Column('oldest_timestamp', sa.DateTime(), nullable=True),
+        sa.Column('newest_timestamp', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+    )
+    # job_id 为 '*' 的行是全部日志的汇总，与 app.models.sql_model.LOG_STATS_ALL 一致
+    op.execute("""
+        INSERT INTO log_stats (job_id, total_count, success_count, fail_count,
+                               oldest_timestamp, newest_timestamp, updated_at)
+        SELECT job_id, COUNT(*), SUM(CASE WHEN status THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status THEN 0 ELSE 1 END), MIN(timestamp), MAX(timestamp), CURRENT_TIMESTAMP
+        FROM job_logs GROUP BY job_id
+    """)
+    op.execute("""
+        INSERT INTO log_stats (job_id, total_count, success_count, fail_count,
+                               oldest_timestamp, newest_timestamp, updated_at)
+        SELECT '*', COUNT(*), COALESCE(SUM(CASE WHEN status THEN 1 ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN status THEN 0 ELSE 1 END), 0), MIN(timestamp), MAX(timestamp), CURRENT_TIMESTAMP
+        FROM job_logs
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('log_stats')
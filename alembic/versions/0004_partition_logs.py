@@ -0,0 +1,203 @@
+"""job_logs / alert_history 按时间分区
+
+配置了 LOG_PARTITIONING（daily / monthly）且数据库为 PostgreSQL 时，把 job_logs、alert_history 转换为
+RANGE 分区表：原表改名为 <表名>_legacy 作为覆盖过去全部时间的第一个分区，并预建当前及未来的分区。
+未配置分区或使用 SQLite 时本迁移不做任何修改。
+
+表结构固定为本版本时的列和索引（不引用应用模型），分区命名与 app.core.partitioning 一致，
+之后的分区由应用的分区维护任务预建。挂载原表时会扫描整张表校验时间范围，数据量大时请在维护窗口执行。
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 00:00:00
+
+"""
+from datetime import datetime, timedelta
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.core.conf import LOG_PARTITION_PREMAKE, LOG_PARTITIONING
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 表名 -> (分区列, id 之外的列, 索引)；与 0001 / 0002 建立的结构一致
+TABLES = {
+    'job_logs': ('timestamp', lambda: [
+        sa.Column('job_id', sa.String(128), nullable=False),
+        sa.Column('status', sa.Boolean(), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('duration', sa.Float(), nullable=True),
+        sa.Column('output', sa.Text(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+    ], [
+        ('ix_job_logs_timestamp_id', ['timestamp', 'id']),
+        ('ix_job_logs_job_id_timestamp', ['job_id', 'timestamp']),
+        ('ix_job_logs_status_timestamp', ['status', 'timestamp']),
+    ]),
+    'alert_history': ('sent_at', lambda: [
+        sa.Column('job_id', sa.String(128), nullable=False),
+        sa.Column('rule_type', sa.String(32), nullable=False),
+        sa.Column('channel_type', sa.String(32), nullable=False),
+        sa.Column('channel_id', sa.Integer(), nullable=True),
+        sa.Column('status', sa.Boolean(), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+    ], [
+        ('ix_alert_history_sent_at_id', ['sent_at', 'id']),
+        ('ix_alert_history_job_id_sent_at', ['job_id', 'sent_at']),
+    ]),
+}
+
+
+def _enabled() -> bool:
+    context = op.get_context()
+    if not LOG_PARTITIONING or context.dialect.name != 'postgresql' or context.as_sql:
+        return False
+    if LOG_PARTITIONING not in ('daily', 'monthly'):
+        raise ValueError(f"不支持的分区方式 '{LOG_PARTITIONING}'，可选: daily, monthly")
+    return True
+
+
+def _table(name: str, table_name: str, partitioned: bool, sequence: Optional[str] = None) -> sa.Table:
+    """本版本的表结构；partitioned 时主键为 (id, 分区列)；sequence 不为空时 id 使用已有序列"""
+    time_column, columns, _ = TABLES[table_name]
+    if sequence:
+        id_column = sa.Column('id', sa.Integer(), nullable=False, autoincrement=False,
+                              server_default=sa.text(f"nextval('{sequence}'::regclass)"))
+    else:
+        id_column = sa.Column('id', sa.Integer(), nullable=False, autoincrement=True)
+    primary_key = ['id', time_column] if partitioned else ['id']
+    kwargs = {'postgresql_partition_by': f'RANGE ("{time_column}")'} if partitioned else {}
+    return sa.Table(name, sa.MetaData(), id_column, *columns(),
+                    sa.PrimaryKeyConstraint(*primary_key, name=f'{name}_pkey'), **kwargs)
+
+
+def _create_table(table: sa.Table):
+    op.execute(str(CreateTable(table).compile(dialect=postgresql.dialect())))
+
+
+def _create_indexes(table_name: str):
+    table = _table(table_name, table_name, partitioned=False)
+    for index_name, columns in TABLES[table_name][2]:
+        index = sa.Index(index_name, *(table.c[c] for c in columns))
+        op.execute(str(CreateIndex(index).compile(dialect=postgresql.dialect())))
+
+
+def _period_start(value: datetime) -> datetime:
+    if LOG_PARTITIONING == 'daily':
+        return datetime(value.year, value.month, value.day)
+    return datetime(value.year, value.month, 1)
+
+
+def _next_period(start: datetime) -> datetime:
+    if LOG_PARTITIONING == 'daily':
+        return start + timedelta(days=1)
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def _literal(value: datetime) -> str:
+    return f"'{value:%Y-%m-%d %H:%M:%S}'"
+
+
+def _create_partitions(table_name: str, after: Optional[datetime] = None):
+    """创建当前周期及之后 LOG_PARTITION_PREMAKE 个周期的分区，早于 after 的周期已由 legacy 分区覆盖"""
+    start = _period_start(datetime.utcnow())
+    for _ in range(max(0, LOG_PARTITION_PREMAKE) + 1):
+        end = _next_period(start)
+        if after is None or start >= after:
+            suffix = f'{start:%Y%m%d}' if LOG_PARTITIONING == 'daily' else f'{start:%Y%m}'
+            op.execute(f'CREATE TABLE IF NOT EXISTS "{table_name}_p{suffix}" PARTITION OF "{table_name}" '
+                       f'FOR VALUES FROM ({_literal(start)}) TO ({_literal(end)})')
+        start = end
+
+
+def _relkind(bind, name: str) -> Optional[str]:
+    return bind.execute(sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+                        {"name": name}).scalar()
+
+
+def _sequence(bind, name: str) -> Optional[str]:
+    return bind.execute(sa.text("SELECT pg_get_serial_sequence(:name, 'id')"), {"name": name}).scalar()
+
+
+def _convert(bind, table_name: str):
+    time_column = TABLES[table_name][0]
+    legacy = f'{table_name}_legacy'
+    sequence = _sequence(bind, table_name)
+    newest = bind.execute(sa.text(f'SELECT MAX("{time_column}") FROM "{table_name}"')).scalar()
+    boundary = _next_period(_period_start(newest)) if newest else _period_start(datetime.utcnow())
+
+    op.execute(f'ALTER TABLE "{table_name}" RENAME TO "{legacy}"')
+    # 原主键 (id) 与父表主键 (id, 分区列) 冲突，挂载时按父表主键重新建立
+    pkey = bind.execute(sa.text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:name) AND contype = 'p'"
+    ), {"name": legacy}).scalar()
+    if pkey:
+        op.execute(f'ALTER TABLE "{legacy}" DROP CONSTRAINT "{pkey}"')
+    index_names = bind.execute(sa.text(
+        "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :name"
+    ), {"name": legacy}).scalars().all()
+    for index_name in index_names:
+        # 父表随后使用原来的索引名
+        renamed = index_name.replace(table_name, legacy, 1) if table_name in index_name else f'{legacy}_{index_name}'
+        op.execute(f'ALTER INDEX "{index_name}" RENAME TO "{renamed}"')
+
+    _create_table(_table(table_name, table_name, partitioned=True, sequence=sequence))
+    _create_indexes(table_name)
+    if sequence:
+        # 序列改为属于父表，删除 legacy 分区时不会连带删除序列
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{table_name}".id')
+    op.execute(f'ALTER TABLE "{table_name}" ATTACH PARTITION "{legacy}" '
+               f'FOR VALUES FROM (MINVALUE) TO ({_literal(boundary)})')
+    _create_partitions(table_name, after=boundary)
+
+
+def _unconvert(bind, table_name: str):
+    plain = f'{table_name}_plain'
+    sequence = _sequence(bind, table_name)
+    table = _table(plain, table_name, partitioned=False, sequence=sequence)
+    _create_table(table)
+    columns = ', '.join(f'"{c.name}"' for c in table.columns)
+    op.execute(f'INSERT INTO "{plain}" ({columns}) SELECT {columns} FROM "{table_name}"')
+    if sequence:
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY NONE')
+    op.execute(f'DROP TABLE "{table_name}" CASCADE')
+    op.execute(f'ALTER TABLE "{plain}" RENAME TO "{table_name}"')
+    op.execute(f'ALTER INDEX "{plain}_pkey" RENAME TO "{table_name}_pkey"')
+    if sequence:
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{table_name}".id')
+    _create_indexes(table_name)
+
+
+def upgrade() -> None:
+    if not _enabled():
+        return
+    bind = op.get_bind()
+    for table_name in TABLES:
+        relkind = _relkind(bind, table_name)
+        if relkind is None:
+            _create_table(_table(table_name, table_name, partitioned=True))
+            _create_indexes(table_name)
+            _create_partitions(table_name)
+        elif relkind != 'p':
+            _convert(bind, table_name)
+
+
+def downgrade() -> None:
+    if not _enabled():
+        return
+    bind = op.get_bind()
+    for table_name in TABLES:
+        if _relkind(bind, table_name) == 'p':
+            _unconvert(bind, table_name)
@@ -0,0 +1,52 @@
+"""job_logs 任务输出压缩存储
+
+job_logs 新增 output_data（压缩后的完整输出）、output_encoding、output_size（原始字节数）、
+output_stored_size（存储字节数）、output_truncated；log_stats 新增 output_bytes / stored_bytes 汇总。
+升级前写入的日志保持原样（output 为完整输出），大小不计入汇总。
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = [
+    ('job_logs', sa.Column('output_data', sa.LargeBinary(), nullable=True)),
+    ('job_logs', sa.Column('output_encoding', sa.String(16), nullable=True)),
+    ('job_logs', sa.Column('output_size', sa.Integer(), nullable=True)),
+    ('job_logs', sa.Column('output_stored_size', sa.Integer(), nullable=True)),
+    ('job_logs', sa.Column('output_truncated', sa.Boolean(), nullable=False, server_default=sa.false())),
+    ('log_stats', sa.Column('output_bytes', sa.BigInteger(), nullable=False, server_default='0')),
+    ('log_stats', sa.Column('stored_bytes', sa.BigInteger(), nullable=False, server_default='0')),
+]
+
+
+def _has_column(table: str, column: str) -> bool:
+    if op.get_context().as_sql:
+        return False
+    return column in {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    # 带常量默认值的新列在 PostgreSQL 11+ 上只修改元数据，不重写表
+    for table, column in COLUMNS:
+        if not _has_column(table, column.name):
+            op.add_column(table, column)
+
+
+def downgrade() -> None:
+    for table, column in reversed(COLUMNS):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column(column.name)
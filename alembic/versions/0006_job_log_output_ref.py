@@ -0,0 +1,55 @@
+"""job_logs 外部输出文件引用
+
+job_logs 新增 output_ref（外部输出文件的 SHA-256），以及只包含非空引用的部分索引，用于清理未引用的文件。
+PostgreSQL 普通表上使用 CREATE INDEX CONCURRENTLY；分区表不支持 CONCURRENTLY，直接建索引。
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    if op.get_context().as_sql:
+        return False
+    return column in {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _is_partitioned(table: str) -> bool:
+    context = op.get_context()
+    if context.dialect.name != 'postgresql' or context.as_sql:
+        return False
+    relkind = op.get_bind().execute(sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+                                    {"name": table}).scalar()
+    return relkind == 'p'
+
+
+def upgrade() -> None:
+    if not _has_column('job_logs', 'output_ref'):
+        op.add_column('job_logs', sa.Column('output_ref', sa.String(64), nullable=True))
+    where = sa.text('output_ref IS NOT NULL')
+    if _is_partitioned('job_logs'):
+        op.create_index('ix_job_logs_output_ref', 'job_logs', ['output_ref'], if_not_exists=True,
+                        postgresql_where=where)
+        return
+    with op.get_context().autocommit_block():
+        op.create_index('ix_job_logs_output_ref', 'job_logs', ['output_ref'], if_not_exists=True,
+                        postgresql_where=where, sqlite_where=where, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_job_logs_output_ref', table_name='job_logs', if_exists=True)
+    with op.batch_alter_table('job_logs') as batch:
+        batch.drop_column('output_ref')
@@ -0,0 +1,49 @@
+"""job_logs 全文搜索索引
+
+SQLite：FTS5 外部内容表 job_logs_fts（trigram 分词）及同步触发器，并按现有日志建立索引；
+PostgreSQL：pg_trgm 扩展及 GIN 表达式索引 ix_job_logs_search（普通表上使用 CONCURRENTLY，不阻塞日志写入）。
+创建扩展需要数据库所有者或超级用户权限。
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.core.log_search import create_search_index, drop_search_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _is_partitioned(table: str) -> bool:
+    if op.get_context().dialect.name != 'postgresql':
+        return False
+    relkind = op.get_bind().execute(sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+                                    {"name": table}).scalar()
+    return relkind == 'p'
+
+
+def upgrade() -> None:
+    if op.get_context().as_sql:
+        return
+    if op.get_context().dialect.name == 'postgresql' and not _is_partitioned('job_logs'):
+        with op.get_context().autocommit_block():
+            create_search_index(Session(bind=op.get_bind()), concurrently=True)
+        return
+    create_search_index(Session(bind=op.get_bind()))
+
+
+def downgrade() -> None:
+    if op.get_context().as_sql:
+        return
+    drop_search_index(Session(bind=op.get_bind()))
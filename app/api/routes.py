@@ -1,11 +1,14 @@
+import inspect
 import json
 import traceback
 from datetime import datetime
 from functools import wraps
 from typing import Optional, Dict, Any, Callable
 
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.database import (
@@ -14,6 +17,8 @@ from app.core.database import (
     get_all_config,
     get_config,
     get_configs_by_prefix,
+    get_async_db,
+    get_async_read_db,
     get_db,
     list_ai_messages,
     list_ai_sessions,
@@ -21,7 +26,9 @@ from app.core.database import (
     set_config,
     update_config_batch,
     cleanup_old_logs,
+    log_cleanup,
     get_log_stats,
+    get_replica_stats,
     clear_all_logs,
     create_alert_channel,
     get_alert_channel,
@@ -35,6 +42,13 @@ from app.core.database import (
     update_alert_config,
     delete_alert_config,
     list_alert_history,
+    get_job_log,
+    get_archived_job_log,
+    list_job_logs,
+    list_archived_job_logs,
+    log_archive,
+    merge_archived_logs,
+    ARCHIVE_MAX_OFFSET,
 )
 from app.models.schemas import (
     AIChatRequest,
@@ -53,6 +67,7 @@ from app.models.schemas import (
     CustomTaskUpdate,
     DateTrigger,
     IntervalTrigger,
+    JobBulkRequest,
     JobCreate,
     JobLogPage,
     JobLogResponse,
@@ -67,9 +82,11 @@ from app.models.schemas import (
     AlertHistoryPage,
     AlertTestResponse,
 )
-from app.models.sql_model import JobLog, DEFAULT_CONFIG
+from app.core.conf import JOB_BULK_MAX_OPERATIONS, LOG_ARCHIVE_ENABLED
+from app.core.log_output import OUTPUT_ENCODING_FILE, RangeNotSatisfiable, output_reader, parse_range, unpack_output
+from app.models.sql_model import DEFAULT_CONFIG
 from app.services.scheduler import add_job, remove_job, update_job, get_all_jobs, get_job_by_id, pause_job, resume_job, \
-    scheduler
+    query_jobs, scheduler, bulk_apply_jobs, get_scheduler_status, get_executor_stats, get_run_latency
 from app.services.scheduler import update_auto_cleanup_schedule
 from app.services.ai.chat_service import chat_once, chat_stream
 from app.services.ai.function_registry import get_tool_schemas
@@ -88,6 +105,17 @@ router = APIRouter()
 
 
 def api_error_handler(func: Callable) -> Callable:
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                traceback.print_exc()
+                return ResponseModel(code=400, msg=str(e))
+
+        return async_wrapper
+
     @wraps(func)
     def wrapper(*args, **kwargs):
         try:
@@ -155,7 +183,8 @@ def get_available_task_endpoint(func_name: str) -> ResponseModel:
             category=task_info["category"],
             description=task_info["description"],
             parameters=task_info["parameters"],
-            is_custom=task_info.get("is_custom", False)
+            is_custom=task_info.get("is_custom", False),
+            executor=task_info.get("executor", "default")
         ),
         msg="获取任务详情成功"
     )
@@ -191,6 +220,7 @@ def create_job(job: JobCreate) -> ResponseModel:
         kwargs=job.kwargs,
         job_id=job.job_id,
         name=job.name,
+        executor=job.executor,
         **trigger_args
     )
     return ResponseModel(data={"job_id": actual_job_id, "name": job.name}, msg="计划任务已添加")
@@ -220,7 +250,8 @@ def modify_job(job: JobCreate) -> ResponseModel:
         trigger_args=trigger_args,
         args=job.args,
         kwargs=job.kwargs,
-        name=job.name
+        name=job.name,
+        executor=job.executor
     )
     return ResponseModel(data={"job_id": job_id, "name": job.name}, msg="任务已更新")
 
@@ -258,11 +289,101 @@ def delete_job(job_id: str) -> ResponseModel:
     return ResponseModel(data=job_id, msg="计划任务已移除")
 
 
+@router.post("/jobs/bulk/", summary="批量操作计划任务")
+@api_error_handler
+def bulk_jobs(request: JobBulkRequest) -> ResponseModel:
+    """
+    批量新增(add)/暂停(pause)/恢复(resume)/删除(remove)计划任务，
+    所有操作先校验再在一个事务中写入，返回每一项的执行结果
+    """
+    if not request.operations:
+        return ResponseModel(code=400, msg="操作列表不能为空")
+    if len(request.operations) > JOB_BULK_MAX_OPERATIONS:
+        return ResponseModel(code=400, msg=f"单次最多 {JOB_BULK_MAX_OPERATIONS} 个操作")
+
+    operations = []
+    for op in request.operations:
+        item = {"action": op.action, "job_id": op.get_job_id()}
+        if op.action == "add":
+            item.update(func=op.func, trigger=op.trigger, args=op.args, kwargs=op.kwargs, name=op.name,
+                        executor=op.executor)
+            try:
+                item["trigger_args"] = _validate_trigger(op)
+            except Exception as e:
+                item["error"] = f"触发器参数错误: {e}"
+        operations.append(item)
+
+    result = bulk_apply_jobs(operations, atomic=request.atomic)
+    if result["failed"]:
+        return ResponseModel(code=200 if result["applied"] else 400, data=result,
+                             msg=f"批量操作完成，{result['failed']} 项失败")
+    return ResponseModel(data=result, msg="批量操作成功")
+
+
+@router.get("/scheduler/status/", summary="调度器状态")
+@api_error_handler
+def scheduler_status() -> ResponseModel:
+    """当前节点是否运行调度循环；启用主备调度时返回主节点和租约信息"""
+    return ResponseModel(data=get_scheduler_status(), msg="获取调度器状态成功")
+
+
+@router.get("/executor/stats/", summary="任务执行器状态")
+@api_error_handler
+def executor_stats() -> ResponseModel:
+    """远程执行模式下返回任务队列长度、在途运行数和超时数"""
+    return ResponseModel(data=get_executor_stats(), msg="获取执行器状态成功")
+
+
+@router.get("/runs/latency/", summary="任务运行时延统计")
+@api_error_handler
+def run_latency(
+        job_id: Optional[str] = Query(None, description="任务ID，不填返回全局统计和各任务统计"),
+        recent: int = Query(20, ge=0, le=500, description="指定任务时返回的最近运行记录数"),
+        limit: int = Query(50, ge=1, le=500, description="不指定任务时按 p95 返回的任务数"),
+) -> ResponseModel:
+    """
+    schedule_lag_ms 为提交时间与计划时间之差（调度延迟），queue_wait_ms 为开始执行与提交之差（执行器排队），
+    run_ms 为执行耗时，total_ms 为结束时间与计划时间之差，均给出 p50/p95/p99
+    """
+    return ResponseModel(data=get_run_latency(job_id, recent, limit), msg="获取运行时延统计成功")
+
+
 @router.get("/jobs/", summary="计划任务列表")
 @api_error_handler
-def list_jobs() -> ResponseModel:
-    jobs = get_all_jobs()
-    return ResponseModel(data=jobs, msg="获取计划任务列表成功")
+def list_jobs(
+        func: Optional[str] = Query(None, description="按任务函数名筛选"),
+        status: Optional[str] = Query(None, description="按状态筛选：running/paused/error 或 工作中/已暂停/异常"),
+        keyword: Optional[str] = Query(None, description="按任务ID或名称模糊查找"),
+        sort: str = Query("next_run_time", description="排序字段：next_run_time 或 name"),
+        page: Optional[int] = Query(None, ge=1, description="页数，从1开始"),
+        limit: Optional[int] = Query(None, ge=1, le=500, description="每页返回的任务数量"),
+        cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+) -> ResponseModel:
+    """
+    不传分页参数（page/limit/cursor）时返回完整任务列表，兼容旧版前端；
+    传入任一分页参数时返回 {count, jobs, next_cursor, page, limit}
+    """
+    paginated = page is not None or limit is not None or cursor is not None
+    if not paginated and not (func or status or keyword) and sort == "next_run_time":
+        return ResponseModel(data=get_all_jobs(), msg="获取计划任务列表成功")
+
+    if paginated and limit is None:
+        limit = 20
+    result = query_jobs(
+        func=func,
+        status=status,
+        keyword=keyword,
+        sort=sort,
+        page=page or 1,
+        limit=limit,
+        cursor=cursor,
+    )
+    if not paginated:
+        return ResponseModel(data=result["jobs"], msg="获取计划任务列表成功")
+
+    result["page"] = page or 1
+    result["limit"] = limit
+    return ResponseModel(data=result, msg="获取计划任务列表成功")
 
 
 @router.get("/job/{job_id}", summary="获取单个任务详情")
@@ -277,35 +398,81 @@ def get_job_detail(job_id: str) -> ResponseModel:
 
 @router.get("/logs/", summary="任务日志")
 @api_error_handler
-def get_logs(
+async def get_logs(
         job_id: Optional[str] = Query(None, description="任务ID进行模糊查找"),
+        exact: bool = Query(False, description="任务ID精确匹配，日志量大时可利用索引"),
         status: Optional[bool] = Query(None, description="日志状态进行筛选，例如True或False"),
+        q: Optional[str] = Query(None, max_length=200, description="在任务ID、消息和输出中搜索，多个词以空格分隔"),
         start_time: Optional[datetime] = Query(None, description="起始时间YYYY-MM-DDTHH:MM:SS"),
         end_time: Optional[datetime] = Query(None, description="结束时间"),
-        page: int = Query(1, ge=1, description="页数，从1开始"),
-        limit: int = Query(10, le=100, description="每页返回的日志数量"),
-        db: Session = Depends(get_db)
+        page: int = Query(1, ge=1, description="页数，从1开始（传入 cursor 时忽略）"),
+        limit: int = Query(10, ge=1, le=100, description="每页返回的日志数量"),
+        cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+        count: str = Query("exact", description="总数计算方式：exact 精确（短时间缓存）/ estimate 估算 / none 不计算"),
+        include_archive: bool = Query(False, description="同时查询已归档的日志（LOG_ARCHIVE_ENABLED）"),
+        db: AsyncSession = Depends(get_async_read_db)
 ) -> ResponseModel:
-    query = db.query(JobLog)
+    filters = dict(job_id=job_id, exact=exact, status=status, q=q, start_time=start_time, end_time=end_time)
+    if include_archive:
+        offset = 0 if cursor else (page - 1) * limit
+        if offset > ARCHIVE_MAX_OFFSET:
+            raise ValueError(f"包含归档时页码分页最多跳过 {ARCHIVE_MAX_OFFSET} 条，请使用 cursor 翻页")
+        live = await db.run_sync(list_job_logs, **filters, page=1, limit=offset + limit, cursor=cursor, count=count)
+        # 归档段的读取和解压在线程池中执行，不阻塞事件循环
+        archived = await run_in_threadpool(list_archived_job_logs, **filters, limit=offset + limit + 1,
+                                           cursor=cursor, count=count)
+        result = merge_archived_logs(live, archived, limit, offset)
+    else:
+        result = await db.run_sync(list_job_logs, **filters, page=page, limit=limit, cursor=cursor, count=count)
+
+    logs = [JobLogResponse.model_validate(log) for log in result["logs"]]
+
+    log_page = JobLogPage(count=result["count"], logs=logs, next_cursor=result["next_cursor"])
+    return ResponseModel(data=log_page, msg="获取日志成功")
 
-    if job_id:
-        query = query.filter(JobLog.job_id.ilike(f"%{job_id}%"))
-    if status is not None:
-        query = query.filter(JobLog.status == status)
-    if start_time:
-        query = query.filter(JobLog.timestamp >= start_time)
-    if end_time:
-        query = query.filter(JobLog.timestamp <= end_time)
 
-    total_count = query.count()
+@router.get("/logs/{log_id}", summary="日志详情")
+@api_error_handler
+def get_log_detail(log_id: int, db: Session = Depends(get_db)) -> ResponseModel:
+    log = get_job_log(db, log_id) or get_archived_job_log(log_id)
+    if not log:
+        return ResponseModel(code=404, msg=f"日志 {log_id} 不存在")
+    detail = JobLogResponse.model_validate(log)
+    detail.output = unpack_output(log)
+    return ResponseModel(data=detail, msg="获取日志详情成功")
 
-    offset = (page - 1) * limit
-    db_logs = query.order_by(JobLog.timestamp.desc()).offset(offset).limit(limit).all()
 
-    logs = [JobLogResponse.model_validate(log) for log in db_logs]
+@router.get("/logs/{log_id}/output", summary="日志完整输出")
+@api_error_handler
+def get_log_output(
+        log_id: int,
+        range_header: Optional[str] = Header(None, alias="Range", description="单个字节区间，如 bytes=0-1023、bytes=-4096"),
+        db: Session = Depends(get_db)
+):
+    log = get_job_log(db, log_id) or get_archived_job_log(log_id)
+    if not log:
+        return ResponseModel(code=404, msg=f"日志 {log_id} 不存在")
+    try:
+        size, read = output_reader(log)
+    except FileNotFoundError as e:
+        # 外部文件已被清理或丢失
+        return ResponseModel(code=404, msg=str(e))
+    headers = {"Accept-Ranges": "bytes"}
+    if log.output_encoding == OUTPUT_ENCODING_FILE:
+        headers["ETag"] = f'"{log.output_ref}"'
 
-    log_page = JobLogPage(count=total_count, logs=logs)
-    return ResponseModel(data=log_page, msg="获取日志成功")
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        (start, end), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    body = read(start, end) if size else iter(())
+    return StreamingResponse(body, status_code=status_code, media_type="text/plain; charset=utf-8", headers=headers)
 
 
 @router.get("/task-categories/", summary="获取任务函数分类")
@@ -327,21 +494,63 @@ def get_task_details(task_name: str) -> ResponseModel:
 
 @router.get("/log-stats/", summary="日志统计")
 @api_error_handler
-def get_logs_statistics(db: Session = Depends(get_db)) -> ResponseModel:
-    stats = get_log_stats(db)
+async def get_logs_statistics(
+        job_id: Optional[str] = Query(None, description="任务ID，为空时统计全部日志"),
+        include_expired: bool = Query(False, description="是否统计过期日志数（需要扫描过期部分的日志）"),
+        db: AsyncSession = Depends(get_async_read_db)
+) -> ResponseModel:
+    stats = await db.run_sync(get_log_stats, job_id, include_expired)
     return ResponseModel(data=stats, msg="获取日志统计成功")
 
 
+@router.get("/db/replicas/stats/", summary="只读副本状态")
+@api_error_handler
+def get_db_replica_stats() -> ResponseModel:
+    """未配置 DB_REPLICA_URLS 时 data 为 null"""
+    return ResponseModel(data=get_replica_stats(), msg="获取只读副本状态成功")
+
+
+@router.get("/log-archive/stats/", summary="日志归档状态")
+@api_error_handler
+def get_log_archive_stats() -> ResponseModel:
+    """各表的归档段数、条数、压缩后大小和时间范围"""
+    return ResponseModel(data={"enabled": LOG_ARCHIVE_ENABLED, **log_archive.stats()}, msg="获取日志归档状态成功")
+
+
+@router.get("/log-writer/stats/", summary="日志写入队列状态")
+@api_error_handler
+def get_log_writer_stats() -> ResponseModel:
+    from app.services.log_writer import log_writer
+    return ResponseModel(data=log_writer.stats(), msg="获取日志写入状态成功")
+
+
 @router.post("/cleanup-logs/", summary="清理过期日志")
 @api_error_handler
 def cleanup_logs(
         retention_days: Optional[int] = Query(None, description="保留天数，默认使用配置值"),
         max_count: Optional[int] = Query(None, description="最大日志数，默认使用配置值"),
+        resume: bool = Query(False, description="继续上次被停止或失败的清理"),
         db: Session = Depends(get_db)
 ) -> ResponseModel:
-    result = cleanup_old_logs(db, retention_days, max_count)
-    return ResponseModel(data=result,
-                         msg=f"日志清理完成，共删除 {result['deleted_by_age'] + result['deleted_by_count']} 条")
+    result = cleanup_old_logs(db, retention_days, max_count, resume)
+    deleted = result['deleted_by_age'] + result['deleted_by_count']
+    if result["stopped"]:
+        return ResponseModel(data=result, msg=f"日志清理已停止，已删除 {deleted} 条")
+    return ResponseModel(data=result, msg=f"日志清理完成，共删除 {deleted} 条")
+
+
+@router.get("/cleanup-logs/progress/", summary="日志清理进度")
+@api_error_handler
+def get_cleanup_logs_progress() -> ResponseModel:
+    return ResponseModel(data=log_cleanup.progress(), msg="获取日志清理进度成功")
+
+
+@router.post("/cleanup-logs/stop/", summary="停止日志清理")
+@api_error_handler
+def stop_cleanup_logs() -> ResponseModel:
+    if not log_cleanup.stop():
+        raise ValueError("没有正在进行的日志清理")
+    return ResponseModel(data=log_cleanup.progress(), msg="已请求停止日志清理，当前批次完成后停止")
 
 
 @router.post("/clear-logs/", summary="清除所有日志")
@@ -353,18 +562,18 @@ def clear_logs(db: Session = Depends(get_db)) -> ResponseModel:
 
 @router.get("/config/", summary="获取所有配置")
 @api_error_handler
-def get_all_config_endpoint(db: Session = Depends(get_db)) -> ResponseModel:
-    configs = get_all_config(db)
+async def get_all_config_endpoint(db: AsyncSession = Depends(get_async_db)) -> ResponseModel:
+    configs = await db.run_sync(get_all_config)
     return ResponseModel(data=configs, msg="获取配置成功")
 
 
 @router.get("/config/{key}", summary="获取单个配置")
 @api_error_handler
-def get_config_endpoint(key: str, db: Session = Depends(get_db)) -> ResponseModel:
+async def get_config_endpoint(key: str, db: AsyncSession = Depends(get_async_db)) -> ResponseModel:
     if key not in DEFAULT_CONFIG:
         return ResponseModel(code=404, msg=f"配置项 '{key}' 不存在")
 
-    value = get_config(db, key)
+    value = await db.run_sync(get_config, key)
     return ResponseModel(data={"key": key, "value": value}, msg="获取配置成功")
 
 
@@ -1082,28 +1291,41 @@ def delete_alert_rule_endpoint(config_id: int, db: Session = Depends(get_db)) ->
 
 @router.get("/alerts/history/", summary="获取告警历史")
 @api_error_handler
-def list_alert_history_endpoint(
+async def list_alert_history_endpoint(
     job_id: Optional[str] = Query(None, description="任务ID模糊搜索"),
+    exact: bool = Query(False, description="任务ID精确匹配"),
     status: Optional[bool] = Query(None, description="发送状态"),
     channel_type: Optional[str] = Query(None, description="渠道类型"),
     start_time: Optional[datetime] = Query(None, description="开始时间"),
     end_time: Optional[datetime] = Query(None, description="结束时间"),
-    page: int = Query(1, ge=1, description="页码"),
-    limit: int = Query(20, le=100, description="每页数量"),
-    db: Session = Depends(get_db)
+    page: int = Query(1, ge=1, description="页码（传入 cursor 时忽略）"),
+    limit: int = Query(20, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    count: str = Query("exact", description="总数计算方式：exact / estimate / none"),
+    db: AsyncSession = Depends(get_async_read_db)
 ) -> ResponseModel:
-    result = list_alert_history(
-        db,
+    result = await db.run_sync(
+        list_alert_history,
         job_id=job_id,
+        exact=exact,
         status=status,
         channel_type=channel_type,
         start_time=start_time,
         end_time=end_time,
         page=page,
-        limit=limit
+        limit=limit,
+        cursor=cursor,
+        count=count,
     )
     
     logs = [AlertHistoryResponse.model_validate(log) for log in result["logs"]]
-    history_page = AlertHistoryPage(count=result["count"], logs=logs)
+    history_page = AlertHistoryPage(count=result["count"], logs=logs, next_cursor=result["next_cursor"])
     
     return ResponseModel(data=history_page, msg="获取告警历史成功")
+
+
+@router.get("/alerts/dispatcher/stats/", summary="告警分发队列状态")
+@api_error_handler
+def get_alert_dispatcher_stats() -> ResponseModel:
+    from app.services.alert import alert_dispatcher
+    return ResponseModel(data=alert_dispatcher.stats(), msg="获取告警分发状态成功")
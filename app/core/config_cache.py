@@ -0,0 +1,155 @@
+"""
+系统配置缓存
+
+system_config 表的全部行一次性加载到内存，读配置只做字典查找。
+本进程内 set_config / update_config_batch 写入后立即失效；其他进程（多 worker / 多副本）
+的修改通过可选的失效钩子（如 Redis 发布订阅）通知，未配置钩子时依靠 TTL 过期兜底。
+"""
+
+import logging
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ConfigCache:
+    def __init__(self, loader: Callable[..., Dict[str, str]], ttl: float = 30.0):
+        self._loader = loader
+        self.ttl = ttl
+        self._values: Optional[Dict[str, str]] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._load_lock = threading.Lock()
+        self._hooks: List[Callable[[], None]] = []
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "loads": 0, "invalidations": 0, "remote_invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get_all(self, db=None) -> Dict[str, str]:
+        """返回 key -> value 快照，过期或失效后重新加载；db 为调用方已有的会话，可复用"""
+        values = self._values
+        if values is not None and time.monotonic() < self._expires_at:
+            self._incr("hits")
+            return values
+
+        with self._load_lock:
+            # 等锁期间其他线程可能已完成加载
+            values = self._values
+            if values is not None and time.monotonic() < self._expires_at:
+                self._incr("hits")
+                return values
+
+            generation = self._generation
+            values = self._loader(db)
+            self._incr("loads")
+            # 加载期间发生失效时不保存快照，下次读取重新加载
+            if generation == self._generation:
+                self._values = values
+                self._expires_at = time.monotonic() + self.ttl
+            return values
+
+    def peek(self) -> Optional[Dict[str, str]]:
+        """未过期时返回快照，否则返回 None，不触发加载（供事件循环中调用）"""
+        values = self._values
+        if values is not None and time.monotonic() < self._expires_at:
+            self._incr("hits")
+            return values
+        return None
+
+    def get(self, key: str, db=None) -> Optional[str]:
+        return self.get_all(db).get(key)
+
+    def invalidate(self, broadcast: bool = True):
+        """丢弃缓存；broadcast 为 True 时调用失效钩子通知其他进程"""
+        self._generation += 1
+        self._values = None
+        self._expires_at = 0.0
+        self._incr("invalidations" if broadcast else "remote_invalidations")
+        if not broadcast:
+            return
+        for hook in list(self._hooks):
+            try:
+                hook()
+            except Exception as e:
+                logger.warning(f"配置缓存失效通知失败: {e}")
+
+    def add_invalidation_hook(self, hook: Callable[[], None]):
+        self._hooks.append(hook)
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["ttl"] = self.ttl
+        stats["cached_keys"] = len(self._values) if self._values is not None else 0
+        return stats
+
+    def _incr(self, key: str):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+
+class RedisConfigInvalidator:
+    """通过 Redis 发布订阅在进程间传播配置失效"""
+
+    def __init__(self, cache: ConfigCache, client_factory: Callable[[], object], channel: str):
+        self._cache = cache
+        self._client_factory = client_factory
+        self.channel = channel
+        self._node_id = uuid.uuid4().hex
+        self._client = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._client = self._client_factory()
+        self._cache.add_invalidation_hook(self._publish)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._listen, name="config-cache-invalidator", daemon=True)
+        self._thread.start()
+        logger.info(f"配置缓存跨进程失效已启用: 频道 {self.channel}")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _publish(self):
+        self._client.publish(self.channel, self._node_id)
+
+    def _listen(self):
+        while not self._stop_event.is_set():
+            pubsub = None
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # 订阅期间可能错过的消息无法补发，重新订阅后主动失效一次
+                self._cache.invalidate(broadcast=False)
+                while not self._stop_event.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    sender = message.get("data")
+                    if isinstance(sender, bytes):
+                        sender = sender.decode()
+                    # 本进程发出的通知在写入时已经失效过
+                    if sender != self._node_id:
+                        self._cache.invalidate(broadcast=False)
+            except Exception as e:
+                logger.warning(f"配置缓存失效订阅中断: {e}")
+                self._stop_event.wait(1)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
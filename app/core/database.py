@@ -1,11 +1,58 @@
 import json
 import logging
 import redis
+import zlib
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine, event, inspect, func, delete
-from sqlalchemy.orm import sessionmaker, scoped_session, Session
-
-from app.core.conf import DATABASE_URL, DB_TYPE, REDIS_HOST, REDIS_PORT, REDIS_PASSWORD, REDIS_DB
+from sqlalchemy import create_engine, event, inspect, func, delete, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker, scoped_session, Session, undefer
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from app.core.conf import (
+    CONFIG_CACHE_REDIS_CHANNEL,
+    ASYNC_DATABASE_URL,
+    CONFIG_CACHE_TTL,
+    DATABASE_URL,
+    DB_ASYNC,
+    DB_ASYNC_MAX_OVERFLOW,
+    DB_ASYNC_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_REPLICA_RETRY_SECONDS,
+    DB_REPLICA_URLS,
+    DB_TYPE,
+    LOG_ARCHIVE_DIR,
+    LOG_ARCHIVE_ENABLED,
+    LOG_ARCHIVE_SEGMENT_ROWS,
+    LOG_CLEANUP_BATCH_SIZE,
+    LOG_CLEANUP_PAUSE,
+    LOG_COUNT_CACHE_TTL,
+    LOG_PARTITION_PREMAKE,
+    LOG_PARTITION_RETENTION,
+    LOG_OUTPUT_SPILL_GRACE,
+    LOG_PARTITIONING,
+    REDIS_DB,
+    REDIS_HOST,
+    REDIS_PASSWORD,
+    REDIS_PORT,
+    REDIS_SOCKET_TIMEOUT,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_CACHE_SIZE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_TUNED,
+)
+from app.core.config_cache import ConfigCache, RedisConfigInvalidator
+from app.core.log_archive import TIME_COLUMNS, LogArchive, job_log_record
+from app.core.log_cleanup import LogCleanup
+from app.core.log_output import output_store
+from app.core.log_search import drop_search_index, ensure_search_index, search_condition, split_terms
+from app.core.log_stats import aggregate_logs, clear_log_stats, ensure_log_stats, forget_logs, read_log_stats
+from app.core.partitioning import TimePartitioning
+from app.core.replicas import READ_PRIMARY_HEADER, ReplicaSet, routing_session_class, use_primary
+from app.core.pagination import CountCache, decode_cursor, encode_cursor, keyset_page, page_count
 from app.models.sql_model import (
     AIMessage,
     AISession,
@@ -22,23 +69,116 @@ from app.models.sql_model import (
 
 logger = logging.getLogger(__name__)
 
-if DB_TYPE == "sqlite":
+
+def sqlite_pragmas(tuned: bool = SQLITE_TUNED) -> list:
+    """
+    SQLite 每个连接执行的 PRAGMA
+
+    WAL 模式下读不阻塞写、写不阻塞读，synchronous=NORMAL 在 WAL 下只在检查点时 fsync；
+    busy_timeout 让写入在锁被占用时等待重试，而不是立即返回 database is locked
+    """
+    pragmas = ["PRAGMA foreign_keys=ON"]
+    if tuned:
+        pragmas += [
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}",
+            f"PRAGMA cache_size={SQLITE_CACHE_SIZE}",
+            f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+            "PRAGMA temp_store=MEMORY",
+        ]
+    return pragmas
+
+
+def create_sqlite_engine(url: str, tuned: bool = SQLITE_TUNED, pool_size: int = DB_POOL_SIZE,
+                         max_overflow: int = DB_MAX_OVERFLOW):
     engine = create_engine(
-        DATABASE_URL,
+        url,
         connect_args={"check_same_thread": False},
         pool_pre_ping=True,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
     )
+    _set_sqlite_pragmas(engine, tuned)
+    return engine
+
+
+def _set_sqlite_pragmas(engine, tuned: bool):
+    pragmas = sqlite_pragmas(tuned)
+
     @event.listens_for(engine, "connect")
     def set_sqlite_pragma(dbapi_conn, connection_record):
         cursor = dbapi_conn.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
+        for pragma in pragmas:
+            cursor.execute(pragma)
         cursor.close()
-else:
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+
+
+def create_db_engine(url: str):
+    """同步引擎，SQLite 使用 create_sqlite_engine 的连接参数"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return create_sqlite_engine(url)
+    return create_engine(url, pool_pre_ping=True, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+
+
+def async_database_url(url: str) -> str:
+    """同步驱动地址对应的异步驱动地址（aiosqlite / asyncpg）"""
+    parsed = make_url(url)
+    drivers = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+    backend = parsed.get_backend_name()
+    if backend not in drivers:
+        raise ValueError(f"不支持的数据库类型 '{backend}'")
+    return parsed.set(drivername=drivers[backend]).render_as_string(hide_password=False)
+
+
+def create_async_db_engine(url: str = ASYNC_DATABASE_URL, pool_size: int = DB_ASYNC_POOL_SIZE,
+                           max_overflow: int = DB_ASYNC_MAX_OVERFLOW):
+    """异步引擎（aiosqlite / asyncpg），SQLite 连接使用与同步引擎相同的 PRAGMA"""
+    async_engine = create_async_engine(url, pool_pre_ping=True, pool_size=pool_size, max_overflow=max_overflow)
+    if async_engine.dialect.name == "sqlite":
+        _set_sqlite_pragmas(async_engine.sync_engine, SQLITE_TUNED)
+    return async_engine
+
+
+# 应用与 APScheduler 任务存储共用同一个引擎和连接池
+engine = create_db_engine(DATABASE_URL)
 
 _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 SessionLocal = scoped_session(_session_factory)
 
+# 只读接口使用的异步引擎，DB_ASYNC=false 时为 None，get_async_db 退回线程池中的同步会话
+async_engine = create_async_db_engine() if DB_ASYNC else None
+_async_session_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False) \
+    if async_engine is not None else None
+
+# 只读副本（见 app.core.replicas）：只读会话的 SELECT 发往副本，未配置 DB_REPLICA_URLS 时与普通会话相同
+replica_set = async_replica_set = None
+_async_replica_engines = []
+_read_session_factory, _async_read_session_factory = _session_factory, _async_session_factory
+if DB_REPLICA_URLS:
+    replica_set = ReplicaSet([create_db_engine(url) for url in DB_REPLICA_URLS], DB_REPLICA_RETRY_SECONDS)
+    _read_session_factory = sessionmaker(class_=routing_session_class(engine, replica_set), autoflush=False)
+    if async_engine is not None:
+        _async_replica_engines = [create_async_db_engine(async_database_url(url)) for url in DB_REPLICA_URLS]
+        async_replica_set = ReplicaSet([replica.sync_engine for replica in _async_replica_engines],
+                                       DB_REPLICA_RETRY_SECONDS)
+        _async_read_session_factory = async_sessionmaker(
+            async_engine, sync_session_class=routing_session_class(async_engine.sync_engine, async_replica_set),
+            autoflush=False, expire_on_commit=False)
+
+_count_cache = CountCache(ttl=LOG_COUNT_CACHE_TTL)
+log_archive = LogArchive(LOG_ARCHIVE_DIR, LOG_ARCHIVE_SEGMENT_ROWS)
+log_cleanup = LogCleanup(batch_size=LOG_CLEANUP_BATCH_SIZE, pause=LOG_CLEANUP_PAUSE,
+                         archive=(lambda db, condition: _archive_rows(db, "job_logs", JobLog.__table__, condition))
+                         if LOG_ARCHIVE_ENABLED else None)
+
+# 日志 / 告警历史时间分区，仅 PostgreSQL 且配置了 LOG_PARTITIONING 时启用
+if LOG_PARTITIONING and DB_TYPE != "sqlite":
+    log_partitions = TimePartitioning(JobLog, "timestamp", LOG_PARTITIONING, LOG_PARTITION_PREMAKE)
+    alert_partitions = TimePartitioning(AlertHistory, "sent_at", LOG_PARTITIONING, LOG_PARTITION_PREMAKE)
+else:
+    log_partitions = alert_partitions = None
+
 
 def get_db():
     db = _session_factory()
@@ -56,21 +196,131 @@ def get_isolated_db():
         db.close()
 
 
-def get_redis():
+class ThreadedSession:
+    """DB_ASYNC=false 时 get_async_db 返回的会话：run_sync 在线程池中执行，与同步路由相同"""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+
+@asynccontextmanager
+async def _async_session(async_factory, sync_factory, primary: bool = False):
+    if async_factory is None:
+        db = sync_factory()
+        if primary:
+            use_primary(db)
+        try:
+            yield ThreadedSession(db)
+        finally:
+            await run_in_threadpool(db.close)
+        return
+    async with async_factory() as db:
+        if primary:
+            use_primary(db)
+        yield db
+
+
+async def get_async_db():
+    """
+    异步路由使用的会话，通过 await db.run_sync(查询函数, ...) 复用本模块的同步查询函数
+
+    run_sync 中的查询经异步驱动执行，等待数据库时不占用线程池中的线程
+    """
+    async with _async_session(_async_session_factory, _session_factory) as db:
+        yield db
+
+
+async def get_async_read_db(request: Request):
+    """同 get_async_db，配置了只读副本时查询发往副本；请求头 X-DB-Primary: true 时只使用主库"""
+    primary = request.headers.get(READ_PRIMARY_HEADER, "").lower() in ("1", "true", "yes")
+    async with _async_session(_async_read_session_factory, _read_session_factory, primary) as db:
+        yield db
+
+
+def get_replica_stats():
+    """只读副本的使用情况，未配置副本时返回 None"""
+    if replica_set is None:
+        return None
+    return {"sync": replica_set.stats(), "async": async_replica_set.stats() if async_replica_set else None}
+
+
+async def dispose_async_engine():
+    if async_engine is not None:
+        await async_engine.dispose()
+    for replica in _async_replica_engines:
+        await replica.dispose()
+
+
+def get_redis(socket_timeout: float = None):
+    """socket_timeout 为连接和单次命令的超时（秒），不填使用 REDIS_SOCKET_TIMEOUT"""
+    timeout = REDIS_SOCKET_TIMEOUT if socket_timeout is None else socket_timeout
     return redis.Redis(
         host=REDIS_HOST,
         port=REDIS_PORT,
         password=REDIS_PASSWORD if REDIS_PASSWORD else None,
-        db=REDIS_DB
+        db=REDIS_DB,
+        socket_timeout=timeout,
+        socket_connect_timeout=timeout,
     )
 
 
+def _load_config_values(db: Session = None) -> dict:
+    own_session = db is None
+    if own_session:
+        db = _session_factory()
+    try:
+        return {key: value for key, value in db.query(SystemConfig.key, SystemConfig.value)}
+    finally:
+        if own_session:
+            db.close()
+
+
+config_cache = ConfigCache(_load_config_values, ttl=CONFIG_CACHE_TTL)
+config_invalidator = RedisConfigInvalidator(config_cache, get_redis, CONFIG_CACHE_REDIS_CHANNEL) \
+    if CONFIG_CACHE_REDIS_CHANNEL else None
+
+
 def init_db():
+    _init_partitions()
     Base.metadata.create_all(bind=engine)
+    _check_columns()
+    _check_indexes()
     _init_default_config()
+    _init_log_stats()
+    _init_search_index()
+    if config_invalidator is not None:
+        config_invalidator.start()
     logger.info("数据库表初始化完成")
 
 
+def _check_columns():
+    """create_all 不会为已存在的表补列，缺少模型中的列时停止启动，由数据库迁移补列"""
+    inspector = inspect(engine)
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing += [f"{table.name}.{column.name}" for column in table.columns if column.name not in existing]
+    if missing:
+        raise RuntimeError(f"数据库缺少列 {', '.join(missing)}，请先执行 alembic upgrade head")
+
+
+def _check_indexes():
+    """create_all 不会为已存在的表补建索引，缺少时提示执行数据库迁移"""
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not table.indexes or not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing = sorted(index.name for index in table.indexes if index.name not in existing)
+        if missing:
+            logger.warning(f"表 {table.name} 缺少索引 {', '.join(missing)}，请执行 alembic upgrade head")
+
+
 def _init_default_config():
     db = SessionLocal()
     try:
@@ -88,12 +338,117 @@ def _init_default_config():
         db.rollback()
     finally:
         db.close()
+    config_cache.invalidate()
+
+
+def _init_partitions():
+    """分区表需要在 create_all 之前创建，已存在的普通表提示转换"""
+    for partitioning in (log_partitions, alert_partitions):
+        if partitioning is None:
+            continue
+        db = _session_factory()
+        try:
+            state = partitioning.is_partitioned(db)
+            if state is None:
+                partitioning.create(db)
+            elif state:
+                partitioning.ensure_partitions(db)
+            else:
+                logger.warning(f"表 {partitioning.name} 尚未分区，请执行 alembic upgrade head "
+                               f"或 python scripts/manage_partitions.py --convert")
+            db.commit()
+        except Exception as e:
+            logger.error(f"初始化分区表 {partitioning.name} 失败: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+
+def maintain_partitions() -> dict:
+    """预先创建日志 / 告警历史的未来分区，返回新建的分区名"""
+    created = {}
+    for partitioning in (log_partitions, alert_partitions):
+        if partitioning is None:
+            continue
+        db = _session_factory()
+        try:
+            if partitioning.is_partitioned(db):
+                created[partitioning.name] = partitioning.ensure_partitions(db)
+                db.commit()
+        finally:
+            db.close()
+    return created
+
+
+def _active_partitions(db: Session, partitioning):
+    """分区已启用且表已是分区表时返回 partitioning，否则返回 None（按行删除）"""
+    if partitioning is not None and partitioning.is_partitioned(db):
+        return partitioning
+    return None
+
+
+def _archive_rows(db: Session, table: str, source, condition=None) -> int:
+    """
+    把 source（表或分区）中满足 condition 的行导出到日志归档，返回导出条数；未开启 LOG_ARCHIVE_ENABLED 时不导出
+
+    在删除之前调用，写入失败时抛出异常，调用方不应继续删除
+    """
+    if not LOG_ARCHIVE_ENABLED:
+        return 0
+    time_column = source.c[TIME_COLUMNS[table]]
+    query = select(source).order_by(time_column.asc(), source.c.id.asc())
+    if condition is not None:
+        query = query.where(condition)
+    rows = (dict(row) for row in db.execute(query.execution_options(yield_per=5000)).mappings())
+    if table == "job_logs":
+        rows = (job_log_record(row) for row in rows)
+    return log_archive.write(table, rows)["rows"]
+
+
+def _drop_expired_log_partitions(db: Session, partitioning, cutoff: datetime) -> dict:
+    """移除全部早于 cutoff 的日志分区，逐个分区先归档，在独立事务中扣减统计后 DROP / DETACH"""
+    result = {"rows": 0, "partitions": [], "archived": 0}
+    for name, _, _ in partitioning.expired(db, cutoff):
+        result["archived"] += _archive_rows(db, "job_logs", partitioning.source(name))
+        per_job = aggregate_logs(db, source=partitioning.source(name))
+        partitioning.remove(db, name, LOG_PARTITION_RETENTION)
+        forget_logs(db, per_job)
+        db.commit()
+        result["rows"] += sum(entry[0] for entry in per_job.values())
+        result["partitions"].append(name)
+    return result
+
+
+def _init_log_stats():
+    db = _session_factory()
+    try:
+        ensure_log_stats(db)
+    except Exception as e:
+        logger.error(f"初始化日志统计失败: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _init_search_index():
+    db = _session_factory()
+    try:
+        ensure_search_index(db)
+    except Exception as e:
+        logger.error(f"初始化日志搜索索引失败: {e}")
+        db.rollback()
+    finally:
+        db.close()
 
 
 def reset_db():
+    # FTS 表不在模型中，drop_all 不会删除
+    with engine.begin() as conn:
+        drop_search_index(Session(bind=conn))
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
     _init_default_config()
+    _init_search_index()
     logger.info("数据库已重置")
 
 
@@ -105,9 +460,13 @@ def get_db_status():
 
 
 def get_config(db: Session, key: str, default: str = None) -> str:
-    config = db.query(SystemConfig).filter(SystemConfig.key == key).first()
-    if config and config.value:
-        return config.value
+    if config_cache.enabled:
+        value = config_cache.get(key, db)
+    else:
+        config = db.query(SystemConfig).filter(SystemConfig.key == key).first()
+        value = config.value if config else None
+    if value:
+        return value
     return default or DEFAULT_CONFIG.get(key, {}).get("value", "")
 
 
@@ -132,6 +491,7 @@ def set_config(db: Session, key: str, value: str) -> SystemConfig:
         config = SystemConfig(key=key, value=value)
         db.add(config)
     db.commit()
+    config_cache.invalidate()
     return config
 
 
@@ -267,63 +627,83 @@ def list_ai_tool_calls(db: Session, session_id: str, limit: int = 100):
     )
 
 
-def cleanup_old_logs(db: Session, retention_days: int = None, max_count: int = None) -> dict:
+def cleanup_old_logs(db: Session, retention_days: int = None, max_count: int = None, resume: bool = False) -> dict:
+    """
+    按保留天数和最大日志数分批清理日志，进度可通过 log_cleanup.progress() 查看
+
+    job_logs 为分区表时按保留天数移除整个过期分区（LOG_PARTITION_RETENTION），只有超出最大日志数的部分逐行删除；
+    开启 LOG_ARCHIVE_ENABLED 时删除前先导出到日志归档（archived 为导出条数）
+    """
     if retention_days is None:
         retention_days = get_config_int(db, "log_retention_days", 30)
     if max_count is None:
         max_count = get_config_int(db, "log_max_count", 100000)
     
-    result = {"deleted_by_age": 0, "deleted_by_count": 0}
-    
-    cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
-    deleted_by_age = db.execute(
-        delete(JobLog).where(JobLog.timestamp < cutoff_date)
-    )
-    result["deleted_by_age"] = deleted_by_age.rowcount
-    
-    total_count = db.query(func.count(JobLog.id)).scalar()
-    if total_count > max_count:
-        excess_count = total_count - max_count
-        oldest_ids = db.query(JobLog.id).order_by(JobLog.timestamp.asc()).limit(excess_count).all()
-        oldest_id_list = [id[0] for id in oldest_ids]
-        deleted_by_count = db.execute(
-            delete(JobLog).where(JobLog.id.in_(oldest_id_list))
-        )
-        result["deleted_by_count"] = deleted_by_count.rowcount
+    partitioning = _active_partitions(db, log_partitions)
+    if partitioning is None:
+        result = log_cleanup.run(db, retention_days, max_count, resume=resume)
+    else:
+        # 分区表按整个分区过期，保留期内的最早分区中可能有少量超过保留天数的日志，随该分区一起删除
+        partitioning.ensure_partitions(db)
+        db.commit()
+        dropped = _drop_expired_log_partitions(db, partitioning, datetime.utcnow() - timedelta(days=retention_days))
+        result = log_cleanup.run(db, retention_days, max_count, resume=resume, by_age=False)
+        result["deleted_by_age"] = dropped["rows"]
+        result["removed_partitions"] = dropped["partitions"]
+        result["archived"] += dropped["archived"]
     
-    db.commit()
-    logger.info(f"日志清理完成: 按时间删除 {result['deleted_by_age']} 条, 按数量删除 {result['deleted_by_count']} 条")
+    if result["completed"]:
+        result["output_files"] = cleanup_output_store(db)
     return result
 
 
-def get_log_stats(db: Session) -> dict:
+def cleanup_output_store(db: Session, min_age: float = LOG_OUTPUT_SPILL_GRACE) -> dict:
+    """删除已没有日志引用的外部输出文件（归档的日志引用的文件保留），返回删除的文件数和字节数"""
+    referenced = set(db.scalars(select(JobLog.output_ref).where(JobLog.output_ref.isnot(None)).distinct()).all())
+    db.rollback()
+    referenced |= log_archive.output_refs()
+    removed = output_store.sweep(referenced, min_age=min_age)
+    if removed["files"]:
+        logger.info(f"已删除 {removed['files']} 个未引用的输出文件，共 {removed['bytes']} 字节")
+    return removed
+
+
+def get_job_log(db: Session, log_id: int) -> JobLog:
+    """单条日志，同时读取压缩存储的完整输出（列表查询不读取）"""
+    return db.query(JobLog).options(undefer(JobLog.output_data)).filter(JobLog.id == log_id).first()
+
+
+def get_log_stats(db: Session, job_id: str = None, include_expired: bool = False) -> dict:
+    """
+    日志统计，job_id 为空时统计全部日志
+
+    条数、最早 / 最新时间和输出存储大小读取 log_stats 汇总行，不扫描日志表；
+    过期日志数需要按时间范围计数，include_expired 为 True 时才统计，否则为 None。
+    """
     retention_days = get_config_int(db, "log_retention_days", 30)
     max_count = get_config_int(db, "log_max_count", 100000)
     
-    total_count = db.query(func.count(JobLog.id)).scalar()
-    success_count = db.query(func.count(JobLog.id)).where(JobLog.status == True).scalar()
-    fail_count = db.query(func.count(JobLog.id)).where(JobLog.status == False).scalar()
-    
-    oldest_log = db.query(JobLog).order_by(JobLog.timestamp.asc()).first()
-    newest_log = db.query(JobLog).order_by(JobLog.timestamp.desc()).first()
+    stats = read_log_stats(db, job_id)
+    # 截断和压缩节省的存储（升级前写入的日志没有记录大小，不计入）
+    stats["output_saved_bytes"] = stats["output_bytes"] - stats["stored_bytes"]
+    stats["output_saved_ratio"] = round(stats["output_saved_bytes"] / stats["output_bytes"], 4) \
+        if stats["output_bytes"] else 0.0
     
-    cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
-    expired_count = db.query(func.count(JobLog.id)).where(JobLog.timestamp < cutoff_date).scalar()
-    
-    return {
-        "total_count": total_count,
-        "success_count": success_count,
-        "fail_count": fail_count,
-        "oldest_timestamp": oldest_log.timestamp.isoformat() if oldest_log else None,
-        "newest_timestamp": newest_log.timestamp.isoformat() if newest_log else None,
-        "expired_count": expired_count,
-        "retention_days": retention_days,
-        "max_count": max_count
-    }
+    stats["expired_count"] = None
+    if include_expired:
+        cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
+        expired_query = db.query(func.count(JobLog.id)).where(JobLog.timestamp < cutoff_date)
+        if job_id:
+            expired_query = expired_query.where(JobLog.job_id == job_id)
+        stats["expired_count"] = expired_query.scalar()
+    stats["retention_days"] = retention_days
+    stats["max_count"] = max_count
+    return stats
 
 
 def clear_all_logs(db: Session) -> int:
     deleted = db.execute(delete(JobLog))
+    clear_log_stats(db)
     db.commit()
     logger.info(f"已清除所有日志: {deleted.rowcount} 条")
     return deleted.rowcount
@@ -435,11 +815,127 @@ def get_alert_history(db: Session, history_id: int) -> AlertHistory:
     return db.query(AlertHistory).filter(AlertHistory.id == history_id).first()
 
 
-def list_alert_history(db: Session, job_id: str = None, status: bool = None, channel_type: str = None, start_time: datetime = None, end_time: datetime = None, page: int = 1, limit: int = 20) -> dict:
+def _job_id_filter(column, job_id: str, exact: bool):
+    return column == job_id if exact else column.ilike(f"%{job_id}%")
+
+
+def list_job_logs(db: Session, job_id: str = None, status: bool = None, start_time: datetime = None,
+                  end_time: datetime = None, page: int = 1, limit: int = 10, cursor: str = None,
+                  count: str = "exact", exact: bool = False, q: str = None) -> dict:
+    """
+    按时间倒序分页查询任务日志
+
+    传入 cursor 时按 (timestamp, id) 游标分页，耗时与翻页深度无关；
+    count 为 exact（精确总数，短时间缓存）、estimate（无筛选时估算）或 none（不返回总数）；
+    q 在任务 ID、消息和输出中搜索（见 app.core.log_search）
+    """
+    query = db.query(JobLog)
+
+    if job_id:
+        query = query.filter(_job_id_filter(JobLog.job_id, job_id, exact))
+    if status is not None:
+        query = query.filter(JobLog.status == status)
+    if start_time:
+        query = query.filter(JobLog.timestamp >= start_time)
+    if end_time:
+        query = query.filter(JobLog.timestamp <= end_time)
+    search = search_condition(db, q)
+    if search is not None:
+        query = query.filter(search)
+
+    filters = ((("=" if exact else "~") + job_id) if job_id else None, status, start_time, end_time,
+               " ".join(q.split()) if search is not None else None)
+    total_count = page_count(db, JobLog, query, count, filters, _count_cache)
+    logs, next_cursor = keyset_page(query, JobLog.timestamp, JobLog.id, limit, cursor, page)
+
+    return {"count": total_count, "logs": logs, "next_cursor": next_cursor}
+
+
+# 包含归档时页码分页需要从数据库和归档各读取 offset + limit 条，限制最大偏移量，更深的分页使用 cursor
+ARCHIVE_MAX_OFFSET = 10000
+
+
+def _archive_log_match(job_id: str = None, exact: bool = False, status: bool = None, q: str = None):
+    """与 list_job_logs 相同的筛选条件（时间范围除外）用于归档记录，没有条件时返回 None"""
+    job_id_lower = job_id.lower() if job_id else None
+    terms = [term.lower() for term in split_terms(q)]
+    if not (job_id or status is not None or terms):
+        return None
+
+    def match(row: dict) -> bool:
+        if job_id and (row["job_id"] != job_id if exact else job_id_lower not in row["job_id"].lower()):
+            return False
+        if status is not None and row["status"] != status:
+            return False
+        if terms:
+            document = f"{row['job_id']} {row['message']} {row.get('output') or ''}".lower()
+            return all(term in document for term in terms)
+        return True
+
+    return match
+
+
+def list_archived_job_logs(job_id: str = None, status: bool = None, start_time: datetime = None,
+                           end_time: datetime = None, limit: int = 10, cursor: str = None, count: str = "exact",
+                           exact: bool = False, q: str = None) -> dict:
+    """
+    按时间倒序查询归档中的日志（不访问数据库），最多返回 limit 条，筛选条件与 list_job_logs 相同
+
+    只读取与时间范围和游标相交的段；count 不为 none 时返回归档中的总数，有筛选条件时需要读取范围内的全部段
+    """
+    before = None
+    if cursor:
+        try:
+            cursor_time, cursor_id = decode_cursor(cursor)
+            before = (datetime.fromisoformat(cursor_time), cursor_id)
+        except (TypeError, ValueError):
+            raise ValueError("无效的分页游标")
+    match = _archive_log_match(job_id, exact, status, q)
+    rows = log_archive.scan("job_logs", match, start_time, end_time, before, limit)
+    total = None if count == "none" else log_archive.count("job_logs", match, start_time, end_time)
+    return {"count": total, "logs": [_archived_job_log(row) for row in rows]}
+
+
+def _archived_job_log(row: dict, full_output: bool = False) -> JobLog:
+    """归档记录转换为不属于任何会话的 JobLog；full_output 时压缩存储的完整输出还原到 output_data"""
+    log = JobLog(**{key: value for key, value in row.items() if key in JobLog.__table__.columns.keys()})
+    if full_output and row.get("output_full") is not None:
+        log.output_data = zlib.compress(row["output_full"].encode("utf-8"))
+    log.archived = True
+    return log
+
+
+def get_archived_job_log(log_id: int) -> JobLog:
+    """按 id 在归档中查找日志（数据库中已清理的日志），不存在时返回 None"""
+    row = log_archive.find("job_logs", log_id)
+    return _archived_job_log(row, full_output=True) if row is not None else None
+
+
+def merge_archived_logs(live: dict, archived: dict, limit: int, offset: int = 0) -> dict:
+    """
+    合并数据库和归档的查询结果，按 (timestamp, id) 倒序取 [offset, offset + limit) 一页
+
+    live 为 list_job_logs(limit=offset + limit) 的结果，archived 为 list_archived_job_logs(limit=offset + limit + 1)
+    的结果；清理中断时同一条日志可能同时在两边，只保留数据库中的一条
+    """
+    window = offset + limit
+    live_keys = {(log.timestamp, log.id) for log in live["logs"]}
+    merged = live["logs"] + [log for log in archived["logs"] if (log.timestamp, log.id) not in live_keys]
+    merged.sort(key=lambda log: (log.timestamp, log.id), reverse=True)
+    has_more = live["next_cursor"] is not None or len(merged) > window
+    logs = merged[offset:window]
+    next_cursor = encode_cursor((logs[-1].timestamp.isoformat(), logs[-1].id)) if has_more and logs else None
+    total = None
+    if live["count"] is not None and archived["count"] is not None:
+        total = live["count"] + archived["count"]
+    return {"count": total, "logs": logs, "next_cursor": next_cursor}
+
+
+def list_alert_history(db: Session, job_id: str = None, status: bool = None, channel_type: str = None, start_time: datetime = None, end_time: datetime = None, page: int = 1, limit: int = 20, exact: bool = False, cursor: str = None, count: str = "exact") -> dict:
     query = db.query(AlertHistory)
     
     if job_id:
-        query = query.filter(AlertHistory.job_id.ilike(f"%{job_id}%"))
+        query = query.filter(_job_id_filter(AlertHistory.job_id, job_id, exact))
     if status is not None:
         query = query.filter(AlertHistory.status == status)
     if channel_type:
@@ -449,12 +945,11 @@ def list_alert_history(db: Session, job_id: str = None, status: bool = None, cha
     if end_time:
         query = query.filter(AlertHistory.sent_at <= end_time)
     
-    total_count = query.count()
+    filters = ((("=" if exact else "~") + job_id) if job_id else None, status, channel_type, start_time, end_time)
+    total_count = page_count(db, AlertHistory, query, count, filters, _count_cache)
+    logs, next_cursor = keyset_page(query, AlertHistory.sent_at, AlertHistory.id, limit, cursor, page)
     
-    offset = (page - 1) * limit
-    logs = query.order_by(AlertHistory.sent_at.desc()).offset(offset).limit(limit).all()
-    
-    return {"count": total_count, "logs": logs}
+    return {"count": total_count, "logs": logs, "next_cursor": next_cursor}
 
 
 def cleanup_old_alert_history(db: Session, retention_days: int = None) -> int:
@@ -462,6 +957,19 @@ def cleanup_old_alert_history(db: Session, retention_days: int = None) -> int:
         retention_days = get_config_int(db, "alert_history_retention_days", 30)
     
     cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
+    partitioning = _active_partitions(db, alert_partitions)
+    if partitioning is not None:
+        partitioning.ensure_partitions(db)
+        deleted = 0
+        for name, _, _ in partitioning.expired(db, cutoff_date):
+            _archive_rows(db, "alert_history", partitioning.source(name))
+            deleted += db.execute(select(func.count()).select_from(partitioning.source(name))).scalar()
+            partitioning.remove(db, name, LOG_PARTITION_RETENTION)
+        db.commit()
+        logger.info(f"告警历史清理完成: 移除过期分区共 {deleted} 条")
+        return deleted
+
+    _archive_rows(db, "alert_history", AlertHistory.__table__, AlertHistory.sent_at < cutoff_date)
     deleted = db.execute(delete(AlertHistory).where(AlertHistory.sent_at < cutoff_date))
     db.commit()
     logger.info(f"告警历史清理完成: 删除 {deleted.rowcount} 条")
@@ -0,0 +1,317 @@
+"""
+日志冷归档
+
+开启 LOG_ARCHIVE_ENABLED 后，日志清理和告警历史清理在删除之前把将要删除的 job_logs / alert_history 行
+导出为 gzip 压缩的 NDJSON 段文件（每行一条记录），存放在 LOG_ARCHIVE_DIR 下：
+
+  <表名>/<年>/<月>/<表名>-<日期>-<最小 id>-<最大 id>.ndjson.gz
+
+- 每个段只包含同一天（UTC）的记录，按 (时间, id) 升序，最多 segment_rows 条
+- 段文件先写临时文件再原子改名，写完后在 manifest.jsonl 中追加一行索引（表名、文件、时间范围、条数、id 范围）；
+  同一批记录重新导出时文件名相同，直接覆盖，索引以最后一行为准
+- 查询按索引中的时间范围只打开相关的段，从新到旧逐段读取，取够一页后停止；按 id 查找时只打开 id 范围包含该 id 的段
+
+output 列与数据库中相同只保存预览，压缩存储的完整输出解压后保存在 output_full 中。写入外部文件的输出只归档
+output_ref，索引中记录每个段引用的外部文件（refs），清理外部文件时保留这些文件，归档的日志仍可读取完整输出。
+归档不计入 log_stats，段文件不会被自动删除，需要时按目录（按月）手动清理后执行 rebuild_manifest，
+被删除的段引用的外部文件随后由日志清理删除。
+"""
+
+import gzip
+import json
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Set, Tuple
+
+from app.core.log_output import OUTPUT_ENCODING_ZLIB
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.jsonl"
+
+# 各表的时间列，段按该列分天并排序
+TIME_COLUMNS = {"job_logs": "timestamp", "alert_history": "sent_at"}
+
+
+def job_log_record(row: Dict[str, Any]) -> Dict[str, Any]:
+    """job_logs 行转换为归档记录：压缩的输出解压后写入 output_full，不保留 output_data"""
+    record = {key: value for key, value in row.items() if key != "output_data"}
+    if record.get("output_encoding") == OUTPUT_ENCODING_ZLIB and row.get("output_data") is not None:
+        record["output_full"] = zlib.decompress(row["output_data"]).decode("utf-8", "ignore")
+    return record
+
+
+def _segment_entry(table: str, relative: str, path: str, rows: List[Dict[str, Any]], created_at: str) -> Dict[str, Any]:
+    time_column = TIME_COLUMNS[table]
+    ids = [row["id"] for row in rows]
+    return {
+        "table": table,
+        "file": relative.replace(os.sep, "/"),
+        "start": rows[0][time_column].isoformat(),
+        "end": rows[-1][time_column].isoformat(),
+        "rows": len(rows),
+        "min_id": min(ids),
+        "max_id": max(ids),
+        "bytes": os.path.getsize(path),
+        # 段中日志引用的外部输出文件，清理外部文件时保留
+        "refs": sorted({row["output_ref"] for row in rows if row.get("output_ref")}),
+        "created_at": created_at,
+    }
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"无法归档的值类型 {type(value).__name__}")
+
+
+class LogArchive:
+    """按天分段的 NDJSON 归档目录及其索引"""
+
+    def __init__(self, root: str, segment_rows: int = 50000, compress_level: int = 6):
+        self.root = root
+        self.segment_rows = max(1, segment_rows)
+        self.compress_level = compress_level
+        self._lock = threading.Lock()
+        self._manifest_key = None
+        self._manifest: Dict[str, Dict[str, Any]] = {}
+
+    # ---- 写入 ----
+
+    def write(self, table: str, rows: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        导出记录，rows 需按 (时间, id) 升序；返回写入的段数和记录数
+
+        写入失败时抛出 OSError，调用方不应删除这批记录
+        """
+        time_column = TIME_COLUMNS[table]
+        result = {"segments": 0, "rows": 0}
+        batch: List[Dict[str, Any]] = []
+        for row in rows:
+            if batch and (len(batch) >= self.segment_rows or row[time_column].date() != batch[0][time_column].date()):
+                self._write_segment(table, batch)
+                result["segments"] += 1
+                result["rows"] += len(batch)
+                batch = []
+            batch.append(row)
+        if batch:
+            self._write_segment(table, batch)
+            result["segments"] += 1
+            result["rows"] += len(batch)
+        return result
+
+    def _write_segment(self, table: str, rows: List[Dict[str, Any]]):
+        time_column = TIME_COLUMNS[table]
+        ids = [row["id"] for row in rows]
+        day = rows[0][time_column]
+        name = f"{table}-{day:%Y%m%d}-{min(ids)}-{max(ids)}.ndjson.gz"
+        relative = os.path.join(table, f"{day:%Y}", f"{day:%m}", name)
+        path = os.path.join(self.root, relative)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=self.compress_level, mtime=0) as gz:
+                    for row in rows:
+                        gz.write(json.dumps(row, ensure_ascii=False, default=_encode).encode("utf-8") + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        entry = _segment_entry(table, relative, path, rows, datetime.utcnow().isoformat())
+        with self._lock:
+            with open(os.path.join(self.root, MANIFEST), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    # ---- 索引 ----
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        """读取索引（文件未变化时使用缓存），同一段文件多次出现时以最后一行为准"""
+        path = os.path.join(self.root, MANIFEST)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return {}
+        key = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if key == self._manifest_key:
+                return self._manifest
+            entries: Dict[str, Dict[str, Any]] = {}
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # 写入中断留下的不完整行
+                        logger.warning(f"跳过归档索引中无法解析的行: {line[:100]}")
+                        continue
+                    entry["start"] = datetime.fromisoformat(entry["start"])
+                    entry["end"] = datetime.fromisoformat(entry["end"])
+                    entries[entry["file"]] = entry
+            self._manifest_key, self._manifest = key, entries
+            return entries
+
+    def segments(self, table: str, start: datetime = None, end: datetime = None) -> List[Dict[str, Any]]:
+        """与 [start, end] 有交集的段，按结束时间从新到旧排序"""
+        found = [
+            entry for entry in self._load_manifest().values()
+            if entry["table"] == table
+            and (start is None or entry["end"] >= start)
+            and (end is None or entry["start"] <= end)
+        ]
+        found.sort(key=lambda entry: (entry["end"], entry["max_id"]), reverse=True)
+        return found
+
+    def rebuild_manifest(self) -> int:
+        """按目录中现有的段文件重建索引（手动删除或移动段文件后执行），返回段数"""
+        entries = []
+        for table, time_column in TIME_COLUMNS.items():
+            for dirpath, _, filenames in os.walk(os.path.join(self.root, table)):
+                for filename in sorted(filenames):
+                    if not filename.endswith(".ndjson.gz"):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    rows = list(self._read(path, time_column))
+                    if not rows:
+                        continue
+                    entries.append(_segment_entry(
+                        table, os.path.relpath(path, self.root), path, rows,
+                        datetime.utcfromtimestamp(os.path.getmtime(path)).isoformat(),
+                    ))
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        with self._lock:
+            os.replace(tmp_path, os.path.join(self.root, MANIFEST))
+            self._manifest_key = None
+        return len(entries)
+
+    def output_refs(self) -> Set[str]:
+        """归档的日志引用的全部外部输出文件（读取索引）"""
+        refs: Set[str] = set()
+        for entry in self._load_manifest().values():
+            refs.update(entry.get("refs", ()))
+        return refs
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """各表的归档段数、记录数、压缩后字节数和时间范围（读取索引，不打开段文件）"""
+        result = {}
+        for table in TIME_COLUMNS:
+            entries = self.segments(table)
+            result[table] = {
+                "segments": len(entries),
+                "rows": sum(entry["rows"] for entry in entries),
+                "bytes": sum(entry["bytes"] for entry in entries),
+                "earliest": min(entry["start"] for entry in entries) if entries else None,
+                "latest": max(entry["end"] for entry in entries) if entries else None,
+            }
+        return result
+
+    # ---- 查询 ----
+
+    @staticmethod
+    def _read(path: str, time_column: str) -> Iterator[Dict[str, Any]]:
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                row = json.loads(line)
+                row[time_column] = datetime.fromisoformat(row[time_column])
+                yield row
+
+    def scan(self, table: str, match: Callable[[Dict[str, Any]], bool] = None, start: datetime = None,
+             end: datetime = None, before: Tuple[datetime, int] = None, limit: int = None) -> List[Dict[str, Any]]:
+        """
+        按 (时间, id) 倒序返回满足条件的归档记录
+
+        start / end 为时间范围（闭区间），before 为游标键（只返回早于该键的记录），limit 为最多返回条数；
+        只打开时间范围内的段，已取够 limit 条且剩余的段都早于已取到的记录时停止读取。
+        同一条记录重复导出时只返回一次。
+        """
+        time_column = TIME_COLUMNS[table]
+        upper = end
+        if before is not None and (upper is None or before[0] < upper):
+            upper = before[0]
+        rows: List[Dict[str, Any]] = []
+        seen = set()
+        for entry in self.segments(table, start, upper):
+            if limit is not None and len(rows) >= limit:
+                rows.sort(key=lambda row: (row[time_column], row["id"]), reverse=True)
+                del rows[limit:]
+                # 段按结束时间倒序，之后的段不会有比第 limit 条更新的记录
+                if entry["end"] < rows[-1][time_column]:
+                    break
+            path = os.path.join(self.root, entry["file"])
+            try:
+                for row in self._read(path, time_column):
+                    key = (row[time_column], row["id"])
+                    if start is not None and key[0] < start:
+                        continue
+                    if end is not None and key[0] > end:
+                        continue
+                    if before is not None and key >= before:
+                        continue
+                    if key in seen or (match is not None and not match(row)):
+                        continue
+                    seen.add(key)
+                    rows.append(row)
+            except FileNotFoundError:
+                logger.warning(f"归档段 {entry['file']} 不存在，已跳过（删除段文件后请重建索引）")
+        rows.sort(key=lambda row: (row[time_column], row["id"]), reverse=True)
+        return rows if limit is None else rows[:limit]
+
+    def find(self, table: str, record_id: int) -> Dict[str, Any]:
+        """按 id 查找一条归档记录，只打开 id 范围包含该 id 的段；不存在时返回 None"""
+        time_column = TIME_COLUMNS[table]
+        for entry in self._load_manifest().values():
+            if entry["table"] != table or not entry["min_id"] <= record_id <= entry["max_id"]:
+                continue
+            path = os.path.join(self.root, entry["file"])
+            if not os.path.exists(path):
+                continue
+            for row in self._read(path, time_column):
+                if row["id"] == record_id:
+                    return row
+        return None
+
+    def count(self, table: str, match: Callable[[Dict[str, Any]], bool] = None, start: datetime = None,
+              end: datetime = None) -> int:
+        """满足条件的归档记录数；没有 match 且段完全位于时间范围内时直接使用索引中的条数"""
+        time_column = TIME_COLUMNS[table]
+        total = 0
+        scan = []
+        for entry in self.segments(table, start, end):
+            inside = (start is None or entry["start"] >= start) and (end is None or entry["end"] <= end)
+            if match is None and inside:
+                total += entry["rows"]
+            else:
+                scan.append(entry)
+        if scan:
+            for entry in scan:
+                path = os.path.join(self.root, entry["file"])
+                if not os.path.exists(path):
+                    continue
+                for row in self._read(path, time_column):
+                    moment = row[time_column]
+                    if (start is None or moment >= start) and (end is None or moment <= end) \
+                            and (match is None or match(row)):
+                        total += 1
+        return total
@@ -0,0 +1,186 @@
+"""
+日志分批清理
+
+按 (timestamp, id) 索引范围分批删除：每批先用索引定位第 batch_size 条的键，删除该键之前的日志并提交，
+批次之间短暂让出写锁，日志写入器不会被长事务阻塞；不把待删除的 id 读入内存，也不受 SQLite 变量个数限制。
+
+每批单独提交，清理中断后已删除的部分不会回滚；同一进程内可从上次停下的位置继续（resume），
+也可以直接重新执行，清理目标按相同配置重新计算，结果一致。
+
+传入 archive 时每批删除前先调用 archive(db, 条件) 导出这批日志（见 app.core.log_archive），导出失败时不删除。
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import and_, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.log_stats import delete_logs, read_log_stats
+from app.models.sql_model import JobLog
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_KEY = tuple_(JobLog.timestamp, JobLog.id)
+
+
+class LogCleanup:
+    """分批清理过期 / 超出数量上限的日志，同一进程内同时只运行一个清理"""
+
+    def __init__(self, batch_size: int = 2000, pause: float = 0.05,
+                 archive: Optional[Callable[[Session, Any], int]] = None):
+        self.batch_size = max(1, batch_size)
+        self.pause = max(0.0, pause)
+        self.archive = archive
+        self._run_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._state: Dict[str, Any] = {}
+
+    def run(self, db: Session, retention_days: int, max_count: int, resume: bool = False,
+            by_age: bool = True) -> Dict[str, Any]:
+        """
+        执行清理，返回 deleted_by_age / deleted_by_count 等进度信息
+
+        resume 为 True 且上次清理未完成时，沿用上次的清理目标并从上次删除到的位置继续；
+        by_age 为 False 时跳过按时间删除（由调用方按分区清理），只按最大日志数删除
+        """
+        if not self._run_lock.acquire(blocking=False):
+            raise ValueError("日志清理正在进行中")
+        try:
+            self._stop_event.clear()
+            previous = self.progress()
+            if resume and previous and not previous["completed"]:
+                state = previous
+                state.update(running=True, stopped=False, error=None, resumed_at=datetime.utcnow().isoformat())
+                logger.info(f"继续上次未完成的日志清理: 阶段 {state['phase']}")
+            else:
+                cutoff = datetime.utcnow() - timedelta(days=retention_days)
+                state = {
+                    "running": True,
+                    "completed": False,
+                    "stopped": False,
+                    "error": None,
+                    "phase": "age" if by_age else "count",
+                    "retention_days": retention_days,
+                    "max_count": max_count,
+                    "cutoff": cutoff.isoformat(),
+                    "boundary": None,
+                    "last_key": None,
+                    "deleted_by_age": 0,
+                    "deleted_by_count": 0,
+                    "archived": 0,
+                    "batches": 0,
+                    "batch_size": self.batch_size,
+                    "started_at": datetime.utcnow().isoformat(),
+                    "finished_at": None,
+                }
+            self._set_state(state)
+
+            start = time.perf_counter()
+            try:
+                self._run(db, state)
+            except Exception as e:
+                db.rollback()
+                self._update(running=False, error=str(e), finished_at=datetime.utcnow().isoformat())
+                logger.error(f"日志清理失败: {e}")
+                raise
+
+            stopped = self._stop_event.is_set() and state["phase"] != "done"
+            self._update(running=False, completed=not stopped, stopped=stopped,
+                         finished_at=datetime.utcnow().isoformat())
+            result = self.progress()
+            result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            logger.info(f"日志清理{'已停止' if stopped else '完成'}: 按时间删除 {result['deleted_by_age']} 条, "
+                        f"按数量删除 {result['deleted_by_count']} 条, {result['batches']} 批")
+            return result
+        finally:
+            self._run_lock.release()
+
+    def stop(self) -> bool:
+        """请求停止正在进行的清理，当前批次提交后停止；没有进行中的清理时返回 False"""
+        if not self._run_lock.locked():
+            return False
+        self._stop_event.set()
+        return True
+
+    def progress(self) -> Optional[Dict[str, Any]]:
+        with self._state_lock:
+            return dict(self._state) if self._state else None
+
+    def _run(self, db: Session, state: Dict[str, Any]):
+        if state["phase"] == "age":
+            cutoff = datetime.fromisoformat(state["cutoff"])
+            if not self._delete_range(db, JobLog.timestamp < cutoff, "deleted_by_age"):
+                return
+            self._update(phase="count", last_key=None)
+            state["phase"], state["last_key"] = "count", None
+
+        if state["phase"] == "count":
+            if state["boundary"] is None:
+                # 总数读取汇总表；第 excess 条日志的键即按数量清理的上界
+                excess = read_log_stats(db)["total_count"] - state["max_count"]
+                if excess > 0:
+                    row = db.execute(
+                        select(JobLog.timestamp, JobLog.id)
+                        .order_by(JobLog.timestamp.asc(), JobLog.id.asc())
+                        .offset(excess - 1).limit(1)
+                    ).first()
+                    if row is not None:
+                        state["boundary"] = [row[0].isoformat(), row[1]]
+                        self._update(boundary=state["boundary"])
+            if state["boundary"] is not None:
+                boundary = (datetime.fromisoformat(state["boundary"][0]), state["boundary"][1])
+                if not self._delete_range(db, _KEY <= tuple_(*boundary), "deleted_by_count"):
+                    return
+            self._update(phase="done")
+            state["phase"] = "done"
+
+    def _delete_range(self, db: Session, condition, counter: str) -> bool:
+        """分批删除 condition 范围内的日志，按 (timestamp, id) 升序推进；被停止时返回 False"""
+        while True:
+            if self._stop_event.is_set():
+                return False
+
+            last_key = self.progress()["last_key"]
+            batch_condition = condition
+            if last_key is not None:
+                # 跳过已删除的部分（PostgreSQL 上删除的行在 VACUUM 前仍留在索引中）
+                batch_condition = and_(condition, _KEY > tuple_(datetime.fromisoformat(last_key[0]), last_key[1]))
+
+            upper = db.execute(
+                select(JobLog.timestamp, JobLog.id)
+                .where(batch_condition)
+                .order_by(JobLog.timestamp.asc(), JobLog.id.asc())
+                .offset(self.batch_size - 1).limit(1)
+            ).first()
+            if upper is not None:
+                batch_condition = and_(batch_condition, _KEY <= tuple_(upper[0], upper[1]))
+
+            archived = self.archive(db, batch_condition) if self.archive is not None else 0
+            deleted = delete_logs(db, batch_condition)
+            db.commit()
+
+            with self._state_lock:
+                self._state[counter] += deleted
+                self._state["archived"] += archived
+                self._state["batches"] += 1
+                if upper is not None:
+                    self._state["last_key"] = [upper[0].isoformat(), upper[1]]
+
+            if upper is None:
+                return True
+            if self.pause:
+                time.sleep(self.pause)
+
+    def _set_state(self, state: Dict[str, Any]):
+        with self._state_lock:
+            self._state = state
+
+    def _update(self, **values):
+        with self._state_lock:
+            self._state.update(values)
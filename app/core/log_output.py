@@ -0,0 +1,160 @@
+"""
+任务输出的存储格式
+
+JobLog.output 不限长度，run_os_command 等任务每次执行可能写入数百 KB 的标准输出。写入日志前：
+
+- 超过 LOG_OUTPUT_SPILL_MIN_BYTES 的输出写入外部文件（见 app.core.output_store），job_logs 只保存摘要和预览
+- 其余超过 LOG_OUTPUT_MAX_BYTES 的输出保留开头和结尾 LOG_OUTPUT_TAIL_BYTES，中间替换为截断标记，并记录原始大小
+- 超过 LOG_OUTPUT_COMPRESS_MIN_BYTES 的输出以 zlib 压缩存入 output_data，output 列只保留开头
+  LOG_OUTPUT_PREVIEW_CHARS 个字符作为预览
+
+日志列表只读取预览（output_data 为延迟加载列），查看单条日志详情时才解压；外部文件通过 output_reader 按区间读取。
+"""
+
+import logging
+import re
+import zlib
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from app.core.conf import (
+    LOG_OUTPUT_COMPRESS_LEVEL,
+    LOG_OUTPUT_COMPRESS_MIN_BYTES,
+    LOG_OUTPUT_MAX_BYTES,
+    LOG_OUTPUT_PREVIEW_CHARS,
+    LOG_OUTPUT_SPILL_DIR,
+    LOG_OUTPUT_SPILL_MAX_BYTES,
+    LOG_OUTPUT_SPILL_MIN_BYTES,
+    LOG_OUTPUT_TAIL_BYTES,
+)
+from app.core.output_store import OutputStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OUTPUT_ENCODING_ZLIB = "zlib"
+OUTPUT_ENCODING_FILE = "file"
+
+output_store = OutputStore(LOG_OUTPUT_SPILL_DIR)
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(ValueError):
+    """Range 请求的区间超出输出大小"""
+
+
+def truncate_output(data: bytes, max_bytes: int = LOG_OUTPUT_MAX_BYTES,
+                    tail_bytes: int = LOG_OUTPUT_TAIL_BYTES) -> Tuple[bytes, bool]:
+    """超过 max_bytes 时保留开头和结尾 tail_bytes，中间替换为截断标记；max_bytes 为 0 时不截断"""
+    if max_bytes <= 0 or len(data) <= max_bytes:
+        return data, False
+    tail_bytes = min(max(0, tail_bytes), max_bytes)
+    head_bytes = max_bytes - tail_bytes
+    marker = f"\n\n...[输出已截断：原始 {len(data)} 字节，省略中间 {len(data) - max_bytes} 字节]...\n\n".encode("utf-8")
+    # 截断位置可能落在多字节字符中间，解码时丢弃不完整的字符
+    head = data[:head_bytes].decode("utf-8", "ignore").encode("utf-8")
+    tail = data[len(data) - tail_bytes:].decode("utf-8", "ignore").encode("utf-8") if tail_bytes else b""
+    return head + marker + tail, True
+
+
+def _preview(data: bytes) -> str:
+    return data[:LOG_OUTPUT_PREVIEW_CHARS * 4].decode("utf-8", "ignore")[:LOG_OUTPUT_PREVIEW_CHARS]
+
+
+def _spill(raw: bytes) -> Optional[Dict[str, Any]]:
+    """写入外部文件，失败时返回 None（退回数据库存储）"""
+    data, truncated = truncate_output(raw, LOG_OUTPUT_SPILL_MAX_BYTES)
+    try:
+        ref = output_store.put(data)
+    except OSError as e:
+        logger.error(f"任务输出写入外部存储失败，改为写入数据库: {e}")
+        return None
+    preview = _preview(data)
+    return {"output": preview, "output_data": None, "output_ref": ref, "output_encoding": OUTPUT_ENCODING_FILE,
+            "output_size": len(raw), "output_stored_size": len(preview.encode("utf-8")),
+            "output_truncated": truncated}
+
+
+def pack_output(output: Optional[str]) -> Dict[str, Any]:
+    """
+    把任务输出转换为 job_logs 的各列（output / output_data / output_ref / output_encoding / 大小 / 是否截断）
+
+    output_stored_size 为数据库中的存储大小，外部文件不计入
+    """
+    if output is None:
+        return {"output": None, "output_data": None, "output_ref": None, "output_encoding": None,
+                "output_size": None, "output_stored_size": None, "output_truncated": False}
+
+    raw = output.encode("utf-8", "replace")
+    if 0 < LOG_OUTPUT_SPILL_MIN_BYTES < len(raw):
+        spilled = _spill(raw)
+        if spilled is not None:
+            return spilled
+
+    data, truncated = truncate_output(raw)
+    if LOG_OUTPUT_COMPRESS_MIN_BYTES > 0 and len(data) >= LOG_OUTPUT_COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(data, LOG_OUTPUT_COMPRESS_LEVEL)
+        preview = _preview(data)
+        stored_size = len(compressed) + len(preview.encode("utf-8"))
+        if stored_size < len(data):
+            return {"output": preview, "output_data": compressed, "output_ref": None,
+                    "output_encoding": OUTPUT_ENCODING_ZLIB, "output_size": len(raw),
+                    "output_stored_size": stored_size, "output_truncated": truncated}
+
+    text = data.decode("utf-8", "ignore") if truncated else output
+    return {"output": text, "output_data": None, "output_ref": None, "output_encoding": None,
+            "output_size": len(raw), "output_stored_size": len(data), "output_truncated": truncated}
+
+
+def unpack_output(log) -> Optional[str]:
+    """
+    读取一条日志的完整输出（压缩存储时解压）；会加载延迟列 output_data
+
+    外部文件可能很大，只返回预览，完整内容通过 output_reader 分段读取
+    """
+    if log.output_encoding == OUTPUT_ENCODING_ZLIB:
+        return zlib.decompress(log.output_data).decode("utf-8", "ignore")
+    return log.output
+
+
+def output_reader(log) -> Tuple[int, Callable[[int, int], Iterator[bytes]]]:
+    """返回 (输出字节数, read(start, end))，read 按闭区间分块返回 UTF-8 字节；外部文件不存在时抛出 FileNotFoundError"""
+    if log.output_encoding == OUTPUT_ENCODING_FILE:
+        size = output_store.size(log.output_ref)
+        if size is None:
+            raise FileNotFoundError(f"日志 {log.id} 的输出文件不存在")
+        return size, lambda start, end: output_store.iter_range(log.output_ref, start, end)
+
+    data = (unpack_output(log) or "").encode("utf-8")
+
+    def read(start: int, end: int) -> Iterator[bytes]:
+        yield data[start:end + 1]
+
+    return len(data), read
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单个 bytes 区间的 Range 请求头，返回闭区间 (start, end)
+
+    没有 Range 或格式不支持（如多个区间）时返回 None，按完整内容返回；区间超出范围时抛出 RangeNotSatisfiable
+    """
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # bytes=-N：最后 N 个字节
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    if last != "" and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    end = size - 1 if last == "" else min(int(last), size - 1)
+    return start, end
@@ -0,0 +1,188 @@
+"""
+日志全文搜索
+
+/logs/ 的 q 参数在任务 ID、消息和输出中按子串搜索（不区分大小写），多个词以空格分隔，需要同时匹配。
+压缩或写入外部文件的输出只能搜索到 output 列中的预览部分。
+
+- SQLite：FTS5 外部内容表 job_logs_fts（trigram 分词，支持中文和任意子串），由 job_logs 上的触发器在写入 / 删除日志时同步
+- PostgreSQL：pg_trgm 扩展的 GIN 表达式索引 ix_job_logs_search，ILIKE '%词%' 可以走索引
+
+trigram 索引只能用于不少于 3 个字符的词，更短的词按 LIKE 逐行匹配（与其他词组合时只检查已被索引筛出的日志）。
+索引不存在时（未执行迁移、SQLite 不支持 trigram 分词）退化为 LIKE 查询，结果相同但需要扫描全表。
+"""
+
+import logging
+import sqlite3
+from typing import List, Optional
+
+from sqlalchemy import and_, literal_column, or_, select, text
+from sqlalchemy.orm import Session
+
+from app.models.sql_model import JobLog
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "job_logs_fts"
+SEARCH_INDEX = "ix_job_logs_search"
+MIN_INDEXED_CHARS = 3
+
+# PostgreSQL 索引表达式，查询条件必须使用相同的表达式才能走索引
+_DOCUMENT = "(job_id || ' ' || message || ' ' || coalesce(output, ''))"
+
+_SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"job_id, message, output, content='job_logs', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON job_logs BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, job_id, message, output) VALUES (new.id, new.job_id, new.message, new.output); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON job_logs BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, job_id, message, output) "
+    f"VALUES ('delete', old.id, old.job_id, old.message, old.output); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE ON job_logs BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, job_id, message, output) "
+    f"VALUES ('delete', old.id, old.job_id, old.message, old.output); "
+    f"INSERT INTO {FTS_TABLE}(rowid, job_id, message, output) VALUES (new.id, new.job_id, new.message, new.output); END",
+]
+
+# SQLite 上 FTS 表是否可用；进程内只检查一次
+_fts_ready: Optional[bool] = None
+
+
+def sqlite_trigram_supported() -> bool:
+    """FTS5 trigram 分词需要 SQLite 3.34+"""
+    return sqlite3.sqlite_version_info >= (3, 34, 0)
+
+
+def pg_trgm_available(db: Session) -> bool:
+    return db.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first() is not None
+
+
+def create_search_index(db: Session, concurrently: bool = False):
+    """
+    创建搜索索引，由调用方提交
+
+    SQLite 创建 FTS 表和同步触发器，并按现有日志重建索引；PostgreSQL 创建 pg_trgm 扩展和 GIN 索引
+    （concurrently 为 True 时不阻塞写入，需要在事务外执行，分区表不支持）
+    """
+    global _fts_ready
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        if not sqlite_trigram_supported():
+            logger.warning(f"SQLite {sqlite3.sqlite_version} 不支持 FTS5 trigram 分词，日志搜索将使用 LIKE 查询")
+            return
+        for statement in _SQLITE_DDL:
+            db.execute(text(statement))
+        db.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        _fts_ready = True
+    elif dialect == "postgresql":
+        if not pg_trgm_available(db):
+            logger.warning("PostgreSQL 未安装 pg_trgm 扩展（通常在 postgresql-contrib 中），日志搜索将扫描全表")
+            return
+        db.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        db.execute(text(
+            f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {SEARCH_INDEX} "
+            f"ON job_logs USING gin ({_DOCUMENT} gin_trgm_ops)"
+        ))
+
+
+def drop_search_index(db: Session):
+    """删除搜索索引，由调用方提交"""
+    global _fts_ready
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        for suffix in ("insert", "delete", "update"):
+            db.execute(text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}"))
+        db.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+        _fts_ready = False
+    elif dialect == "postgresql":
+        db.execute(text(f"DROP INDEX IF EXISTS {SEARCH_INDEX}"))
+
+
+def has_search_index(db: Session) -> bool:
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return db.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                          {"name": FTS_TABLE}).first() is not None
+    if dialect == "postgresql":
+        return db.execute(text("SELECT to_regclass(:name)"), {"name": SEARCH_INDEX}).scalar() is not None
+    return False
+
+
+def ensure_search_index(db: Session):
+    """
+    启动时检查搜索索引：新数据库直接创建；SQLite 已有日志时同时按现有日志建立全文索引；
+    PostgreSQL 已有日志时建索引会阻塞写入，只提示执行数据库迁移
+    """
+    global _fts_ready
+    if has_search_index(db):
+        _fts_ready = True
+        return
+    dialect = db.get_bind().dialect.name
+    has_logs = db.execute(select(JobLog.id).limit(1)).first() is not None
+    if dialect == "postgresql" and has_logs:
+        logger.warning(f"job_logs 缺少搜索索引 {SEARCH_INDEX}，日志搜索将扫描全表，请执行 alembic upgrade head")
+        return
+    if has_logs:
+        logger.info("为现有日志建立全文索引（需要扫描 job_logs）")
+    create_search_index(db)
+    db.commit()
+
+
+def restore_search_index(db: Session):
+    """job_logs 转换为分区表后，原表上有搜索索引时在父表上重建（原表的索引直接挂载，不重新构建），由调用方提交"""
+    if db.get_bind().dialect.name != "postgresql" or has_search_index(db):
+        return
+    exists = db.execute(text(
+        "SELECT 1 FROM pg_indexes i JOIN pg_inherits h ON h.inhrelid = to_regclass(i.tablename) "
+        "WHERE h.inhparent = to_regclass('job_logs') AND i.indexdef LIKE '%gin_trgm_ops%' LIMIT 1"
+    )).first()
+    if exists:
+        create_search_index(db)
+
+
+def _fts_available(db: Session) -> bool:
+    global _fts_ready
+    if _fts_ready is None:
+        _fts_ready = has_search_index(db)
+    return _fts_ready
+
+
+def split_terms(q: str) -> List[str]:
+    return [term for term in (q or "").split() if term]
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def search_condition(db: Session, q: str):
+    """q 对应的查询条件，q 为空时返回 None"""
+    terms = split_terms(q)
+    if not terms:
+        return None
+    dialect = db.get_bind().dialect.name
+    conditions = []
+
+    if dialect == "sqlite" and _fts_available(db):
+        indexed = [term for term in terms if len(term) >= MIN_INDEXED_CHARS]
+        if indexed:
+            # 每个词作为 FTS5 短语（双引号内的双引号写两次），多个词之间为 AND
+            match = " AND ".join('"' + term.replace('"', '""') + '"' for term in indexed)
+            conditions.append(JobLog.id.in_(
+                select(literal_column("rowid")).select_from(text(FTS_TABLE))
+                .where(text(f"{FTS_TABLE} MATCH :match").bindparams(match=match))
+            ))
+        terms = [term for term in terms if len(term) < MIN_INDEXED_CHARS]
+
+    for term in terms:
+        pattern = _like_pattern(term)
+        if dialect == "postgresql":
+            conditions.append(literal_column(_DOCUMENT).ilike(pattern, escape="\\"))
+        else:
+            conditions.append(or_(
+                JobLog.job_id.ilike(pattern, escape="\\"),
+                JobLog.message.ilike(pattern, escape="\\"),
+                JobLog.output.ilike(pattern, escape="\\"),
+            ))
+    return and_(*conditions)
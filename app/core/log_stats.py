@@ -0,0 +1,345 @@
+"""
+日志汇总统计
+
+log_stats 表按任务（以及 job_id 为 LOG_STATS_ALL 的全局行）保存日志条数、成功 / 失败数、最早 / 最新时间
+和任务输出的原始 / 存储字节数，
+日志写入器在同一事务内累加，清理日志时扣减，读取统计只需按主键取一行。
+计数出现偏差时（如直接操作数据库删除日志）可执行 reconcile_log_stats 按 job_logs 重新计算。
+
+加锁顺序：写入和清理都先更新全局行再更新任务行，校准时先锁全局行，保证三者互相等待而不会死锁。
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import DateTime, bindparam, case, delete, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models.sql_model import JobLog, LOG_STATS_ALL, LogStat
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_stats = LogStat.__table__
+_logs = JobLog.__table__
+
+# 单条语句中 IN 列表的最大长度
+_IN_CHUNK = 500
+
+_increment = update(_stats).where(_stats.c.job_id == bindparam("b_job_id")).values(
+    total_count=_stats.c.total_count + bindparam("b_total"),
+    success_count=_stats.c.success_count + bindparam("b_success"),
+    fail_count=_stats.c.fail_count + bindparam("b_fail"),
+    output_bytes=_stats.c.output_bytes + bindparam("b_output_bytes"),
+    stored_bytes=_stats.c.stored_bytes + bindparam("b_stored_bytes"),
+    oldest_timestamp=case(
+        (or_(_stats.c.oldest_timestamp.is_(None),
+             _stats.c.oldest_timestamp > bindparam("b_oldest", type_=DateTime)),
+         bindparam("b_oldest", type_=DateTime)),
+        else_=_stats.c.oldest_timestamp,
+    ),
+    newest_timestamp=case(
+        (or_(_stats.c.newest_timestamp.is_(None),
+             _stats.c.newest_timestamp < bindparam("b_newest", type_=DateTime)),
+         bindparam("b_newest", type_=DateTime)),
+        else_=_stats.c.newest_timestamp,
+    ),
+    updated_at=bindparam("b_updated_at", type_=DateTime),
+)
+
+_decrement = update(_stats).where(_stats.c.job_id == bindparam("b_job_id")).values(
+    total_count=_stats.c.total_count - bindparam("b_total"),
+    success_count=_stats.c.success_count - bindparam("b_success"),
+    fail_count=_stats.c.fail_count - bindparam("b_fail"),
+    output_bytes=_stats.c.output_bytes - bindparam("b_output_bytes"),
+    stored_bytes=_stats.c.stored_bytes - bindparam("b_stored_bytes"),
+    updated_at=bindparam("b_updated_at", type_=DateTime),
+)
+
+
+def _insert_ignore(db: Session, job_ids: Iterable[str]):
+    """补齐缺少的汇总行（计数为 0），已存在的行保持不变"""
+    rows = [{"job_id": job_id, "total_count": 0, "success_count": 0, "fail_count": 0,
+             "output_bytes": 0, "stored_bytes": 0, "updated_at": datetime.utcnow()} for job_id in job_ids]
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        existing = set()
+        for i in range(0, len(rows), _IN_CHUNK):
+            keys = [row["job_id"] for row in rows[i:i + _IN_CHUNK]]
+            existing.update(db.scalars(select(_stats.c.job_id).where(_stats.c.job_id.in_(keys))))
+        rows = [row for row in rows if row["job_id"] not in existing]
+        if rows:
+            db.execute(_stats.insert(), rows)
+        return
+    db.execute(dialect_insert(_stats).on_conflict_do_nothing(index_elements=["job_id"]), rows)
+
+
+def _params(job_id: str, total: int, success: int, fail: int, output_bytes: int = 0, stored_bytes: int = 0,
+            oldest=None, newest=None, now: datetime = None) -> Dict[str, Any]:
+    return {"b_job_id": job_id, "b_total": total, "b_success": success, "b_fail": fail,
+            "b_output_bytes": output_bytes, "b_stored_bytes": stored_bytes,
+            "b_oldest": oldest, "b_newest": newest, "b_updated_at": now or datetime.utcnow()}
+
+
+def _sum_entries(per_job: Dict[str, list]) -> list:
+    """把按任务的 [total, success, fail, output_bytes, stored_bytes, ...] 累加为全局行"""
+    return [sum(entry[i] for entry in per_job.values()) for i in range(5)]
+
+
+def record_logs(db: Session, rows: List[Dict[str, Any]]):
+    """在写入日志的事务中累加汇总统计，rows 与插入 job_logs 的参数相同，由调用方提交"""
+    if not rows:
+        return
+    now = datetime.utcnow()
+    # {job_id: [total, success, fail, output_bytes, stored_bytes, oldest, newest]}
+    per_job: Dict[str, list] = {}
+    for row in rows:
+        ok = bool(row["status"])
+        timestamp = row["timestamp"]
+        output_bytes, stored_bytes = row.get("output_size") or 0, row.get("output_stored_size") or 0
+        entry = per_job.get(row["job_id"])
+        if entry is None:
+            per_job[row["job_id"]] = [1, int(ok), int(not ok), output_bytes, stored_bytes, timestamp, timestamp]
+            continue
+        entry[0] += 1
+        entry[1 if ok else 2] += 1
+        entry[3] += output_bytes
+        entry[4] += stored_bytes
+        entry[5] = min(entry[5], timestamp)
+        entry[6] = max(entry[6], timestamp)
+
+    oldest = min(entry[5] for entry in per_job.values())
+    newest = max(entry[6] for entry in per_job.values())
+    global_params = _params(LOG_STATS_ALL, *_sum_entries(per_job), oldest=oldest, newest=newest, now=now)
+    if db.execute(_increment, [global_params]).rowcount == 0:
+        _insert_ignore(db, [LOG_STATS_ALL])
+        db.execute(_increment, [global_params])
+
+    job_ids = sorted(per_job)
+    _insert_ignore(db, job_ids)
+    db.execute(_increment, [_params(job_id, *per_job[job_id][:5], oldest=per_job[job_id][5],
+                                    newest=per_job[job_id][6], now=now) for job_id in job_ids])
+
+
+def _refresh_timestamps(db: Session, job_ids: List[str]):
+    """按 job_logs 重新读取最早 / 最新时间（走 (job_id, timestamp) 与 (timestamp, id) 索引）"""
+    db.execute(update(_stats).where(_stats.c.job_id == LOG_STATS_ALL).values(
+        oldest_timestamp=select(func.min(_logs.c.timestamp)).scalar_subquery(),
+        newest_timestamp=select(func.max(_logs.c.timestamp)).scalar_subquery(),
+    ))
+    for i in range(0, len(job_ids), _IN_CHUNK):
+        db.execute(update(_stats).where(_stats.c.job_id.in_(job_ids[i:i + _IN_CHUNK])).values(
+            oldest_timestamp=select(func.min(_logs.c.timestamp))
+            .where(_logs.c.job_id == _stats.c.job_id).scalar_subquery(),
+            newest_timestamp=select(func.max(_logs.c.timestamp))
+            .where(_logs.c.job_id == _stats.c.job_id).scalar_subquery(),
+        ))
+
+
+def aggregate_logs(db: Session, condition=None, source=None) -> Dict[str, list]:
+    """
+    按任务聚合 source（默认 job_logs）中满足 condition 的日志：
+    {job_id: [total, success, fail, output_bytes, stored_bytes]}
+    """
+    source = _logs if source is None else source
+    query = select(
+        source.c.job_id, source.c.status, func.count(),
+        func.sum(func.coalesce(source.c.output_size, 0)), func.sum(func.coalesce(source.c.output_stored_size, 0)),
+    ).group_by(source.c.job_id, source.c.status)
+    if condition is not None:
+        query = query.where(condition)
+    per_job: Dict[str, list] = {}
+    for job_id, status, count, output_bytes, stored_bytes in db.execute(query).all():
+        entry = per_job.setdefault(job_id, [0, 0, 0, 0, 0])
+        entry[0] += count
+        entry[1 if status else 2] += count
+        entry[3] += int(output_bytes or 0)
+        entry[4] += int(stored_bytes or 0)
+    return per_job
+
+
+def forget_logs(db: Session, per_job: Dict[str, list]):
+    """日志删除后从汇总统计中扣减 aggregate_logs 的结果，并重新读取最早 / 最新时间，由调用方提交"""
+    if not per_job:
+        return
+    now = datetime.utcnow()
+    job_ids = sorted(per_job)
+    db.execute(_decrement, [_params(LOG_STATS_ALL, *_sum_entries(per_job), now=now)])
+    db.execute(_decrement, [_params(job_id, *per_job[job_id], now=now) for job_id in job_ids])
+    db.execute(delete(_stats).where(_stats.c.job_id != LOG_STATS_ALL, _stats.c.total_count <= 0))
+    _refresh_timestamps(db, job_ids)
+
+
+def delete_logs(db: Session, condition) -> int:
+    """
+    删除满足 condition 的日志并扣减汇总统计，返回删除条数，由调用方提交
+
+    先按 (job_id, status) 聚合将要删除的日志，再执行删除；删除条数与聚合结果不一致时
+    （另一个进程同时在清理）对涉及的任务重新计数。
+    """
+    per_job = aggregate_logs(db, condition)
+    if not per_job:
+        return 0
+
+    deleted = db.execute(delete(_logs).where(condition)).rowcount
+    expected = sum(entry[0] for entry in per_job.values())
+    if deleted != expected:
+        job_ids = sorted(per_job)
+        logger.warning(f"日志删除条数 {deleted} 与预期 {expected} 不一致，重新计数 {len(job_ids)} 个任务的统计")
+        _recount(db, job_ids)
+        return deleted
+
+    forget_logs(db, per_job)
+    return deleted
+
+
+def clear_log_stats(db: Session):
+    """清空全部日志后重置统计，由调用方提交"""
+    db.execute(delete(_stats).where(_stats.c.job_id != LOG_STATS_ALL))
+    db.execute(update(_stats).where(_stats.c.job_id == LOG_STATS_ALL).values(
+        total_count=0, success_count=0, fail_count=0, output_bytes=0, stored_bytes=0,
+        oldest_timestamp=None, newest_timestamp=None, updated_at=datetime.utcnow(),
+    ))
+
+
+def read_log_stats(db: Session, job_id: str = None) -> Dict[str, Any]:
+    """读取汇总统计，job_id 为空时返回全部日志的汇总"""
+    row = db.get(LogStat, job_id or LOG_STATS_ALL)
+    if row is None:
+        return {"total_count": 0, "success_count": 0, "fail_count": 0,
+                "oldest_timestamp": None, "newest_timestamp": None, "output_bytes": 0, "stored_bytes": 0}
+    return {
+        "total_count": row.total_count,
+        "success_count": row.success_count,
+        "fail_count": row.fail_count,
+        "output_bytes": row.output_bytes,
+        "stored_bytes": row.stored_bytes,
+        "oldest_timestamp": row.oldest_timestamp.isoformat() if row.oldest_timestamp else None,
+        "newest_timestamp": row.newest_timestamp.isoformat() if row.newest_timestamp else None,
+    }
+
+
+def _actual_stats(db: Session, job_ids: Optional[List[str]] = None) -> Dict[str, tuple]:
+    """按 job_logs 聚合 (total, success, fail, output_bytes, stored_bytes, oldest, newest)，job_ids 为空时统计全部任务"""
+    query = select(
+        _logs.c.job_id,
+        func.count(),
+        func.sum(case((_logs.c.status, 1), else_=0)),
+        func.sum(func.coalesce(_logs.c.output_size, 0)),
+        func.sum(func.coalesce(_logs.c.output_stored_size, 0)),
+        func.min(_logs.c.timestamp),
+        func.max(_logs.c.timestamp),
+    ).group_by(_logs.c.job_id)
+    if job_ids is None:
+        rows = db.execute(query).all()
+    else:
+        rows = []
+        for i in range(0, len(job_ids), _IN_CHUNK):
+            rows.extend(db.execute(query.where(_logs.c.job_id.in_(job_ids[i:i + _IN_CHUNK]))).all())
+    return {job_id: (total, int(success or 0), total - int(success or 0), int(output_bytes or 0),
+                     int(stored_bytes or 0), oldest, newest)
+            for job_id, total, success, output_bytes, stored_bytes, oldest, newest in rows}
+
+
+def _lock_global_row(db: Session):
+    """先更新全局行取得行锁（SQLite 为写锁），之后读到的 job_logs 与汇总表一致"""
+    if db.execute(update(_stats).where(_stats.c.job_id == LOG_STATS_ALL)
+                  .values(updated_at=datetime.utcnow())).rowcount == 0:
+        _insert_ignore(db, [LOG_STATS_ALL])
+
+
+def _write_stats(db: Session, job_id: str, values: tuple):
+    total, success, fail, output_bytes, stored_bytes, oldest, newest = values
+    db.execute(update(_stats).where(_stats.c.job_id == job_id).values(
+        total_count=total, success_count=success, fail_count=fail,
+        output_bytes=output_bytes, stored_bytes=stored_bytes, oldest_timestamp=oldest, newest_timestamp=newest, updated_at=datetime.utcnow(),
+    ))
+
+
+def _recount(db: Session, job_ids: List[str]):
+    """按 job_logs 重新计算指定任务与全局行的统计"""
+    actual = _actual_stats(db, job_ids)
+    total, success, output_bytes, stored_bytes = db.execute(
+        select(func.count(), func.sum(case((_logs.c.status, 1), else_=0)),
+               func.sum(func.coalesce(_logs.c.output_size, 0)), func.sum(func.coalesce(_logs.c.output_stored_size, 0)))
+        .select_from(_logs)
+    ).one()
+    success = int(success or 0)
+    _write_stats(db, LOG_STATS_ALL, (total, success, total - success, int(output_bytes or 0),
+                                     int(stored_bytes or 0), None, None))
+    for job_id in job_ids:
+        if job_id in actual:
+            _write_stats(db, job_id, actual[job_id])
+    missing = [job_id for job_id in job_ids if job_id not in actual]
+    for i in range(0, len(missing), _IN_CHUNK):
+        db.execute(delete(_stats).where(_stats.c.job_id.in_(missing[i:i + _IN_CHUNK])))
+    _refresh_timestamps(db, [])
+
+
+def reconcile_log_stats(db: Session, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    按 job_logs 全表聚合重新计算汇总统计，返回存在偏差的任务
+
+    需要扫描整张日志表，只在怀疑计数有偏差时手动执行（scripts/reconcile_log_stats.py）。
+    dry_run 为 True 时只比较不写入。
+    """
+    _lock_global_row(db)
+    actual = _actual_stats(db)
+    actual[LOG_STATS_ALL] = (
+        *(sum(values[i] for values in actual.values()) for i in range(5)),
+        min((values[5] for values in actual.values()), default=None),
+        max((values[6] for values in actual.values()), default=None),
+    )
+
+    current = {
+        row.job_id: (row.total_count, row.success_count, row.fail_count, row.output_bytes, row.stored_bytes,
+                     row.oldest_timestamp, row.newest_timestamp)
+        for row in db.execute(select(_stats)).all()
+    }
+    empty = (0, 0, 0, 0, 0, None, None)
+    drift = []
+    for job_id in sorted(set(actual) | set(current)):
+        expected = actual.get(job_id, empty)
+        recorded = current.get(job_id, empty)
+        if expected != recorded:
+            drift.append({
+                "job_id": job_id,
+                "recorded": {"total_count": recorded[0], "success_count": recorded[1], "fail_count": recorded[2]},
+                "actual": {"total_count": expected[0], "success_count": expected[1], "fail_count": expected[2]},
+            })
+
+    if dry_run:
+        db.rollback()
+    else:
+        drifted = [item["job_id"] for item in drift]
+        _insert_ignore(db, [job_id for job_id in drifted if job_id in actual])
+        for job_id in drifted:
+            if job_id in actual:
+                _write_stats(db, job_id, actual[job_id])
+        stale = [job_id for job_id in drifted if job_id not in actual]
+        for i in range(0, len(stale), _IN_CHUNK):
+            db.execute(delete(_stats).where(_stats.c.job_id.in_(stale[i:i + _IN_CHUNK])))
+        db.commit()
+        if drift:
+            logger.info(f"日志统计校准完成: {len(drift)} 行存在偏差，已按 job_logs 重新计算")
+
+    return {"jobs": len(actual) - 1, "drift_count": len(drift), "drift": drift, "dry_run": dry_run}
+
+
+def ensure_log_stats(db: Session):
+    """启动时检查：汇总表没有全局行而 job_logs 已有日志（从旧版本升级）时全量计算一次"""
+    if db.get(LogStat, LOG_STATS_ALL) is not None:
+        return
+    if db.execute(select(_logs.c.id).limit(1)).first() is None:
+        _insert_ignore(db, [LOG_STATS_ALL])
+        db.commit()
+        return
+    logger.info("日志统计表为空，按现有日志初始化（需要扫描 job_logs）")
+    reconcile_log_stats(db)
@@ -0,0 +1,106 @@
+"""
+任务输出外部存储（按内容寻址）
+
+超过 LOG_OUTPUT_SPILL_MIN_BYTES 的任务输出不写入数据库，而是以 SHA-256 为文件名写入 LOG_OUTPUT_SPILL_DIR，
+job_logs 只保存摘要（output_ref）和开头的预览；内容相同的输出只保存一份。
+
+文件按摘要前两级目录分散存放（ab/cd/abcd...），先写临时文件再原子改名，读取时用 mmap 按区间返回，
+不会把整个文件读入内存。多副本部署时该目录需要共享（挂载同一个卷）。
+没有日志引用的文件由 sweep 按修改时间清理；重复写入已存在的文件会刷新修改时间，避免刚写入尚未提交的日志的文件被清理。
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import re
+import tempfile
+import time
+from typing import Dict, Iterable, Iterator, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+
+class OutputStore:
+    """按 SHA-256 寻址的输出文件目录"""
+
+    def __init__(self, root: str, chunk_size: int = 65536):
+        self.root = root
+        self.chunk_size = max(1024, chunk_size)
+
+    def path(self, digest: str) -> str:
+        if not _DIGEST.match(digest or ""):
+            raise ValueError(f"无效的输出引用 '{digest}'")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def put(self, data: bytes) -> str:
+        """写入一份输出，返回摘要；相同内容已存在时不重复写入"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            os.utime(path)
+            return digest
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        return digest
+
+    def size(self, digest: str) -> Optional[int]:
+        """文件大小，文件不存在时返回 None"""
+        try:
+            return os.path.getsize(self.path(digest))
+        except FileNotFoundError:
+            return None
+
+    def iter_range(self, digest: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """按 [start, end] 闭区间分块读取文件（mmap），end 为空时读到文件末尾"""
+        with open(self.path(digest), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return
+            end = size - 1 if end is None else min(end, size - 1)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                position = start
+                while position <= end:
+                    stop = min(position + self.chunk_size, end + 1)
+                    yield mm[position:stop]
+                    position = stop
+
+    def sweep(self, referenced: Iterable[str], min_age: float = 3600) -> Dict[str, int]:
+        """删除没有被引用且修改时间早于 min_age 秒的文件，返回删除的文件数和字节数"""
+        referenced = set(referenced)
+        deadline = time.time() - min_age
+        removed = {"files": 0, "bytes": 0, "kept": 0}
+        if not os.path.isdir(self.root):
+            return removed
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                # 写入中断留下的临时文件同样按修改时间清理
+                if name in referenced or stat.st_mtime > deadline:
+                    removed["kept"] += 1
+                    continue
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    continue
+                removed["files"] += 1
+                removed["bytes"] += stat.st_size
+        return removed
@@ -0,0 +1,121 @@
+"""
+分页工具
+
+游标分页按 (时间, id) 倒序定位下一页，查询只读取 limit + 1 行，耗时与页码无关；
+总数可选精确计数（短时间缓存）、估算或不计算。
+"""
+
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import func, select, text, tuple_
+
+COUNT_MODES = ("exact", "estimate", "none")
+
+
+def encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key), ensure_ascii=False).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")))
+    except Exception:
+        raise ValueError("无效的分页游标")
+
+
+def keyset_page(query, time_column, id_column, limit: int, cursor: str = None,
+                page: int = 1) -> Tuple[List[Any], Optional[str]]:
+    """
+    按 (time_column, id_column) 倒序取一页
+
+    传入 cursor 时从游标之后开始，忽略 page；否则按 page 使用 OFFSET，兼容旧的页码分页。
+    返回 (行列表, next_cursor)，没有下一页时 next_cursor 为 None
+    """
+    query = query.order_by(time_column.desc(), id_column.desc())
+    if cursor:
+        try:
+            cursor_time, cursor_id = decode_cursor(cursor)
+            cursor_time = datetime.fromisoformat(cursor_time)
+        except (TypeError, ValueError):
+            raise ValueError("无效的分页游标")
+        query = query.filter(tuple_(time_column, id_column) < tuple_(cursor_time, cursor_id))
+    elif page > 1:
+        query = query.offset((page - 1) * limit)
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    time_key, id_key = time_column.key, id_column.key
+    return rows, encode_cursor((getattr(last, time_key).isoformat(), getattr(last, id_key)))
+
+
+class CountCache:
+    """按查询条件缓存精确总数，翻页时不必每页重新计数"""
+
+    def __init__(self, ttl: float = 10.0, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._values: Dict[Hashable, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def get_or_count(self, key: Hashable, query) -> int:
+        if self.ttl <= 0:
+            return query.count()
+        now = time.monotonic()
+        with self._lock:
+            cached = self._values.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        value = query.count()
+        with self._lock:
+            if len(self._values) >= self.max_entries:
+                self._values = {k: v for k, v in self._values.items() if v[0] > now}
+                if len(self._values) >= self.max_entries:
+                    self._values.clear()
+            self._values[key] = (now + self.ttl, value)
+        return value
+
+
+def estimate_rows(db, model) -> Optional[int]:
+    """
+    不带筛选条件时的总行数估算，避免全表计数
+
+    PostgreSQL 读取 pg_class.reltuples（ANALYZE 统计，分区表累加各分区）；SQLite 用自增主键范围估算
+    （日志只从最早的一端清理，误差很小）；无法估算时返回 None
+    """
+    dialect = db.get_bind().dialect.name
+    table = model.__table__
+    if dialect == "postgresql":
+        values = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE (oid = CAST(:table AS regclass) AND relkind <> 'p') "
+                 "OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = CAST(:table AS regclass))"),
+            {"table": table.name},
+        ).scalars().all()
+        values = [value for value in values if value is not None and value >= 0]
+        return int(sum(values)) if values else None
+    if dialect == "sqlite":
+        low, high = db.execute(select(func.min(table.c.id), func.max(table.c.id))).one()
+        return 0 if low is None else high - low + 1
+    return None
+
+
+def page_count(db, model, query, mode: str, filters: tuple, cache: CountCache) -> Optional[int]:
+    """按 mode 计算总数：exact 精确计数（短时间缓存）；estimate 无筛选时估算，有筛选时同 exact；none 不计算"""
+    if mode not in COUNT_MODES:
+        raise ValueError(f"不支持的计数方式 '{mode}'，可选: {', '.join(COUNT_MODES)}")
+    if mode == "none":
+        return None
+    if mode == "estimate" and not any(value is not None for value in filters):
+        estimated = estimate_rows(db, model)
+        if estimated is not None:
+            return estimated
+    return cache.get_or_count((model.__tablename__,) + filters, query)
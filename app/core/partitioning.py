@@ -0,0 +1,229 @@
+"""
+按时间范围分区（仅 PostgreSQL）
+
+job_logs 按 timestamp、alert_history 按 sent_at 建为 RANGE 分区表，每天或每月一个分区，
+提前创建未来的分区；保留期清理直接 DROP（或 DETACH）整个过期分区，不产生逐行 DELETE 的死元组和 VACUUM 压力。
+
+分区表的主键必须包含分区键，因此分区后主键为 (id, 时间列)，id 仍由原序列生成。
+已有的普通表可转换为分区表：原表改名为 <表名>_legacy 作为覆盖过去全部时间的第一个分区挂载，
+其中最新的日志过期后整个分区被删除。
+"""
+
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import DefaultClause, MetaData, PrimaryKeyConstraint, column, func, inspect, select, table, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PARTITION_INTERVALS = ("daily", "monthly")
+RETENTION_MODES = ("drop", "detach")
+
+_BOUND = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+Partition = Tuple[str, Optional[datetime], Optional[datetime]]
+
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    value = value.strip()
+    if value.upper() in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+
+def _literal(value: datetime) -> str:
+    return f"'{value:%Y-%m-%d %H:%M:%S}'"
+
+
+def _overlaps(start: datetime, end: datetime, lower: Optional[datetime], upper: Optional[datetime]) -> bool:
+    return (lower is None or lower < end) and (upper is None or start < upper)
+
+
+class TimePartitioning:
+    """一张表的时间分区布局：分区命名、建表、预建分区和按保留期移除分区"""
+
+    def __init__(self, model, time_column: str, interval: str, premake: int = 3):
+        if interval not in PARTITION_INTERVALS:
+            raise ValueError(f"不支持的分区方式 '{interval}'，可选: {', '.join(PARTITION_INTERVALS)}")
+        self.table = model.__table__
+        self.name = self.table.name
+        self.time_column = time_column
+        self.interval = interval
+        self.premake = max(0, premake)
+
+    def period_start(self, value: datetime) -> datetime:
+        if self.interval == "daily":
+            return datetime(value.year, value.month, value.day)
+        return datetime(value.year, value.month, 1)
+
+    def next_period(self, start: datetime) -> datetime:
+        if self.interval == "daily":
+            return start + timedelta(days=1)
+        return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+    def partition_name(self, start: datetime) -> str:
+        return f"{self.name}_p{start:%Y%m%d}" if self.interval == "daily" else f"{self.name}_p{start:%Y%m}"
+
+    def source(self, partition: str):
+        """按分区名查询的轻量表对象，用于统计将要移除的分区"""
+        return table(partition, *(column(c.name) for c in self.table.columns))
+
+    def is_partitioned(self, db: Session) -> Optional[bool]:
+        """表不存在时返回 None"""
+        relkind = db.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+                             {"name": self.name}).scalar()
+        return None if relkind is None else relkind == "p"
+
+    def partitions(self, db: Session) -> List[Partition]:
+        """现有分区 (名称, 下界, 上界)，按下界排序；MINVALUE / MAXVALUE 为 None，DEFAULT 分区不返回"""
+        rows = db.execute(text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:name)"
+        ), {"name": self.name}).all()
+        result = []
+        for name, bound in rows:
+            match = _BOUND.search(bound or "")
+            if match:
+                result.append((name, _parse_bound(match.group(1)), _parse_bound(match.group(2))))
+        return sorted(result, key=lambda p: p[1] or datetime.min)
+
+    def _ddl(self, name: str, partitioned: bool, sequence: str = None) -> List[str]:
+        """按模型生成建表和索引语句；sequence 不为空时 id 使用该序列而不是新建 SERIAL"""
+        metadata = MetaData()
+        copy = self.table.to_metadata(metadata, name=name)
+        if partitioned:
+            copy.c[self.time_column].primary_key = True
+            copy.append_constraint(PrimaryKeyConstraint("id", self.time_column, name=f"{name}_pkey"))
+            copy.dialect_options["postgresql"]["partition_by"] = f'RANGE ("{self.time_column}")'
+        if sequence:
+            copy.c.id.server_default = DefaultClause(text(f"nextval('{sequence}'::regclass)"))
+            copy.c.id.server_default.column = copy.c.id
+            copy.c.id.autoincrement = False
+        dialect = postgresql.dialect()
+        statements = [str(CreateTable(copy).compile(dialect=dialect))]
+        if name == self.name:
+            statements += [str(CreateIndex(index).compile(dialect=dialect)) for index in copy.indexes]
+        return statements
+
+    def _columns(self, db: Session, name: str) -> List[str]:
+        return [c["name"] for c in inspect(db.connection()).get_columns(name)]
+
+    def create(self, db: Session) -> List[str]:
+        """新建分区父表并创建当前及未来的分区，由调用方提交"""
+        for statement in self._ddl(self.name, partitioned=True):
+            db.execute(text(statement))
+        logger.info(f"已创建分区表 {self.name}（{self.interval}）")
+        return self.ensure_partitions(db)
+
+    def ensure_partitions(self, db: Session, now: datetime = None) -> List[str]:
+        """创建当前周期及之后 premake 个周期中缺少的分区，与已有分区重叠的周期跳过；返回新建的分区名"""
+        existing = self.partitions(db)
+        start = self.period_start(now or datetime.utcnow())
+        created = []
+        for _ in range(self.premake + 1):
+            end = self.next_period(start)
+            if not any(_overlaps(start, end, lower, upper) for _, lower, upper in existing):
+                name = self.partition_name(start)
+                db.execute(text(
+                    f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{self.name}" '
+                    f'FOR VALUES FROM ({_literal(start)}) TO ({_literal(end)})'
+                ))
+                created.append(name)
+            start = end
+        if created:
+            logger.info(f"已创建分区: {', '.join(created)}")
+        return created
+
+    def expired(self, db: Session, cutoff: datetime) -> List[Partition]:
+        """上界不晚于 cutoff 的分区，其中的数据全部早于 cutoff"""
+        return [p for p in self.partitions(db) if p[2] is not None and p[2] <= cutoff]
+
+    def remove(self, db: Session, partition: str, mode: str = "drop"):
+        """DROP 或 DETACH 一个分区，由调用方提交；DETACH 后分区成为独立的表，可另行归档"""
+        if mode not in RETENTION_MODES:
+            raise ValueError(f"不支持的分区清理方式 '{mode}'，可选: {', '.join(RETENTION_MODES)}")
+        if mode == "detach":
+            db.execute(text(f'ALTER TABLE "{self.name}" DETACH PARTITION "{partition}"'))
+        else:
+            db.execute(text(f'DROP TABLE "{partition}"'))
+
+    def convert(self, db: Session) -> Dict[str, object]:
+        """
+        把已有的普通表转换为分区表，由调用方提交
+
+        原表改名为 <表名>_legacy，挂载为 (MINVALUE, 原表最新数据所在周期的下一周期) 的分区；
+        挂载时需要扫描原表校验范围并重建 (id, 时间列) 主键，数据量大时请在维护窗口执行。
+        """
+        state = self.is_partitioned(db)
+        if state is None:
+            raise ValueError(f"表 {self.name} 不存在")
+        if state:
+            return {"table": self.name, "converted": False, "partitions": []}
+
+        legacy = f"{self.name}_legacy"
+        sequence = db.execute(text("SELECT pg_get_serial_sequence(:name, 'id')"), {"name": self.name}).scalar()
+        newest = db.execute(select(func.max(self.table.c[self.time_column]))).scalar()
+        boundary = self.next_period(self.period_start(newest)) if newest else self.period_start(datetime.utcnow())
+
+        # 挂载要求列一致，原表缺少模型中后来新增的列时先补齐
+        existing = set(self._columns(db, self.name))
+        dialect = postgresql.dialect()
+        for c in self.table.columns:
+            if c.name not in existing:
+                db.execute(text(f'ALTER TABLE "{self.name}" ADD COLUMN {CreateColumn(c).compile(dialect=dialect)}'))
+        db.execute(text(f'ALTER TABLE "{self.name}" RENAME TO "{legacy}"'))
+        # 原主键 (id) 与父表主键 (id, 时间列) 冲突，挂载时按父表主键重新建立
+        pkey = db.execute(text(
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:name) AND contype = 'p'"
+        ), {"name": legacy}).scalar()
+        if pkey:
+            db.execute(text(f'ALTER TABLE "{legacy}" DROP CONSTRAINT "{pkey}"'))
+        index_names = db.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :name"
+        ), {"name": legacy}).scalars().all()
+        for index_name in index_names:
+            # 父表随后使用原来的索引名
+            renamed = index_name.replace(self.name, legacy, 1) if self.name in index_name else f"{legacy}_{index_name}"
+            db.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{renamed}"'))
+
+        for statement in self._ddl(self.name, partitioned=True, sequence=sequence):
+            db.execute(text(statement))
+        if sequence:
+            # 序列改为属于父表，删除 legacy 分区时不会连带删除序列
+            db.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY "{self.name}".id'))
+        db.execute(text(
+            f'ALTER TABLE "{self.name}" ATTACH PARTITION "{legacy}" FOR VALUES FROM (MINVALUE) TO ({_literal(boundary)})'
+        ))
+        created = self.ensure_partitions(db)
+        logger.info(f"表 {self.name} 已转换为分区表，原数据位于分区 {legacy}（早于 {boundary}）")
+        return {"table": self.name, "converted": True, "legacy_until": boundary.isoformat(), "partitions": created}
+
+    def unconvert(self, db: Session) -> bool:
+        """把分区表还原为普通表（复制全部数据），由调用方提交；表不是分区表时返回 False"""
+        if not self.is_partitioned(db):
+            return False
+        plain = f"{self.name}_plain"
+        sequence = db.execute(text("SELECT pg_get_serial_sequence(:name, 'id')"), {"name": self.name}).scalar()
+
+        for statement in self._ddl(plain, partitioned=False, sequence=sequence):
+            db.execute(text(statement))
+        columns = ", ".join(f'"{name}"' for name in self._columns(db, self.name))
+        db.execute(text(f'INSERT INTO "{plain}" ({columns}) SELECT {columns} FROM "{self.name}"'))
+        if sequence:
+            db.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+        db.execute(text(f'DROP TABLE "{self.name}" CASCADE'))
+        db.execute(text(f'ALTER TABLE "{plain}" RENAME TO "{self.name}"'))
+        db.execute(text(f'ALTER INDEX "{plain}_pkey" RENAME TO "{self.name}_pkey"'))
+        if sequence:
+            db.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY "{self.name}".id'))
+        dialect = postgresql.dialect()
+        for index in self.table.indexes:
+            db.execute(text(str(CreateIndex(index).compile(dialect=dialect))))
+        logger.info(f"分区表 {self.name} 已还原为普通表")
+        return True
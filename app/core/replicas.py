@@ -0,0 +1,138 @@
+"""
+只读副本路由
+
+配置 DB_REPLICA_URLS 后，日志列表、日志统计、告警历史和 AI 查询日志等只读流量使用 RoutingSession：
+
+- 不加锁的 SELECT 发往副本（每个会话固定一个，多个副本时轮流分配），
+  其余语句（INSERT / UPDATE / DELETE、SELECT ... FOR UPDATE、DDL）发往主库
+- 会话执行过写操作后，之后的查询全部发往主库（读到自己刚写入的数据）
+- use_primary(db) 或请求头 X-DB-Primary: true 让整个会话只使用主库，用于不能容忍复制延迟的读取
+- 副本连接失败时在 DB_REPLICA_RETRY_SECONDS 秒内不再使用，期间查询发往主库（当前会话也改用主库）
+
+调度器任务存储、日志写入、清理等后台操作始终使用主库。
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.sql.selectable import GenerativeSelect
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+USE_PRIMARY = "use_primary"
+REPLICA = "replica"
+READ_PRIMARY_HEADER = "X-DB-Primary"
+
+
+def is_read_only(clause) -> bool:
+    """不加锁的 SELECT（包括以 SELECT 开头的原生 SQL）"""
+    if isinstance(clause, GenerativeSelect):
+        return clause._for_update_arg is None
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip().lower().startswith("select")
+    return False
+
+
+def use_primary(db) -> None:
+    """让会话之后的查询都使用主库（同步会话和 AsyncSession 均可）"""
+    db.info[USE_PRIMARY] = True
+
+
+class ReplicaSet:
+    """一组副本引擎，轮流选择，连接失败的副本暂停使用一段时间"""
+
+    def __init__(self, engines: List[Engine], retry_after: float = 30.0):
+        self.engines = engines
+        self.retry_after = retry_after
+        self._cycle = itertools.cycle(range(len(engines)))
+        self._down_until: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._stats = {"replica_sessions": 0, "primary_sessions": 0, "failures": 0}
+        for index, replica in enumerate(engines):
+            event.listen(replica, "handle_error", self._error_listener(index))
+
+    def _error_listener(self, index: int):
+        def on_error(context):
+            # 查询过程中连接断开；建立连接失败由 pick 处理
+            if context.connection is not None and context.is_disconnect:
+                self.mark_down(index, context.original_exception)
+        return on_error
+
+    def mark_down(self, index: int, error: BaseException = None):
+        with self._lock:
+            self._down_until[index] = time.monotonic() + self.retry_after
+            self._stats["failures"] += 1
+        logger.warning(f"只读副本 {self.engines[index].url.render_as_string()} 连接失败，"
+                       f"{self.retry_after:g} 秒内查询改用主库: {error}")
+
+    def _next_available(self) -> Optional[int]:
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.engines)):
+                index = next(self._cycle)
+                if self._down_until.get(index, 0) <= now:
+                    return index
+        return None
+
+    def pick(self) -> Optional[Engine]:
+        """
+        为新会话选择下一个可用的副本，全部不可用时返回 None
+
+        选中时先取一次连接（连接池中已有连接时只做 pre_ping），连接失败的副本暂停使用并尝试下一个，
+        不会让当前请求失败
+        """
+        for _ in range(len(self.engines)):
+            index = self._next_available()
+            if index is None:
+                break
+            try:
+                with self.engines[index].connect():
+                    pass
+            except Exception as e:
+                self.mark_down(index, e)
+                continue
+            with self._lock:
+                self._stats["replica_sessions"] += 1
+            return self.engines[index]
+        with self._lock:
+            self._stats["primary_sessions"] += 1
+        return None
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            down = [self.engines[i].url.render_as_string() for i, until in self._down_until.items() if until > now]
+            return {**self._stats, "replicas": len(self.engines), "down": down}
+
+
+def routing_session_class(primary: Engine, replicas: ReplicaSet) -> type:
+    """
+    按语句选择主库或副本的 Session 子类
+
+    AsyncSession 使用时传入异步引擎的 sync_engine（async_sessionmaker 的 sync_session_class）
+    """
+
+    class RoutingSession(Session):
+        def get_bind(self, mapper=None, clause=None, **kw):
+            if self.info.get(USE_PRIMARY):
+                return primary
+            if self._flushing or (clause is not None and not is_read_only(clause)):
+                self.info[USE_PRIMARY] = True
+                return primary
+            # 没有语句时（如 db.get_bind() 取方言）返回主库，不影响后续路由
+            if clause is None:
+                return primary
+            # 同一会话固定使用一个副本，分页查询和计数读到的是同一份数据
+            if REPLICA not in self.info:
+                self.info[REPLICA] = replicas.pick() or primary
+            return self.info[REPLICA]
+
+    return RoutingSession
@@ -1,14 +1,16 @@
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.routes import router
 from app.services.scheduler import start_scheduler, stop_scheduler
-from app.core.database import init_db
+from app.core.database import config_invalidator, dispose_async_engine, init_db
 from uvicorn.config import LOGGING_CONFIG
-from app.core.conf import HOST, PORT
+from app.core.conf import HOST, METRICS_ENABLED, PORT
 from app.middleware.auth import APIKeyMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.services import metrics
 
 
 @asynccontextmanager
@@ -17,6 +19,9 @@ async def lifespan(app: FastAPI):
     start_scheduler()
     yield
     stop_scheduler()
+    if config_invalidator is not None:
+        config_invalidator.stop()
+    await dispose_async_engine()
 
 
 LOGGING_CONFIG["formatters"]["default"]["fmt"] = "%(asctime)s | %(levelprefix)s| %(funcName)s:%(lineno)d - %(message)s"
@@ -35,6 +40,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(router)
 
 
@@ -43,6 +51,12 @@ async def health_check():
     return {"status": "ok"}
 
 
+if METRICS_ENABLED:
+    @app.get("/metrics", summary="Prometheus 指标", include_in_schema=False)
+    async def prometheus_metrics():
+        return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host=HOST, port=PORT)
\ No newline at end of file
@@ -1,10 +1,18 @@
 """
 API Key 认证中间件
+
+纯 ASGI 实现，不经过 BaseHTTPMiddleware 的请求/响应包装，SSE 等流式响应直接透传；
+认证配置从进程内配置缓存读取，缓存过期需要重新加载时在线程池中查询数据库，不阻塞事件循环。
 """
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+import hmac
+
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import JSONResponse
 
+from app.core.conf import API_KEY, API_KEY_ENABLED, METRICS_PUBLIC
+from app.core.database import config_cache
+from app.models.sql_model import DEFAULT_CONFIG
+
 
 PUBLIC_PATHS = [
     "/docs",
@@ -22,75 +30,101 @@ AI_PATHS = [
     "/ai/config",
 ]
 
+_AI_EXACT = frozenset(AI_PATHS)
+_AI_PREFIXES = tuple(ai_path + "/" for ai_path in AI_PATHS)
+
+_API_KEY_HEADER = b"x-api-key"
+
+
+def _config_value(values: dict, key: str, default: str) -> str:
+    return values.get(key) or default or DEFAULT_CONFIG.get(key, {}).get("value", "")
+
+
+class _AuthConfig:
+    """按配置缓存快照计算认证配置，快照不变时直接复用"""
+
+    def __init__(self):
+        self._snapshot = None
+        self._value = (True, API_KEY.encode(), b"")
+
+    async def get(self):
+        if not API_KEY_ENABLED:
+            return False, API_KEY.encode(), b""
+
+        values = config_cache.peek()
+        if values is None:
+            try:
+                values = await run_in_threadpool(config_cache.get_all)
+            except Exception:
+                return True, API_KEY.encode(), b""
+
+        if values is not self._snapshot:
+            enabled = _config_value(values, "api_key_enabled", "true").lower() in ("true", "1", "yes")
+            key = _config_value(values, "api_key", API_KEY)
+            agent_key = _config_value(values, "ai_agent_api_key", "")
+            self._value = (enabled, key.encode(), agent_key.encode())
+            self._snapshot = values
+        return self._value
+
+
+_auth_config = _AuthConfig()
 
-def _get_auth_config():
-    """获取认证配置"""
-    from app.core.conf import API_KEY, API_KEY_ENABLED
-    
-    if not API_KEY_ENABLED:
-        return False, API_KEY, ""
-    
-    try:
-        from app.core.database import _session_factory, get_config_bool, get_config
-        db = _session_factory()
-        try:
-            enabled = get_config_bool(db, "api_key_enabled", True)
-            key = get_config(db, "api_key", API_KEY)
-            agent_key = get_config(db, "ai_agent_api_key", "")
-            return enabled, key, agent_key
-        finally:
-            db.close()
-    except Exception:
-        return True, API_KEY, ""
+
+async def _get_auth_config():
+    """获取认证配置：(是否启用, API Key, AI Agent API Key)"""
+    return await _auth_config.get()
 
 
 def _is_ai_path(path: str) -> bool:
     """检查是否为 AI 相关路径"""
-    for ai_path in AI_PATHS:
-        if path == ai_path or path.startswith(ai_path + "/"):
-            return True
-    return False
-
-
-class APIKeyMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        auth_enabled, api_key, agent_api_key = _get_auth_config()
-        
-        if not auth_enabled:
-            return await call_next(request)
-        
-        path = request.url.path
-        
-        if path in PUBLIC_PATHS:
-            return await call_next(request)
-        
-        for public_path in PUBLIC_PATHS:
-            if path.startswith(public_path):
-                return await call_next(request)
-        
-        request_api_key = request.headers.get("X-API-Key")
-        
+    return path in _AI_EXACT or path.startswith(_AI_PREFIXES)
+
+
+def _unauthorized(msg: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=401,
+        content={
+            "code": 401,
+            "msg": msg,
+            "data": None
+        }
+    )
+
+
+class APIKeyMiddleware:
+    def __init__(self, app):
+        self.app = app
+        # str.startswith 接受元组，一次调用完成全部前缀匹配
+        self._public_prefixes = tuple(PUBLIC_PATHS + (["/metrics"] if METRICS_PUBLIC else []))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        auth_enabled, api_key, agent_api_key = await _get_auth_config()
+        path = scope["path"]
+
+        if not auth_enabled or path.startswith(self._public_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        request_api_key = None
+        for name, value in scope["headers"]:
+            if name == _API_KEY_HEADER:
+                request_api_key = value
+                break
+
         if not request_api_key:
-            return JSONResponse(
-                status_code=401,
-                content={
-                    "code": 401,
-                    "msg": "未授权：缺少 API Key",
-                    "data": None
-                }
-            )
-        
-        if _is_ai_path(path) and agent_api_key and request_api_key == agent_api_key:
-            return await call_next(request)
-        
-        if request_api_key != api_key:
-            return JSONResponse(
-                status_code=401,
-                content={
-                    "code": 401,
-                    "msg": "未授权：无效的 API Key",
-                    "data": None
-                }
-            )
-        
-        return await call_next(request)
+            await _unauthorized("未授权：缺少 API Key")(scope, receive, send)
+            return
+
+        if agent_api_key and _is_ai_path(path) and hmac.compare_digest(request_api_key, agent_api_key):
+            await self.app(scope, receive, send)
+            return
+
+        if not hmac.compare_digest(request_api_key, api_key):
+            await _unauthorized("未授权：无效的 API Key")(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
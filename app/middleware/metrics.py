@@ -0,0 +1,39 @@
+"""
+HTTP 请求耗时统计中间件
+
+纯 ASGI 实现，按路由模板（如 /jobs/{job_id}）而非实际路径分组，避免标签数量随 ID 增长；
+未匹配任何路由的请求统一记为 <unmatched>。
+"""
+import time
+
+from app.services.metrics import http_request_duration
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "<unmatched>"),
+                status_code,
+            )
@@ -40,11 +40,33 @@ class JobCreate(BaseModel):
     job_id: Optional[str] = None
     name: Optional[str] = None
     trigger_args: Optional[Dict[str, Any]] = None
+    executor: Optional[str] = None
     
     def get_job_id(self) -> Optional[str]:
         return self.id or self.job_id
 
 
+class JobBulkOperation(BaseModel):
+    action: str
+    func: Optional[str] = None
+    trigger: Optional[str] = None
+    args: Optional[List] = []
+    kwargs: Optional[Dict] = {}
+    id: Optional[str] = None
+    job_id: Optional[str] = None
+    name: Optional[str] = None
+    trigger_args: Optional[Dict[str, Any]] = None
+    executor: Optional[str] = None
+
+    def get_job_id(self) -> Optional[str]:
+        return self.id or self.job_id
+
+
+class JobBulkRequest(BaseModel):
+    operations: List[JobBulkOperation]
+    atomic: bool = True
+
+
 class JobResponse(BaseModel):
     id: str
     name: Optional[str] = None
@@ -53,6 +75,7 @@ class JobResponse(BaseModel):
     trigger: str
     args: List
     kwargs: dict
+    executor: Optional[str] = "default"
     status: str
 
 
@@ -62,6 +85,7 @@ class AvailableTask(BaseModel):
     description: str
     parameters: Union[int, Dict[str, Any]]
     is_custom: bool = False
+    executor: str = "default"
 
 
 class LogEntry(BaseModel):
@@ -79,7 +103,13 @@ class JobLogResponse(BaseModel):
     message: str
     duration: Optional[float] = None
     output: Optional[str] = None
+    output_encoding: Optional[str] = None
+    output_size: Optional[int] = None
+    output_stored_size: Optional[int] = None
+    output_truncated: bool = False
     timestamp: datetime
+    # 来自日志归档（include_archive=true，或数据库中已清理的日志详情）
+    archived: bool = False
     
     model_config = {
         "from_attributes": True
@@ -87,8 +117,9 @@ class JobLogResponse(BaseModel):
 
 
 class JobLogPage(BaseModel):
-    count: int
+    count: Optional[int] = None
     logs: List[JobLogResponse]
+    next_cursor: Optional[str] = None
 
 
 class AIChatRequest(BaseModel):
@@ -300,8 +331,9 @@ class AlertHistoryResponse(BaseModel):
 
 
 class AlertHistoryPage(BaseModel):
-    count: int
+    count: Optional[int] = None
     logs: List[AlertHistoryResponse]
+    next_cursor: Optional[str] = None
 
 
 class AlertTestResponse(BaseModel):
@@ -1,26 +1,69 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, Text, Boolean, Float, DateTime
+from sqlalchemy import BigInteger, Column, Integer, LargeBinary, String, Text, Boolean, Float, DateTime, Index, false, text
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import deferred
 
 Base = declarative_base()
 
 
 class JobLog(Base):
     __tablename__ = 'job_logs'
+    __table_args__ = (
+        # 按时间倒序分页、按时间清理、最早/最新日志
+        Index('ix_job_logs_timestamp_id', 'timestamp', 'id'),
+        # 按任务查看日志
+        Index('ix_job_logs_job_id_timestamp', 'job_id', 'timestamp'),
+        # 按状态筛选和成功 / 失败计数
+        Index('ix_job_logs_status_timestamp', 'status', 'timestamp'),
+        # 清理外部输出文件时查找仍被引用的文件（部分索引，不含没有外部文件的日志）
+        Index('ix_job_logs_output_ref', 'output_ref',
+              postgresql_where=text('output_ref IS NOT NULL'), sqlite_where=text('output_ref IS NOT NULL')),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     job_id = Column(String(128), nullable=False)
     status = Column(Boolean, nullable=False)
     message = Column(Text, nullable=False)
     duration = Column(Float, nullable=True)
+    # 压缩存储时 output 只保留开头的预览，完整输出在 output_data 中（列表查询不读取）；
+    # 写入外部文件时完整输出在 output_ref（SHA-256）指向的文件中
     output = Column(Text, nullable=True)
+    output_data = deferred(Column(LargeBinary, nullable=True))
+    output_ref = Column(String(64), nullable=True)
+    output_encoding = Column(String(16), nullable=True)
+    output_size = Column(Integer, nullable=True)
+    output_stored_size = Column(Integer, nullable=True)
+    output_truncated = Column(Boolean, nullable=False, default=False, server_default=false())
     timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     def __repr__(self):
         return f"<JobLog(id={self.id}, job_id={self.job_id}, status={self.status}, message={self.message}, duration={self.duration}, timestamp={self.timestamp})>"
 
 
+# log_stats 中全部日志汇总行的 job_id
+LOG_STATS_ALL = '*'
+
+
+class LogStat(Base):
+    """日志汇总统计，写入日志和清理日志时增量维护；job_id 为 LOG_STATS_ALL 的行是全部日志的汇总"""
+    __tablename__ = 'log_stats'
+
+    job_id = Column(String(128), primary_key=True)
+    total_count = Column(Integer, nullable=False, default=0)
+    success_count = Column(Integer, nullable=False, default=0)
+    fail_count = Column(Integer, nullable=False, default=0)
+    oldest_timestamp = Column(DateTime, nullable=True)
+    newest_timestamp = Column(DateTime, nullable=True)
+    # 任务输出原始大小与实际存储大小（字节）之和
+    output_bytes = Column(BigInteger, nullable=False, default=0, server_default='0')
+    stored_bytes = Column(BigInteger, nullable=False, default=0, server_default='0')
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<LogStat(job_id={self.job_id}, total_count={self.total_count}, fail_count={self.fail_count})>"
+
+
 class SystemConfig(Base):
     __tablename__ = 'system_config'
 
@@ -126,6 +169,10 @@ class AlertConfig(Base):
 
 class AlertHistory(Base):
     __tablename__ = 'alert_history'
+    __table_args__ = (
+        Index('ix_alert_history_sent_at_id', 'sent_at', 'id'),
+        Index('ix_alert_history_job_id_sent_at', 'job_id', 'sent_at'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     job_id = Column(String(128), nullable=False)
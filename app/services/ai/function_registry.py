@@ -3,14 +3,23 @@ import uuid
 from datetime import datetime
 from typing import Any, Dict, List
 
-from app.core.database import _session_factory, get_all_config, get_config, get_log_stats
+from app.core.database import (
+    _read_session_factory,
+    _session_factory,
+    get_all_config,
+    get_config,
+    get_log_stats,
+    list_job_logs,
+)
 from app.services.scheduler import (
     add_job,
     get_all_jobs,
     get_job_by_id,
     pause_job,
+    query_jobs,
     remove_job,
     resume_job,
+    search_jobs,
     update_job,
 )
 from app.services.tasks import get_task_categories, get_task_info
@@ -53,8 +62,11 @@ def _format_trigger_description(trigger: str, trigger_args: Dict[str, Any]) -> s
     return trigger
 
 
-def _tool_list_jobs() -> Dict[str, Any]:
-    return {"jobs": get_all_jobs()}
+def _tool_list_jobs(func: str = None, status: str = None, limit: int = None) -> Dict[str, Any]:
+    if not (func or status or limit):
+        return {"jobs": get_all_jobs()}
+    result = query_jobs(func=func, status=status, limit=limit)
+    return {"jobs": result["jobs"], "count": result["count"]}
 
 
 def _tool_get_job(job_id: str) -> Dict[str, Any]:
@@ -62,9 +74,7 @@ def _tool_get_job(job_id: str) -> Dict[str, Any]:
 
 
 def _tool_search_jobs(keyword: str) -> Dict[str, Any]:
-    jobs = get_all_jobs()
-    filtered = [job for job in jobs if keyword.lower() in job.get('id', '').lower() or keyword.lower() in (job.get('name') or '').lower()]
-    return {"jobs": filtered, "keyword": keyword}
+    return {"jobs": search_jobs(keyword), "keyword": keyword}
 
 
 def _tool_list_available_tasks() -> Dict[str, Any]:
@@ -86,16 +96,11 @@ def _tool_get_current_time() -> Dict[str, Any]:
     }
 
 
-def _tool_get_logs(job_id: str = None, status: bool = None, limit: int = 10) -> Dict[str, Any]:
-    from app.models.sql_model import JobLog
-    db = _session_factory()
+def _tool_get_logs(job_id: str = None, status: bool = None, q: str = None, limit: int = 10) -> Dict[str, Any]:
+    db = _read_session_factory()
     try:
-        query = db.query(JobLog)
-        if job_id:
-            query = query.filter(JobLog.job_id.ilike(f"%{job_id}%"))
-        if status is not None:
-            query = query.filter(JobLog.status == status)
-        logs = query.order_by(JobLog.timestamp.desc()).limit(limit).all()
+        logs = list_job_logs(db, job_id=job_id, status=status, q=q, limit=max(1, min(int(limit), 100)),
+                             count="none")["logs"]
         return {
             "logs": [
                 {
@@ -114,10 +119,10 @@ def _tool_get_logs(job_id: str = None, status: bool = None, limit: int = 10) ->
         db.close()
 
 
-def _tool_get_log_stats() -> Dict[str, Any]:
-    db = _session_factory()
+def _tool_get_log_stats(job_id: str = None) -> Dict[str, Any]:
+    db = _read_session_factory()
     try:
-        stats = get_log_stats(db)
+        stats = get_log_stats(db, job_id, include_expired=True)
         return stats
     finally:
         db.close()
@@ -474,8 +479,15 @@ def get_tool_schemas() -> List[Dict[str, Any]]:
             "type": "function",
             "function": {
                 "name": "list_jobs",
-                "description": "获取当前所有计划任务",
-                "parameters": {"type": "object", "properties": {}},
+                "description": "获取计划任务列表，可按任务函数、状态筛选",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "func": {"type": "string", "description": "任务函数名筛选"},
+                        "status": {"type": "string", "description": "状态筛选：running/paused/error"},
+                        "limit": {"type": "integer", "description": "返回数量限制"},
+                    },
+                },
             },
         },
         {
@@ -528,6 +540,7 @@ def get_tool_schemas() -> List[Dict[str, Any]]:
                     "properties": {
                         "job_id": {"type": "string", "description": "任务ID筛选"},
                         "status": {"type": "boolean", "description": "状态筛选"},
+                        "q": {"type": "string", "description": "在任务ID、消息和输出中搜索的关键词，多个词以空格分隔"},
                         "limit": {"type": "integer", "description": "返回数量限制", "default": 10},
                     },
                 },
@@ -538,7 +551,10 @@ def get_tool_schemas() -> List[Dict[str, Any]]:
             "function": {
                 "name": "get_log_stats",
                 "description": "获取日志统计信息",
-                "parameters": {"type": "object", "properties": {}},
+                "parameters": {
+                    "type": "object",
+                    "properties": {"job_id": {"type": "string", "description": "任务ID，不传则统计全部日志"}},
+                },
             },
         },
         {
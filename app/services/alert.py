@@ -1,15 +1,20 @@
 import json
 import logging
+import queue
 import smtplib
+import threading
 import time
 import fnmatch
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import requests
 
+from app.core.conf import ALERT_ENQUEUE_TIMEOUT, ALERT_QUEUE_SIZE, ALERT_SEND_CONCURRENCY, ALERT_WORKERS
 from app.core.database import _session_factory, get_config_bool
 from app.models.sql_model import AlertConfig, AlertChannel, AlertHistory
+from app.services.metrics import alert_sends, registry
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -167,7 +172,39 @@ def get_alert_channels_by_ids(db, channel_ids: List[int]) -> List[AlertChannel]:
     return db.query(AlertChannel).filter(AlertChannel.id.in_(channel_ids), AlertChannel.enabled == True).all()
 
 
+def send_channel_alert(channel: AlertChannel, job_id: str, rule_type: str, message: str) -> Dict[str, Any]:
+    result = {"success": False, "message": "未知错误"}
+    
+    if channel.type == "webhook":
+        result = send_webhook_alert(channel, message)
+    elif channel.type == "email":
+        result = send_email_alert(channel, message)
+    
+    alert_sends.inc(channel.type, "success" if result["success"] else "failure")
+    record_alert_history(
+        job_id=job_id,
+        rule_type=rule_type,
+        channel_type=channel.type,
+        channel_id=channel.id,
+        status=result["success"],
+        message=message,
+        error=result["message"] if not result["success"] else None
+    )
+    
+    if result["success"]:
+        logger.info(f"告警发送成功: {job_id} -> {channel.name}")
+    else:
+        logger.error(f"告警发送失败: {job_id} -> {channel.name}: {result['message']}")
+    return result
+
+
 def check_and_alert(job_id: str, status: bool, duration: Optional[float] = None, error: Optional[str] = None, job_exists: bool = True):
+    """
+    匹配告警规则并发送
+
+    规则和渠道读取完毕后先关闭数据库会话再发送，慢速渠道不会占用连接池中的连接（调度器的 jobstore 共用同一个连接池）
+    """
+    alerts = []
     db = _session_factory()
     try:
         if not get_config_bool(db, "alert_enabled", True):
@@ -201,30 +238,8 @@ def check_and_alert(job_id: str, status: bool, duration: Optional[float] = None,
                 
                 channel_ids = json.loads(config.channels) if isinstance(config.channels, str) else config.channels
                 channels = get_alert_channels_by_ids(db, channel_ids)
-                
-                for channel in channels:
-                    result = {"success": False, "message": "未知错误"}
-                    
-                    if channel.type == "webhook":
-                        result = send_webhook_alert(channel, message)
-                    elif channel.type == "email":
-                        result = send_email_alert(channel, message)
-                    
-                    record_alert_history(
-                        job_id=job_id,
-                        rule_type=config.rule_type,
-                        channel_type=channel.type,
-                        channel_id=channel.id,
-                        status=result["success"],
-                        message=message,
-                        error=result["message"] if not result["success"] else None
-                    )
-                    
-                    if result["success"]:
-                        logger.info(f"告警发送成功: {job_id} -> {channel.name}")
-                    else:
-                        logger.error(f"告警发送失败: {job_id} -> {channel.name}: {result['message']}")
-                
+                alerts.append((channels, config.rule_type, message))
+                # 在匹配时标记，同一次检查中后续规则按冷却时间判断，与逐条发送时一致
                 mark_alert_sent(job_id)
         
         if status:
@@ -232,8 +247,13 @@ def check_and_alert(job_id: str, status: bool, duration: Optional[float] = None,
     
     except Exception as e:
         logger.error(f"告警检查失败: {e}")
+        return
     finally:
+        # 关闭后渠道对象脱离会话，已加载的属性仍可读取
         db.close()
+    
+    for channels, rule_type, message in alerts:
+        alert_dispatcher.send_to_channels(channels, job_id, rule_type, message)
 
 
 def test_alert_channel(channel: AlertChannel) -> Dict[str, Any]:
@@ -246,4 +266,184 @@ def test_alert_channel(channel: AlertChannel) -> Dict[str, Any]:
     elif channel.type == "email":
         return send_email_alert(channel, test_message)
     else:
-        return {"success": False, "message": f"不支持的渠道类型: {channel.type}"}
\ No newline at end of file
+        return {"success": False, "message": f"不支持的渠道类型: {channel.type}"}
+
+
+class AlertDispatcher:
+    """
+    告警分发器
+    
+    job_listener 只负责入队，规则匹配和渠道发送在独立的工作线程中完成。
+    同一任务的告警按 job_id 分片到固定队列，保证连续失败计数的顺序；
+    单条告警的多个渠道通过发送线程池并发发送。
+    """
+    
+    def __init__(self, workers: int = 4, queue_size: int = 1000, send_concurrency: int = 8,
+                 enqueue_timeout: float = 0.1):
+        self._workers = max(1, workers)
+        self._queue_size = queue_size
+        self._send_concurrency = max(1, send_concurrency)
+        self._enqueue_timeout = enqueue_timeout
+        self._queues: List[queue.Queue] = []
+        self._threads: List[threading.Thread] = []
+        self._send_pool: Optional[ThreadPoolExecutor] = None
+        self._stop_event = threading.Event()
+        # stop 超时后置位，工作线程不再处理队列中剩余的告警
+        self._abort_event = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "processed": 0,
+            "dropped": 0,
+            "errors": 0,
+            "channel_sends": 0,
+            "channel_failures": 0,
+        }
+    
+    @property
+    def running(self) -> bool:
+        return bool(self._threads) and not self._stop_event.is_set()
+    
+    def start(self):
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._abort_event.clear()
+        self._queues = [queue.Queue(maxsize=self._queue_size) for _ in range(self._workers)]
+        self._send_pool = ThreadPoolExecutor(max_workers=self._send_concurrency, thread_name_prefix="alert-send")
+        self._threads = []
+        for index, q in enumerate(self._queues):
+            thread = threading.Thread(target=self._run, args=(q,), name=f"alert-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"告警分发器已启动: {self._workers} 个工作线程, 渠道并发 {self._send_concurrency}")
+    
+    def stop(self, timeout: float = 10.0):
+        """
+        停止工作线程，等待已入队的告警处理完毕（最多 timeout 秒）
+
+        队列已满时放不下结束标记，工作线程在队列取空后根据停止标志退出；超时后剩余的告警计入丢弃，
+        正在发送的告警发送完成后线程即退出
+        """
+        if not self._threads:
+            return
+        self._stop_event.set()
+        deadline = time.monotonic() + timeout
+        for q in self._queues:
+            try:
+                q.put_nowait(None)
+            except queue.Full:
+                pass
+        for thread in self._threads:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        if any(thread.is_alive() for thread in self._threads):
+            self._abort_event.set()
+            logger.warning("告警分发器停止超时，放弃队列中剩余的告警")
+        self._threads = []
+        if self._send_pool is not None:
+            self._send_pool.shutdown(wait=False)
+            self._send_pool = None
+        logger.info("告警分发器已停止")
+    
+    def submit(self, job_id: str, status: bool, duration: Optional[float] = None,
+               error: Optional[str] = None, job_exists: bool = True) -> bool:
+        """提交一次执行结果用于告警检查，队列满时丢弃并计数，返回是否入队成功"""
+        if not self.running:
+            self._process(job_id, status, duration, error, job_exists)
+            return True
+        
+        q = self._queues[hash(job_id) % len(self._queues)]
+        try:
+            q.put((job_id, status, duration, error, job_exists), timeout=self._enqueue_timeout)
+        except queue.Full:
+            self._incr("dropped")
+            logger.warning(f"告警队列已满，丢弃任务 {job_id} 的告警检查")
+            return False
+        self._incr("submitted")
+        return True
+    
+    def send_to_channels(self, channels: List[AlertChannel], job_id: str, rule_type: str, message: str) -> List[Dict[str, Any]]:
+        """向多个渠道发送同一条告警，发送线程池可用时并发执行"""
+        pool = self._send_pool
+        if pool is None or len(channels) <= 1:
+            results = [send_channel_alert(channel, job_id, rule_type, message) for channel in channels]
+        else:
+            futures = [pool.submit(send_channel_alert, channel, job_id, rule_type, message) for channel in channels]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append({"success": False, "message": str(e)})
+        
+        failures = sum(1 for result in results if not result["success"])
+        with self._stats_lock:
+            self._stats["channel_sends"] += len(results)
+            self._stats["channel_failures"] += failures
+        return results
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = sum(q.qsize() for q in self._queues)
+        stats["queue_capacity"] = self._queue_size * self._workers
+        stats["workers"] = self._workers
+        stats["send_concurrency"] = self._send_concurrency
+        stats["running"] = self.running
+        return stats
+    
+    def _run(self, q: queue.Queue):
+        while True:
+            if self._abort_event.is_set():
+                self._discard_remaining(q)
+                return
+            try:
+                item = q.get(timeout=0.2)
+            except queue.Empty:
+                if self._stop_event.is_set():
+                    return
+                continue
+            if item is None:
+                return
+            self._process(*item)
+    
+    def _discard_remaining(self, q: queue.Queue):
+        while True:
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                self._incr("dropped")
+    
+    def _process(self, job_id: str, status: bool, duration: Optional[float], error: Optional[str], job_exists: bool):
+        try:
+            check_and_alert(job_id, status, duration, error, job_exists=job_exists)
+            self._incr("processed")
+        except Exception as e:
+            self._incr("errors")
+            logger.error(f"告警处理失败: {job_id}: {e}")
+    
+    def _incr(self, key: str, value: int = 1):
+        with self._stats_lock:
+            self._stats[key] += value
+
+
+alert_dispatcher = AlertDispatcher(
+    workers=ALERT_WORKERS,
+    queue_size=ALERT_QUEUE_SIZE,
+    send_concurrency=ALERT_SEND_CONCURRENCY,
+    enqueue_timeout=ALERT_ENQUEUE_TIMEOUT,
+)
+
+
+registry.gauge_callback(
+    "apscheduler_alert_queue_depth", "告警队列中等待检查的执行结果数",
+    lambda: [({}, alert_dispatcher.stats()["queue_depth"])])
+registry.counter_callback(
+    "apscheduler_alert_dropped_total", "告警队列已满被丢弃的执行结果数",
+    lambda: [({}, alert_dispatcher.stats()["dropped"])])
+
+
+def submit_alert(job_id: str, status: bool, duration: Optional[float] = None, error: Optional[str] = None, job_exists: bool = True) -> bool:
+    return alert_dispatcher.submit(job_id, status, duration, error, job_exists=job_exists)
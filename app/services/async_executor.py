@@ -0,0 +1,95 @@
+"""
+异步任务执行器模块
+
+async def 任务在专用线程中的单个事件循环上运行，每次运行是一个 asyncio Task，
+I/O 等待期间不占用线程，数千个并发运行只需要一个线程。
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from apscheduler.executors.base import BaseExecutor, run_coroutine_job
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class AsyncIOLoopExecutor(BaseExecutor):
+    """在后台事件循环线程中运行协程任务的 APScheduler 执行器"""
+
+    def __init__(self, max_concurrency: int = 1000):
+        super().__init__()
+        self.max_concurrency = max(1, max_concurrency)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._futures = set()
+        self._futures_lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "running": 0, "max_running": 0}
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(ready,), name="asyncio-executor", daemon=True)
+        self._thread.start()
+        ready.wait()
+        logger.info(f"异步任务执行器已启动: 最大并发 {self.max_concurrency}")
+
+    def shutdown(self, wait=True):
+        if self._loop is None:
+            return
+        if wait:
+            with self._futures_lock:
+                pending = list(self._futures)
+            concurrent.futures.wait(pending)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._futures_lock:
+            stats = dict(self._stats)
+        stats["max_concurrency"] = self.max_concurrency
+        return stats
+
+    def _run_loop(self, ready: threading.Event):
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        ready.set()
+        self._loop.run_forever()
+
+    async def _run(self, job, run_times):
+        async with self._semaphore:
+            with self._futures_lock:
+                self._stats["running"] += 1
+                self._stats["max_running"] = max(self._stats["max_running"], self._stats["running"])
+            try:
+                return await run_coroutine_job(job, job._jobstore_alias, run_times, self._logger.name)
+            finally:
+                with self._futures_lock:
+                    self._stats["running"] -= 1
+
+    def _do_submit_job(self, job, run_times):
+        def callback(f):
+            with self._futures_lock:
+                self._futures.discard(f)
+            exc = f.exception()
+            if exc is not None:
+                with self._futures_lock:
+                    self._stats["failed"] += 1
+                self._run_job_error(job.id, exc, exc.__traceback__)
+            else:
+                with self._futures_lock:
+                    self._stats["completed"] += 1
+                self._run_job_success(job.id, f.result())
+
+        f = asyncio.run_coroutine_threadsafe(self._run(job, run_times), self._loop)
+        with self._futures_lock:
+            self._futures.add(f)
+            self._stats["submitted"] += 1
+        f.add_done_callback(callback)
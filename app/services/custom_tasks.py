@@ -1,7 +1,5 @@
 import ast
 import logging
-import sys
-import io
 import time
 import functools
 import inspect
@@ -100,49 +98,39 @@ def _execute_with_timeout(code: str, func_name: str, args: tuple, kwargs: dict,
     result_container = {"result": None, "error": None, "output": "", "status": False, "completed": False}
     
     def worker():
-        stdout_capture = io.StringIO()
-        stderr_capture = io.StringIO()
-        
-        old_stdout = sys.stdout
-        old_stderr = sys.stderr
-        
-        sys.stdout = stdout_capture
-        sys.stderr = stderr_capture
-        
-        try:
-            safe_globals = {"__builtins__": dict(SAFE_BUILTINS)}
-            local_vars = {}
-            exec(code, safe_globals, local_vars)
+        with OutputCapture() as capture:
+            try:
+                safe_globals = {"__builtins__": dict(SAFE_BUILTINS)}
+                local_vars = {}
+                exec(code, safe_globals, local_vars)
             
-            if func_name not in local_vars:
-                result_container["error"] = f"函数 {func_name} 未找到"
-                result_container["status"] = False
-                return
+                if func_name not in local_vars:
+                    result_container["error"] = f"函数 {func_name} 未找到"
+                    result_container["status"] = False
+                    return
             
-            func = local_vars[func_name]
-            result = func(*args, **kwargs)
+                func = local_vars[func_name]
+                result = func(*args, **kwargs)
             
-            if isinstance(result, dict):
-                if result.get("output"):
-                    result_container["output"] = result["output"]
-                if result.get("error"):
-                    result_container["error"] = result["error"]
-                if "status" in result:
-                    result_container["status"] = result["status"]
-                result_container["result"] = result.get("result")
-            else:
-                result_container["result"] = result
-                result_container["status"] = True
+                if isinstance(result, dict):
+                    if result.get("output"):
+                        result_container["output"] = result["output"]
+                    if result.get("error"):
+                        result_container["error"] = result["error"]
+                    if "status" in result:
+                        result_container["status"] = result["status"]
+                    result_container["result"] = result.get("result")
+                else:
+                    result_container["result"] = result
+                    result_container["status"] = True
             
-        except Exception as e:
-            result_container["error"] = str(e)
-            result_container["status"] = False
-            traceback.print_exc()
-        finally:
-            sys.stdout = old_stdout
-            sys.stderr = old_stderr
-            result_container["output"] = stdout_capture.getvalue()
-            result_container["completed"] = True
+            except Exception as e:
+                result_container["error"] = str(e)
+                result_container["status"] = False
+                traceback.print_exc()
+            finally:
+                result_container["output"] = capture.get_output()
+                result_container["completed"] = True
     
     thread = threading.Thread(target=worker)
     thread.daemon = True
@@ -365,6 +353,7 @@ def create_task_wrapper(code: str, task_name: str, task_desc: str, task_category
         elapsed_time = (end_time - start_time) * 1000
         
         result["elapsed_time"] = elapsed_time
+        result["started_at"] = start_time
         return result
     
     wrapper.original_func = func
@@ -440,14 +429,9 @@ def is_task_used(func_name: str) -> Dict[str, Any]:
     Returns:
         dict: {"used": bool, "jobs": [job_id1, job_id2, ...]}
     """
-    from app.services.scheduler import get_all_jobs
-    
-    jobs = get_all_jobs()
-    used_by = []
+    from app.services.scheduler import get_jobs_by_func
     
-    for job in jobs:
-        if job.get("func") == func_name:
-            used_by.append(job.get("id"))
+    used_by = [job.get("id") for job in get_jobs_by_func(func_name)]
     
     return {"used": len(used_by) > 0, "jobs": used_by}
 
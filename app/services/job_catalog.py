@@ -0,0 +1,383 @@
+"""
+任务目录缓存模块
+
+在进程内维护所有计划任务信息的索引，由调度器事件保持一致，
+任务列表、详情和按函数/状态/名称前缀的查询都不再访问 jobstore。
+"""
+
+import bisect
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from apscheduler.events import (
+    EVENT_ALL_JOBS_REMOVED,
+    EVENT_JOB_ADDED,
+    EVENT_JOB_EXECUTED,
+    EVENT_JOB_MAX_INSTANCES,
+    EVENT_JOB_MODIFIED,
+    EVENT_JOB_REMOVED,
+    EVENT_JOB_SUBMITTED,
+    EVENT_JOBSTORE_ADDED,
+    EVENT_JOBSTORE_REMOVED,
+)
+
+from app.core.pagination import decode_cursor, encode_cursor
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STATUS_RUNNING = "工作中"
+STATUS_PAUSED = "已暂停"
+STATUS_BROKEN = "异常"
+
+STATUS_ALIASES = {
+    "running": STATUS_RUNNING,
+    "paused": STATUS_PAUSED,
+    "error": STATUS_BROKEN,
+}
+
+SORT_FIELDS = ("next_run_time", "name")
+
+CATALOG_EVENTS = (
+    EVENT_JOB_ADDED
+    | EVENT_JOB_MODIFIED
+    | EVENT_JOB_REMOVED
+    | EVENT_JOB_SUBMITTED
+    | EVENT_JOB_MAX_INSTANCES
+    | EVENT_JOB_EXECUTED
+    | EVENT_ALL_JOBS_REMOVED
+    | EVENT_JOBSTORE_ADDED
+    | EVENT_JOBSTORE_REMOVED
+)
+
+
+def job_to_info(job) -> Dict[str, Any]:
+    """把 APScheduler Job 转换为接口返回的任务信息"""
+    try:
+        next_run = getattr(job, 'next_run_time', None)
+
+        # 处理自定义任务的 func 名称
+        func_name = job.func.__name__ if hasattr(job.func, '__name__') else str(job.func)
+        args = list(job.args) if job.args else []
+        kwargs = dict(job.kwargs) if job.kwargs else {}
+
+        # 如果是 custom_task_dispatcher / async_task_dispatcher，从 args[0] 获取实际函数名
+        if func_name in ('custom_task_dispatcher', 'async_task_dispatcher') and args:
+            actual_func_name = args[0]
+            args = args[1:]  # 剩余的才是实际参数
+        else:
+            actual_func_name = func_name
+
+        return {
+            "id": job.id,
+            "name": job.name,
+            "func": actual_func_name,
+            "next_run_time": str(next_run) if next_run else None,
+            "trigger": str(job.trigger),
+            "args": args,
+            "kwargs": kwargs,
+            "executor": getattr(job, 'executor', 'default'),
+            "status": STATUS_PAUSED if next_run is None else STATUS_RUNNING
+        }
+    except Exception as e:
+        logger.warning(f"解析任务 {job.id} 信息失败: {e}")
+        return {
+            "id": job.id,
+            "name": getattr(job, 'name', None),
+            "func": "unknown",
+            "next_run_time": None,
+            "trigger": str(getattr(job, 'trigger', 'unknown')),
+            "args": [],
+            "kwargs": {},
+            "status": STATUS_BROKEN
+        }
+
+
+def _order_key(next_run: Optional[datetime], job_id: str):
+    # 与 SQLAlchemyJobStore.get_all_jobs 的顺序一致：按下次执行时间升序，暂停的任务排在最后
+    if next_run is None:
+        return (1, 0.0, job_id)
+    return (0, next_run.timestamp(), job_id)
+
+
+class JobCatalog:
+    """任务目录：主索引 + 函数名/状态/名称前缀/执行时间排序的二级索引"""
+
+    def __init__(self, scheduler):
+        self._scheduler = scheduler
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._triggers: Dict[str, Any] = {}
+        self._next_runs: Dict[str, Optional[datetime]] = {}
+        self._by_func: Dict[str, Set[str]] = {}
+        self._by_status: Dict[str, Set[str]] = {}
+        self._names: List[tuple] = []
+        self._order: List[tuple] = []
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def rebuild(self):
+        """从 jobstore 全量加载，仅在启动或 jobstore 变化时调用"""
+        try:
+            jobs = self._scheduler.get_jobs()
+        except LookupError as e:
+            logger.warning(f"加载任务时发现无效引用: {e}")
+            jobs = []
+        except Exception as e:
+            logger.error(f"获取任务列表失败: {e}")
+            return
+
+        with self._lock:
+            self._clear()
+            for job in jobs:
+                self._put(job)
+            self._loaded = True
+        logger.info(f"任务目录已加载: {len(jobs)} 个任务")
+
+    def listener(self, event):
+        """调度器事件监听，增量维护索引"""
+        code = event.code
+        if code in (EVENT_ALL_JOBS_REMOVED, EVENT_JOBSTORE_ADDED, EVENT_JOBSTORE_REMOVED):
+            self.rebuild()
+            return
+        if not self._loaded:
+            return
+
+        job_id = event.job_id
+        if code == EVENT_JOB_REMOVED:
+            with self._lock:
+                self._drop(job_id)
+        elif code in (EVENT_JOB_ADDED, EVENT_JOB_MODIFIED):
+            self.refresh(job_id)
+        elif code in (EVENT_JOB_SUBMITTED, EVENT_JOB_MAX_INSTANCES):
+            self._advance(job_id, event.scheduled_run_times[-1])
+        elif code == EVENT_JOB_EXECUTED:
+            self._advance(job_id, event.scheduled_run_time)
+
+    def refresh(self, job_id: str):
+        """从 jobstore 重新读取单个任务"""
+        try:
+            job = self._scheduler.get_job(job_id)
+        except LookupError:
+            job = None
+        with self._lock:
+            self._drop(job_id)
+            if job is not None:
+                self._put(job)
+
+    def apply(self, jobs: Iterable[Any] = (), removed: Iterable[str] = ()):
+        """批量写入 jobstore 后直接用已提交的 Job 对象更新索引，无需逐个回读"""
+        if not self._loaded:
+            return
+        with self._lock:
+            for job_id in removed:
+                self._drop(job_id)
+            for job in jobs:
+                self._drop(job.id)
+                self._put(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            info = self._jobs.get(job_id)
+            return dict(info) if info else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(self._jobs[job_id]) for _, _, job_id in self._order]
+
+    def by_func(self, func_name: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._select(self._by_func.get(func_name, ()))
+
+    def by_status(self, status: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._select(self._by_status.get(status, ()))
+
+    def by_name_prefix(self, prefix: str) -> List[Dict[str, Any]]:
+        prefix = prefix.lower()
+        with self._lock:
+            ids = []
+            index = bisect.bisect_left(self._names, (prefix,))
+            while index < len(self._names) and self._names[index][0].startswith(prefix):
+                ids.append(self._names[index][1])
+                index += 1
+            return self._select(ids)
+
+    def search(self, keyword: str) -> List[Dict[str, Any]]:
+        """按任务 ID 或名称模糊匹配（内存扫描，不访问 jobstore）"""
+        keyword = keyword.lower()
+        with self._lock:
+            return [
+                dict(self._jobs[job_id]) for _, _, job_id in self._order
+                if keyword in job_id.lower() or keyword in (self._jobs[job_id].get("name") or "").lower()
+            ]
+
+    def query(self, func: str = None, status: str = None, keyword: str = None, sort: str = "next_run_time",
+              page: int = 1, limit: int = None, cursor: str = None) -> Dict[str, Any]:
+        """
+        分页查询任务
+        
+        在排序索引上顺序扫描，按函数名/状态索引过滤，凑满一页即停止，
+        代价与页大小相关而与任务总数无关（关键词过滤需要额外扫描匹配项）。
+        
+        Args:
+            func: 任务函数名
+            status: 任务状态，支持中文状态或 running/paused/error
+            keyword: 任务 ID 或名称关键词
+            sort: 排序字段，next_run_time 或 name
+            page: 页码，从 1 开始（传入 cursor 时忽略）
+            limit: 每页数量，为空时返回全部
+            cursor: 上一页返回的 next_cursor
+        
+        Returns:
+            dict: {"count": int, "jobs": list, "next_cursor": str|None}
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"不支持的排序字段 '{sort}'")
+        status = STATUS_ALIASES.get(status, status)
+        keyword = keyword.lower() if keyword else None
+
+        with self._lock:
+            index = self._order if sort == "next_run_time" else self._names
+
+            candidates = None
+            for ids in (self._by_func.get(func, set()) if func else None,
+                        self._by_status.get(status, set()) if status else None):
+                if ids is not None:
+                    candidates = ids if candidates is None else candidates & ids
+
+            def matches(job_id: str) -> bool:
+                if candidates is not None and job_id not in candidates:
+                    return False
+                if keyword:
+                    return keyword in job_id.lower() or keyword in (self._jobs[job_id].get("name") or "").lower()
+                return True
+
+            # 过滤结果远小于总数时，直接对候选集排序，避免扫描整个排序索引
+            if candidates is not None and len(candidates) * 4 < len(index):
+                index = sorted(self._sort_key(sort, job_id) for job_id in candidates)
+
+            start = 0
+            if cursor:
+                try:
+                    start = bisect.bisect_right(index, decode_cursor(cursor))
+                except TypeError:
+                    raise ValueError("分页游标与排序字段不匹配")
+
+            unfiltered = candidates is None and not keyword
+            if unfiltered:
+                count = len(index)
+            elif not keyword:
+                count = len(candidates)
+            else:
+                count = None
+
+            skip = 0 if cursor or not limit else (max(page, 1) - 1) * limit
+            if unfiltered:
+                start += skip
+                skip = 0
+
+            # 多取一条用于判断是否还有下一页
+            selected = []
+            for position in range(start, len(index)):
+                key = index[position]
+                if unfiltered or matches(key[-1]):
+                    if skip:
+                        skip -= 1
+                        continue
+                    selected.append(key)
+                    if limit and len(selected) > limit:
+                        break
+
+            has_more = bool(limit) and len(selected) > limit
+            if has_more:
+                selected = selected[:limit]
+
+            if count is None:
+                scope = candidates if candidates is not None else self._jobs
+                count = sum(1 for job_id in scope if matches(job_id))
+
+            return {
+                "count": count,
+                "jobs": [dict(self._jobs[key[-1]]) for key in selected],
+                "next_cursor": encode_cursor(selected[-1]) if has_more else None,
+            }
+
+    def _sort_key(self, sort: str, job_id: str) -> tuple:
+        if sort == "name":
+            return ((self._jobs[job_id].get("name") or "").lower(), job_id)
+        return _order_key(self._next_runs.get(job_id), job_id)
+
+    def _select(self, ids: Iterable[str]) -> List[Dict[str, Any]]:
+        ids = set(ids)
+        return [dict(self._jobs[job_id]) for _, _, job_id in self._order if job_id in ids]
+
+    def _clear(self):
+        self._jobs.clear()
+        self._triggers.clear()
+        self._next_runs.clear()
+        self._by_func.clear()
+        self._by_status.clear()
+        self._names = []
+        self._order = []
+
+    def _put(self, job):
+        info = job_to_info(job)
+        job_id = info["id"]
+        next_run = getattr(job, 'next_run_time', None) if info["status"] != STATUS_BROKEN else None
+
+        self._jobs[job_id] = info
+        self._triggers[job_id] = getattr(job, 'trigger', None)
+        self._next_runs[job_id] = next_run
+        self._by_func.setdefault(info["func"], set()).add(job_id)
+        self._by_status.setdefault(info["status"], set()).add(job_id)
+        bisect.insort(self._names, ((info.get("name") or "").lower(), job_id))
+        bisect.insort(self._order, _order_key(next_run, job_id))
+
+    def _drop(self, job_id: str):
+        info = self._jobs.pop(job_id, None)
+        if info is None:
+            return
+        self._triggers.pop(job_id, None)
+        next_run = self._next_runs.pop(job_id, None)
+        self._discard(self._by_func, info["func"], job_id)
+        self._discard(self._by_status, info["status"], job_id)
+        self._remove_sorted(self._names, ((info.get("name") or "").lower(), job_id))
+        self._remove_sorted(self._order, _order_key(next_run, job_id))
+
+    def _advance(self, job_id: str, run_time: datetime):
+        """任务提交/执行后按触发器推算下次执行时间，避免重新读取 jobstore"""
+        with self._lock:
+            info = self._jobs.get(job_id)
+            trigger = self._triggers.get(job_id)
+            current = self._next_runs.get(job_id)
+            if info is None or trigger is None or current is None:
+                return
+            now = datetime.now(current.tzinfo)
+            next_run = trigger.get_next_fire_time(run_time, now)
+            # 下次执行时间为空时任务会被移除，由 EVENT_JOB_REMOVED 处理
+            if next_run is None or next_run <= current:
+                return
+            self._remove_sorted(self._order, _order_key(current, job_id))
+            self._next_runs[job_id] = next_run
+            info["next_run_time"] = str(next_run)
+            bisect.insort(self._order, _order_key(next_run, job_id))
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, job_id: str):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(job_id)
+            if not ids:
+                del index[key]
+
+    @staticmethod
+    def _remove_sorted(items: List[tuple], item: tuple):
+        index = bisect.bisect_left(items, item)
+        if index < len(items) and items[index] == item:
+            del items[index]
@@ -0,0 +1,226 @@
+"""
+调度器主备选举模块
+
+多个 uvicorn worker / 副本共享同一个 jobstore 时，通过 Redis 租约选出唯一的主节点
+运行 BackgroundScheduler 调度循环，其余节点以暂停状态启动调度器，只提供 API 读写。
+
+- 抢占：SET key node_id NX PX ttl
+- 续约：WATCH/MULTI 校验持有者后 PEXPIRE，不依赖 Lua，可直接用 fakeredis 测试
+- 主节点在租约到期前一个续约间隔内仍未续约成功时主动降级，避免租约过期后出现双主；
+  Redis 命令超时短于续约间隔，Redis 无响应时单次周期不会长时间阻塞
+- 任意节点修改任务后递增版本号，其他节点据此刷新任务目录并唤醒调度器
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from redis.exceptions import WatchError
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _as_str(value) -> Optional[str]:
+    if isinstance(value, bytes):
+        return value.decode()
+    return value
+
+
+class LeaderElector:
+    """
+    基于 Redis 租约的主节点选举
+
+    client_factory 以 client_factory(socket_timeout=秒) 调用，返回 Redis 客户端
+    """
+
+    def __init__(self, client_factory: Callable[[], Any], key: str = "apscheduler:leader", ttl: float = 6.0,
+                 renew_interval: float = 2.0, node_id: str = None,
+                 on_elected: Callable[[], None] = None, on_revoked: Callable[[], None] = None,
+                 on_tick: Callable[[bool, bool], None] = None):
+        self._client_factory = client_factory
+        self._client = None
+        self.key = key
+        self.version_key = f"{key}:jobs-version"
+        self.ttl_ms = max(1000, int(ttl * 1000))
+        self.renew_interval = max(0.1, min(renew_interval, ttl / 2))
+        self.redis_timeout = self.renew_interval / 2
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._on_elected = on_elected
+        self._on_revoked = on_revoked
+        self._on_tick = on_tick
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._is_leader = False
+        self._last_renewed = 0.0
+        self._jobs_version = None
+        self._stats = {
+            "elections": 0,
+            "revocations": 0,
+            "renew_failures": 0,
+            "redis_errors": 0,
+            "last_error": None,
+        }
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop_event.clear()
+        # 启动时先同步尝试一次，主节点无需等待下一个周期
+        self.tick()
+        self._thread = threading.Thread(target=self._run, name="scheduler-leader-elector", daemon=True)
+        self._thread.start()
+        logger.info(f"主备选举已启动: 节点 {self.node_id}, 租约 {self.ttl_ms}ms, 续约间隔 {self.renew_interval}s")
+
+    def stop(self, timeout: float = 5.0):
+        """停止选举线程，主节点主动释放租约以便备节点立即接管"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        if self._is_leader:
+            try:
+                self._release()
+            except Exception as e:
+                logger.warning(f"释放主节点租约失败: {e}")
+            self._demote("节点停止")
+        logger.info("主备选举已停止")
+
+    def tick(self):
+        """执行一次抢占/续约，并检查任务版本变化"""
+        with self._lock:
+            # 租约从发出命令时开始计算，Redis 处理时间只会让实际到期更晚
+            started = time.monotonic()
+            try:
+                if self._is_leader:
+                    if self._renew():
+                        self._last_renewed = started
+                    else:
+                        self._stats["renew_failures"] += 1
+                        self._demote("租约已被其他节点持有")
+                elif self._acquire():
+                    self._last_renewed = started
+                    self._promote()
+                changed = self._check_jobs_version()
+            except Exception as e:
+                self._stats["redis_errors"] += 1
+                self._stats["last_error"] = str(e)
+                logger.warning(f"主备选举访问 Redis 失败: {e}")
+                # 下一次续约前租约可能到期并被其他节点接管，此时必须先降级
+                if self._is_leader and self._lease_expiring():
+                    self._demote("租约续约超时")
+                changed = False
+
+        if self._on_tick is not None:
+            try:
+                self._on_tick(self._is_leader, changed)
+            except Exception as e:
+                logger.error(f"主备选举周期回调出错: {e}")
+
+    def notify_jobs_changed(self):
+        """本节点修改了任务，递增共享版本号通知其他节点"""
+        try:
+            self._jobs_version = _as_str(self._get_client().incr(self.version_key))
+        except Exception as e:
+            logger.warning(f"通知任务变更失败: {e}")
+
+    def leader_id(self) -> Optional[str]:
+        try:
+            return _as_str(self._get_client().get(self.key))
+        except Exception:
+            return None
+
+    def status(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats.update(
+            node_id=self.node_id,
+            is_leader=self._is_leader,
+            leader_id=self.leader_id(),
+            key=self.key,
+            ttl_ms=self.ttl_ms,
+            renew_interval=self.renew_interval,
+            running=self.running,
+        )
+        return stats
+
+    def _run(self):
+        while not self._stop_event.wait(self.renew_interval):
+            self.tick()
+
+    def _lease_expiring(self) -> bool:
+        elapsed_ms = (time.monotonic() - self._last_renewed) * 1000
+        return elapsed_ms >= self.ttl_ms - self.renew_interval * 1000
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = self._client_factory(socket_timeout=self.redis_timeout)
+        return self._client
+
+    def _acquire(self) -> bool:
+        return bool(self._get_client().set(self.key, self.node_id, nx=True, px=self.ttl_ms))
+
+    def _renew(self) -> bool:
+        with self._get_client().pipeline() as pipe:
+            try:
+                pipe.watch(self.key)
+                if _as_str(pipe.get(self.key)) != self.node_id:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.pexpire(self.key, self.ttl_ms)
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    def _release(self):
+        with self._get_client().pipeline() as pipe:
+            try:
+                pipe.watch(self.key)
+                if _as_str(pipe.get(self.key)) != self.node_id:
+                    pipe.unwatch()
+                    return
+                pipe.multi()
+                pipe.delete(self.key)
+                pipe.execute()
+            except WatchError:
+                pass
+
+    def _check_jobs_version(self) -> bool:
+        version = _as_str(self._get_client().get(self.version_key))
+        changed = version != self._jobs_version
+        self._jobs_version = version
+        return changed
+
+    def _promote(self):
+        self._is_leader = True
+        self._stats["elections"] += 1
+        logger.info(f"节点 {self.node_id} 成为调度主节点")
+        if self._on_elected is not None:
+            try:
+                self._on_elected()
+            except Exception as e:
+                logger.error(f"切换为主节点时出错: {e}")
+
+    def _demote(self, reason: str):
+        self._is_leader = False
+        self._stats["revocations"] += 1
+        logger.warning(f"节点 {self.node_id} 退出调度主节点: {reason}")
+        if self._on_revoked is not None:
+            try:
+                self._on_revoked()
+            except Exception as e:
+                logger.error(f"切换为备节点时出错: {e}")
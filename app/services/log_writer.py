@@ -0,0 +1,224 @@
+"""
+任务日志异步批量写入模块
+
+job_listener 只负责把日志放入有界队列，由后台线程按数量/时间阈值
+合并为多行 INSERT 批量提交，避免执行线程等待数据库提交。
+任务输出的截断、压缩和写入外部文件（见 app.core.log_output）在写入线程中完成，
+job_listener 所在的执行器回调线程只做入队，不承担压缩和文件 I/O。
+同一事务内累加 log_stats 汇总统计，日志与统计同时提交或同时回滚。
+"""
+
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.core.conf import LOG_WRITER_BATCH_SIZE, LOG_WRITER_FLUSH_INTERVAL, LOG_WRITER_QUEUE_SIZE
+from app.core.database import _session_factory
+from app.core.log_output import pack_output
+from app.core.log_stats import record_logs
+from app.models.sql_model import JobLog
+from app.services.metrics import registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class LogWriter:
+    """后台日志写入器：有界队列 + 批量刷新线程"""
+
+    def __init__(self, session_factory, queue_size: int = 10000, batch_size: int = 200,
+                 flush_interval: float = 1.0):
+        self._session_factory = session_factory
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=queue_size)
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = max(0.01, flush_interval)
+        self._write_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "failed": 0,
+            "overflow": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="job-log-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"日志写入器已启动: 批量 {self._batch_size} 条, 刷新间隔 {self._flush_interval}s")
+
+    def stop(self, timeout: float = 10.0):
+        """停止后台线程并写入队列中剩余的日志"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.flush()
+        logger.info("日志写入器已停止")
+
+    def write(self, job_id, status, message, duration=None, output=None):
+        row = {
+            "job_id": job_id,
+            "status": status,
+            "message": message,
+            "duration": duration,
+            "output": output,
+            "timestamp": datetime.utcnow(),
+        }
+
+        if not self.running:
+            self._write_batch([row])
+            return
+
+        try:
+            self._queue.put_nowait(row)
+            self._incr("enqueued")
+        except queue.Full:
+            # 队列已满时退化为同步写入，由调用方承担背压，保证日志不丢失
+            self._incr("overflow")
+            self._write_batch([row])
+
+    def flush(self) -> int:
+        """同步写入队列中的全部日志，返回写入条数"""
+        written = 0
+        while True:
+            batch = self._drain(self._batch_size)
+            if not batch:
+                return written
+            self._write_batch(batch)
+            written += len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches = stats["batches"]
+        total_flush_ms = stats.pop("total_flush_ms")
+        stats["avg_batch_size"] = round(stats["written"] / batches, 2) if batches else 0
+        stats["avg_flush_ms"] = round(total_flush_ms / batches, 3) if batches else 0
+        stats["queue_depth"] = self._queue.qsize()
+        stats["queue_capacity"] = self._queue.maxsize
+        stats["batch_size"] = self._batch_size
+        stats["flush_interval"] = self._flush_interval
+        stats["running"] = self.running
+        return stats
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                first = self._queue.get(timeout=self._flush_interval)
+            except queue.Empty:
+                continue
+
+            try:
+                batch = [first]
+                deadline = time.monotonic() + self._flush_interval
+                while len(batch) < self._batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._stop_event.is_set():
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+
+                self._write_batch(batch)
+            except Exception as e:
+                # 单批异常不能让写入线程退出，否则后续日志全部堆积在队列中
+                logger.exception(f"日志写入线程处理批次失败: {e}")
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, rows: List[Dict[str, Any]]):
+        start = time.perf_counter()
+        rows = [self._pack(row) for row in rows]
+        with self._write_lock:
+            written = self._insert(rows)
+            if not written and len(rows) > 1:
+                # 整批提交失败时逐条写入，只丢弃本身无法写入的日志
+                logger.warning(f"批量写入失败，改为逐条写入 {len(rows)} 条日志")
+                written = sum(self._insert([row]) for row in rows)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._stats_lock:
+            self._stats["failed"] += len(rows) - written
+            if not written:
+                return
+            self._stats["written"] += written
+            self._stats["batches"] += 1
+            self._stats["last_batch_size"] = written
+            self._stats["max_batch_size"] = max(self._stats["max_batch_size"], written)
+            self._stats["last_flush_ms"] = round(elapsed_ms, 3)
+            self._stats["max_flush_ms"] = max(self._stats["max_flush_ms"], round(elapsed_ms, 3))
+            self._stats["total_flush_ms"] += elapsed_ms
+
+    def _pack(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """转换输出列；转换失败时保留日志本身，丢弃输出"""
+        try:
+            return {**row, **pack_output(row["output"])}
+        except Exception as e:
+            logger.error(f"任务输出处理失败，仅保存日志: {row['job_id']}: {e}")
+            return {**row, **pack_output(None)}
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> int:
+        """在一个事务中写入日志和统计，返回写入条数，失败返回 0"""
+        db = None
+        try:
+            db = self._session_factory()
+            db.execute(insert(JobLog), rows)
+            record_logs(db, rows)
+            db.commit()
+            return len(rows)
+        except Exception as e:
+            if db is not None:
+                db.rollback()
+            logger.error(f"写入日志失败 ({len(rows)} 条): {e}")
+            return 0
+        finally:
+            if db is not None:
+                db.close()
+
+    def _incr(self, key: str, value: int = 1):
+        with self._stats_lock:
+            self._stats[key] += value
+
+
+log_writer = LogWriter(
+    _session_factory,
+    queue_size=LOG_WRITER_QUEUE_SIZE,
+    batch_size=LOG_WRITER_BATCH_SIZE,
+    flush_interval=LOG_WRITER_FLUSH_INTERVAL,
+)
+
+registry.gauge_callback(
+    "apscheduler_log_writer_queue_depth", "日志写入队列中等待写入的日志数",
+    lambda: [({}, log_writer._queue.qsize())])
+registry.counter_callback(
+    "apscheduler_log_writer_rows_total", "日志写入器处理的日志数",
+    lambda: [({"result": key}, value) for key, value in log_writer.stats().items()
+             if key in ("written", "failed", "overflow")])
@@ -0,0 +1,229 @@
+"""
+Prometheus 指标模块
+
+进程内维护计数器和直方图，执行器、日志写入器、告警队列等状态在抓取时通过回调读取内存中的计数，
+/metrics 抓取不会查询数据库，可按 5 秒间隔频繁抓取。输出为 Prometheus 文本格式 0.0.4。
+"""
+
+import bisect
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import event
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Tuple) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}")
+        return tuple(str(value) for value in labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels, value: float = 1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        lines = self.header()
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets: Sequence[float] = DURATION_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签：[各桶计数..., +Inf 计数, 总和]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 2)
+            values[index] += 1
+            values[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(values)) for key, values in self._values.items()]
+        lines = self.header()
+        for key, values in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                bucket_labels = _format_labels({**labels, "le": _format_value(float(bound))})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(round(values[-1], 6))}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class _CallbackMetric(_Metric):
+    """抓取时调用回调读取当前值，用于队列深度、线程数等状态"""
+
+    def __init__(self, name, help_text, type_name: str, callback: Callable[[], Iterable[Sample]]):
+        super().__init__(name, help_text)
+        self.type_name = type_name
+        self._callback = callback
+
+    def render(self) -> List[str]:
+        try:
+            samples = list(self._callback())
+        except Exception as e:
+            logger.warning(f"采集指标 {self.name} 失败: {e}")
+            return []
+        lines = self.header()
+        for labels, value in samples:
+            if value is None:
+                continue
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # 模块重复导入时复用已有指标，避免重复输出
+            existing = self._metrics.get(metric.name)
+            if existing is not None and not isinstance(metric, _CallbackMetric):
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DURATION_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge_callback(self, name: str, help_text: str, callback: Callable[[], Iterable[Sample]]):
+        self._register(_CallbackMetric(name, help_text, "gauge", callback))
+
+    def counter_callback(self, name: str, help_text: str, callback: Callable[[], Iterable[Sample]]):
+        self._register(_CallbackMetric(name, help_text, "counter", callback))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+job_executions = registry.counter(
+    "apscheduler_job_executions_total", "任务执行次数", ("job_id", "status"))
+job_duration = registry.histogram(
+    "apscheduler_job_duration_seconds", "任务执行耗时", ("job_id",), DURATION_BUCKETS)
+job_schedule_lag = registry.histogram(
+    "apscheduler_job_schedule_lag_seconds", "计划时间到提交执行器的延迟", (), LATENCY_BUCKETS)
+job_queue_wait = registry.histogram(
+    "apscheduler_job_queue_wait_seconds", "提交执行器到开始执行的排队时间", (), DURATION_BUCKETS)
+job_misfires = registry.counter(
+    "apscheduler_job_misfires_total", "超过 misfire_grace_time 被跳过的运行次数", ("job_id",))
+job_max_instances = registry.counter(
+    "apscheduler_job_max_instances_total", "达到 max_instances 被跳过的运行次数", ("job_id",))
+jobstore_query_duration = registry.histogram(
+    "apscheduler_jobstore_query_duration_seconds", "jobstore SQL 执行耗时", ("operation",), QUERY_BUCKETS)
+alert_sends = registry.counter(
+    "apscheduler_alert_sends_total", "告警渠道发送次数", ("channel_type", "status"))
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP 请求耗时", ("method", "route", "status"), LATENCY_BUCKETS)
+
+
+def instrument_engine(engine, histogram: Histogram = jobstore_query_duration, table: str = None):
+    """
+    在 SQLAlchemy 引擎上记录每条语句的执行耗时，按语句类型（select/insert/update/delete）分组
+
+    引擎由多个模块共用时，传入 table 只记录涉及该表的语句
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if table is not None and table not in statement:
+            return
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        if table is not None and table not in statement:
+            return
+        starts = conn.info.get("metrics_query_start")
+        if not starts:
+            return
+        operation = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "other"
+        histogram.observe(time.perf_counter() - starts.pop(), operation)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        if table is not None and table not in (context.statement or ""):
+            return
+        starts = context.connection.info.get("metrics_query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
@@ -0,0 +1,238 @@
+"""
+远程执行器模块
+
+调度器不在本进程执行任务，而是把每次运行（任务 ID、函数、参数、计划执行时间）
+写入 Redis Stream，由独立的 worker 进程（python -m app.worker）通过消费组拉取执行，
+执行结果写回提交节点专属的结果 Stream，再由本模块转换为 APScheduler 事件，
+job_listener 照常写入 JobLog 并触发告警。
+"""
+
+import json
+import logging
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from apscheduler.events import EVENT_JOB_ERROR, JobExecutionEvent
+from apscheduler.executors.base import BaseExecutor, run_job
+from apscheduler.util import ref_to_obj
+from redis.exceptions import ResponseError
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class RemoteJobError(Exception):
+    """worker 端任务抛出的异常，保留原始异常类型名和信息"""
+
+    def __init__(self, message: str, exc_type: str = None):
+        super().__init__(message)
+        self.exc_type = exc_type
+
+
+def ensure_group(client, stream: str, group: str):
+    try:
+        client.xgroup_create(stream, group, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def encode_run(job, run_times: List[datetime], reply_to: str, run_id: str) -> Dict[str, str]:
+    """把一次任务运行编码为 Stream 消息"""
+    payload = {
+        "run_id": run_id,
+        "job_id": job.id,
+        "jobstore": job._jobstore_alias,
+        "task": getattr(job.func, "task_name", None),
+        "func_ref": job.func_ref,
+        "args": list(job.args),
+        "kwargs": dict(job.kwargs),
+        "misfire_grace_time": job.misfire_grace_time,
+        "run_times": [run_time.isoformat() for run_time in run_times],
+        "reply_to": reply_to,
+        "submitted_at": time.time(),
+    }
+    return {"payload": json.dumps(payload, ensure_ascii=False)}
+
+
+def execute_run(payload: Dict[str, Any], resolve_task: Callable[[str], Optional[Callable]]) -> Dict[str, Any]:
+    """在 worker 中执行一次任务运行，返回可 JSON 序列化的结果消息"""
+    func = resolve_task(payload["task"]) if payload.get("task") else None
+    if func is None:
+        func = ref_to_obj(payload["func_ref"])
+
+    job = SimpleNamespace(
+        id=payload["job_id"],
+        func=func,
+        args=payload.get("args") or [],
+        kwargs=payload.get("kwargs") or {},
+        misfire_grace_time=payload.get("misfire_grace_time"),
+    )
+    run_times = [datetime.fromisoformat(value) for value in payload["run_times"]]
+    events = run_job(job, payload.get("jobstore"), run_times, logger.name)
+
+    return {
+        "run_id": payload["run_id"],
+        "job_id": payload["job_id"],
+        "events": [
+            {
+                "code": event.code,
+                "scheduled_run_time": event.scheduled_run_time.isoformat(),
+                "retval": event.retval,
+                "exception": str(event.exception) if event.exception is not None else None,
+                "exc_type": type(event.exception).__name__ if event.exception is not None else None,
+                "traceback": event.traceback,
+            }
+            for event in events
+        ],
+    }
+
+
+class RedisQueueExecutor(BaseExecutor):
+    """把任务运行投递到 Redis Stream 的 APScheduler 执行器"""
+
+    def __init__(self, client_factory: Callable[[], Any], stream: str = "apscheduler:runs", group: str = "workers",
+                 result_timeout: float = 3600.0):
+        super().__init__()
+        self._client_factory = client_factory
+        self.stream = stream
+        self.group = group
+        self.result_timeout = result_timeout
+        self.reply_stream = f"{stream}:results:{socket.gethostname()}:{uuid.uuid4().hex[:8]}"
+        self._client = None
+        self._pending: Dict[str, tuple] = {}
+        self._pending_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "timed_out": 0, "redis_errors": 0}
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        self._client = self._client_factory()
+        ensure_group(self._client, self.stream, self.group)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._consume_results, name="remote-executor-results", daemon=True)
+        self._thread.start()
+        logger.info(f"远程执行器已启动: 任务队列 {self.stream}, 结果队列 {self.reply_stream}")
+
+    def shutdown(self, wait=True):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._pending_lock:
+            pending = len(self._pending)
+        if pending:
+            logger.warning(f"远程执行器关闭时仍有 {pending} 个运行未返回结果")
+        else:
+            try:
+                self._client.delete(self.reply_stream)
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        with self._pending_lock:
+            stats["in_flight"] = len(self._pending)
+        try:
+            stats["queue_length"] = self._client.xlen(self.stream) if self._client is not None else None
+        except Exception:
+            stats["queue_length"] = None
+        stats["stream"] = self.stream
+        stats["reply_stream"] = self.reply_stream
+        return stats
+
+    def _do_submit_job(self, job, run_times):
+        run_id = uuid.uuid4().hex
+        message = encode_run(job, run_times, self.reply_stream, run_id)
+        with self._pending_lock:
+            self._pending[run_id] = (job.id, job._jobstore_alias, run_times, time.monotonic() + self.result_timeout)
+        try:
+            self._client.xadd(self.stream, message)
+        except BaseException:
+            with self._pending_lock:
+                self._pending.pop(run_id, None)
+            raise
+        self._incr("submitted")
+
+    def _consume_results(self):
+        last_id = "0-0"
+        while not self._stop_event.is_set():
+            try:
+                response = self._client.xread({self.reply_stream: last_id}, count=100, block=1000)
+            except Exception as e:
+                self._incr("redis_errors")
+                logger.warning(f"读取远程执行结果失败: {e}")
+                self._stop_event.wait(1)
+                continue
+
+            for _, messages in response or []:
+                for message_id, fields in messages:
+                    last_id = message_id
+                    self._handle_result(fields)
+                    try:
+                        self._client.xdel(self.reply_stream, message_id)
+                    except Exception:
+                        pass
+
+            self._expire_pending()
+
+    def _handle_result(self, fields):
+        raw = fields.get(b"payload", fields.get("payload"))
+        try:
+            result = json.loads(raw)
+        except (TypeError, ValueError) as e:
+            logger.error(f"无法解析远程执行结果: {e}")
+            return
+
+        with self._pending_lock:
+            pending = self._pending.pop(result["run_id"], None)
+        if pending is None:
+            logger.warning(f"收到未知或已超时的运行结果: {result.get('job_id')} ({result['run_id']})")
+            return
+
+        job_id, jobstore_alias, _, _ = pending
+        events = []
+        for item in result["events"]:
+            exception = None
+            if item.get("exception") is not None:
+                exception = RemoteJobError(item["exception"], item.get("exc_type"))
+            events.append(JobExecutionEvent(
+                item["code"],
+                job_id,
+                jobstore_alias,
+                datetime.fromisoformat(item["scheduled_run_time"]),
+                retval=item.get("retval"),
+                exception=exception,
+                traceback=item.get("traceback"),
+            ))
+        self._incr("completed")
+        self._run_job_success(job_id, events)
+
+    def _expire_pending(self):
+        """worker 崩溃时运行永远不会返回，超时后按失败处理，释放 max_instances 占用"""
+        now = time.monotonic()
+        with self._pending_lock:
+            expired = [(run_id, item) for run_id, item in self._pending.items() if item[3] <= now]
+            for run_id, _ in expired:
+                del self._pending[run_id]
+
+        for run_id, (job_id, jobstore_alias, run_times, _) in expired:
+            self._incr("timed_out")
+            exception = RemoteJobError(f"远程执行超过 {self.result_timeout} 秒未返回结果", "TimeoutError")
+            events = [
+                JobExecutionEvent(EVENT_JOB_ERROR, job_id, jobstore_alias, run_time, exception=exception)
+                for run_time in run_times
+            ]
+            self._run_job_success(job_id, events)
+
+    def _incr(self, key: str, value: int = 1):
+        with self._stats_lock:
+            self._stats[key] += value
@@ -0,0 +1,195 @@
+"""
+任务运行时延统计模块
+
+以 job_id@scheduled_run_time 作为运行 ID，记录每次运行的计划时间、提交时间、开始时间和结束时间：
+
+- schedule_lag_ms：提交时间 - 计划时间，调度器延迟
+- queue_wait_ms：开始时间 - 提交时间，执行器排队等待
+- run_ms：结束时间 - 开始时间，任务本身耗时
+- total_ms：结束时间 - 计划时间
+
+记录保存在内存环形缓冲区中，按任务和全局计算 p50/p95/p99。
+
+提交时间由执行器在提交任务时记录（SubmitTimingMixin）。APScheduler 的 EVENT_JOB_SUBMITTED 在提交并写回
+jobstore 之后才发出，执行很快的任务此时可能已经开始甚至结束，不能作为提交时间。
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LATENCY_FIELDS = ("schedule_lag_ms", "queue_wait_ms", "run_ms", "total_ms")
+
+
+def make_run_id(job_id: str, scheduled_run_time: datetime) -> str:
+    return f"{job_id}@{scheduled_run_time.isoformat()}"
+
+
+def _ms(end: Optional[float], start: Optional[float]) -> Optional[float]:
+    if end is None or start is None:
+        return None
+    return round(max(0.0, end - start) * 1000, 3)
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """最近秩法百分位数"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct * len(sorted_values) / 100))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(records) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {"count": len(records)}
+    for field in LATENCY_FIELDS:
+        values = sorted(r[field] for r in records if r.get(field) is not None)
+        summary[field] = {
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "max": values[-1] if values else None,
+            "avg": round(sum(values) / len(values), 3) if values else None,
+        }
+    return summary
+
+
+class RunMetrics:
+    """按运行 ID 跟踪任务运行，保存最近的运行记录"""
+
+    def __init__(self, job_window: int = 500, global_window: int = 20000, max_jobs: int = 5000,
+                 max_pending: int = 10000):
+        self._lock = threading.Lock()
+        self._job_window = max(1, job_window)
+        self._max_jobs = max(1, max_jobs)
+        self._max_pending = max(1, max_pending)
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        # 最近结束的运行 ID，迟到的提交记录不再计入进行中的运行
+        self._finished_ids: "OrderedDict[str, None]" = OrderedDict()
+        self._by_job: "OrderedDict[str, deque]" = OrderedDict()
+        self._recent: deque = deque(maxlen=max(1, global_window))
+
+    def submitted(self, job_id: str, scheduled_run_times: List[datetime], submitted_at: float = None):
+        """记录提交时间；已在跟踪或已结束的运行忽略（保留最早的提交时间）"""
+        submitted_at = submitted_at or time.time()
+        with self._lock:
+            for run_time in scheduled_run_times:
+                run_id = make_run_id(job_id, run_time)
+                if run_id in self._pending or run_id in self._finished_ids:
+                    continue
+                self._pending[run_id] = {
+                    "run_id": run_id,
+                    "job_id": job_id,
+                    "scheduled_at": run_time.timestamp(),
+                    "submitted_at": submitted_at,
+                }
+            # worker 崩溃等原因没有结束事件的运行，超出上限时丢弃最早的
+            while len(self._pending) > self._max_pending:
+                self._pending.pop(next(iter(self._pending)))
+
+    def discard(self, job_id: str, scheduled_run_time: datetime):
+        with self._lock:
+            self._pending.pop(make_run_id(job_id, scheduled_run_time), None)
+
+    def finished(self, job_id: str, scheduled_run_time: datetime, status: bool, started_at: float = None,
+                 finished_at: float = None) -> Dict[str, Any]:
+        """记录运行结束并返回完整的运行记录"""
+        finished_at = finished_at or time.time()
+        run_id = make_run_id(job_id, scheduled_run_time)
+        with self._lock:
+            record = self._pending.pop(run_id, None) or {
+                "run_id": run_id,
+                "job_id": job_id,
+                "scheduled_at": scheduled_run_time.timestamp(),
+                "submitted_at": None,
+            }
+            self._finished_ids[run_id] = None
+            while len(self._finished_ids) > self._max_pending:
+                self._finished_ids.popitem(last=False)
+            record["started_at"] = started_at
+            record["finished_at"] = finished_at
+            record["status"] = status
+            record["schedule_lag_ms"] = _ms(record["submitted_at"], record["scheduled_at"])
+            record["queue_wait_ms"] = _ms(started_at, record["submitted_at"])
+            record["run_ms"] = _ms(finished_at, started_at or record["submitted_at"])
+            record["total_ms"] = _ms(finished_at, record["scheduled_at"])
+
+            runs = self._by_job.get(job_id)
+            if runs is None:
+                runs = self._by_job[job_id] = deque(maxlen=self._job_window)
+                # 一次性任务运行后即被删除，只保留最近有运行的任务
+                while len(self._by_job) > self._max_jobs:
+                    self._by_job.popitem(last=False)
+            else:
+                self._by_job.move_to_end(job_id)
+            runs.append(record)
+            self._recent.append(record)
+        return record
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = list(self._recent)
+            pending = len(self._pending)
+        result = summarize(recent)
+        result["in_flight"] = pending
+        return result
+
+    def job_summary(self, job_id: str, recent: int = 20) -> Dict[str, Any]:
+        with self._lock:
+            runs = list(self._by_job.get(job_id, ()))
+            in_flight = sum(1 for r in self._pending.values() if r["job_id"] == job_id)
+        result = summarize(runs)
+        result["job_id"] = job_id
+        result["in_flight"] = in_flight
+        result["recent"] = [self._format(r) for r in runs[-recent:]][::-1] if recent else []
+        return result
+
+    def jobs_summary(self, sort: str = "total_ms", limit: int = 50) -> List[Dict[str, Any]]:
+        """按 p95 从高到低列出各任务的时延统计"""
+        with self._lock:
+            snapshot = {job_id: list(runs) for job_id, runs in self._by_job.items()}
+        items = []
+        for job_id, runs in snapshot.items():
+            item = summarize(runs)
+            item["job_id"] = job_id
+            items.append(item)
+        items.sort(key=lambda item: item.get(sort, {}).get("p95") or 0, reverse=True)
+        return items[:limit]
+
+    @staticmethod
+    def _format(record: Dict[str, Any]) -> Dict[str, Any]:
+        formatted = dict(record)
+        for key in ("scheduled_at", "submitted_at", "started_at", "finished_at"):
+            if formatted.get(key) is not None:
+                formatted[key] = datetime.fromtimestamp(formatted[key]).isoformat()
+        return formatted
+
+
+class SubmitTimingMixin:
+    """
+    APScheduler 执行器混入类：在 submit_job 交给执行器之前记录提交时间
+
+    执行器在 _do_submit_job 中开始运行任务，记录必须在此之前完成，结束事件才能找到对应的提交记录；
+    达到 max_instances 等原因提交失败时撤销记录
+    """
+
+    def __init__(self, *args, run_metrics: RunMetrics = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.run_metrics = run_metrics
+
+    def submit_job(self, job, run_times):
+        if self.run_metrics is None:
+            return super().submit_job(job, run_times)
+        self.run_metrics.submitted(job.id, run_times)
+        try:
+            return super().submit_job(job, run_times)
+        except BaseException:
+            for run_time in run_times:
+                self.run_metrics.discard(job.id, run_time)
+            raise
@@ -1,79 +1,186 @@
+import asyncio
+import inspect
 import logging
+import pickle
 import time
-from typing import Any, Dict, Optional
-from typing import Any, Dict, Optional
-
-from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_SUBMITTED
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from traceback import format_tb
+from typing import Any, Dict, List, Optional, Tuple
+
+from apscheduler.events import (
+    EVENT_JOB_ADDED,
+    EVENT_JOB_ERROR,
+    EVENT_JOB_EXECUTED,
+    EVENT_JOB_MAX_INSTANCES,
+    EVENT_JOB_MISSED,
+    EVENT_JOB_MODIFIED,
+    EVENT_JOB_REMOVED,
+    JobExecutionEvent,
+)
+from apscheduler.job import Job
+from apscheduler.schedulers.base import STATE_RUNNING, STATE_STOPPED
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
-from apscheduler.executors.pool import ThreadPoolExecutor
+import apscheduler.executors.base as executor_base
+from apscheduler.executors.pool import ProcessPoolExecutor, ThreadPoolExecutor
 from apscheduler.triggers.date import DateTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
-
-from app.core.conf import DATABASE_URL
-from app.core.database import _session_factory, get_config_bool, get_config_int
-from app.models.sql_model import JobLog
+from apscheduler.util import datetime_to_utc_timestamp
+from sqlalchemy import bindparam, select
+
+from app.core.conf import (
+    ASYNC_EXECUTOR_MAX_CONCURRENCY,
+    EXECUTOR_MODE,
+    PROCESS_POOL_SIZE,
+    REMOTE_EXECUTOR_GROUP,
+    REMOTE_EXECUTOR_RESULT_TIMEOUT,
+    REMOTE_EXECUTOR_STREAM,
+    RUN_METRICS_GLOBAL_WINDOW,
+    RUN_METRICS_JOB_WINDOW,
+    SCHEDULER_FOLLOWER_REFRESH_INTERVAL,
+    SCHEDULER_HA_ENABLED,
+    SCHEDULER_LEADER_KEY,
+    SCHEDULER_LEADER_RENEW_INTERVAL,
+    SCHEDULER_LEADER_TTL,
+)
+from app.core.database import _session_factory, engine, get_config_bool, get_config_int, get_redis
+from app.services.alert import alert_dispatcher, submit_alert
+from app.services.async_executor import AsyncIOLoopExecutor
+from app.services.job_catalog import CATALOG_EVENTS, JobCatalog, job_to_info
+from app.services.leader import LeaderElector
+from app.services.log_writer import log_writer
+from app.services import metrics
+from app.services.remote_executor import RedisQueueExecutor
+from app.services.run_metrics import RunMetrics, SubmitTimingMixin
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 与应用共用引擎：同一个连接池和 SQLite 连接参数，避免两个连接池争用同一个数据库文件的写锁
 jobstores = {
-    'default': SQLAlchemyJobStore(url=DATABASE_URL)
+    'default': SQLAlchemyJobStore(engine=engine)
 }
+metrics.instrument_engine(engine, table=jobstores['default'].jobs_t.name)
+
+run_metrics = RunMetrics(RUN_METRICS_JOB_WINDOW, RUN_METRICS_GLOBAL_WINDOW)
+
+
+class _ThreadPoolExecutor(SubmitTimingMixin, ThreadPoolExecutor):
+    pass
+
+
+class _AsyncIOLoopExecutor(SubmitTimingMixin, AsyncIOLoopExecutor):
+    pass
+
+
+class _RedisQueueExecutor(SubmitTimingMixin, RedisQueueExecutor):
+    pass
+
+
+class _ProcessPoolExecutor(SubmitTimingMixin, ProcessPoolExecutor):
+    """子进程异常退出（OOM、段错误等）时同样产生 EVENT_JOB_ERROR，由 job_listener 记录失败日志"""
+
+    def _do_submit_job(self, job, run_times):
+        def callback(f):
+            exc = f.exception()
+            if exc is None:
+                self._run_job_success(job.id, f.result())
+                return
+            formatted_tb = "".join(format_tb(exc.__traceback__)) if exc.__traceback__ else None
+            events = [
+                JobExecutionEvent(EVENT_JOB_ERROR, job.id, job._jobstore_alias, run_time,
+                                  exception=exc, traceback=formatted_tb)
+                for run_time in run_times
+            ]
+            self._run_job_success(job.id, events)
+
+        try:
+            f = self._pool.submit(executor_base.run_job, job, job._jobstore_alias, run_times, self._logger.name)
+        except BrokenProcessPool:
+            self._logger.warning("进程池已损坏，重新创建")
+            self._pool = self._pool.__class__(self._pool._max_workers, **self.pool_kwargs)
+            f = self._pool.submit(executor_base.run_job, job, job._jobstore_alias, run_times, self._logger.name)
+        f.add_done_callback(callback)
+
+
 executors = {
-    'default': ThreadPoolExecutor(20)
+    'default': _ThreadPoolExecutor(20, run_metrics=run_metrics),
+    # CPU 密集型任务在独立进程中执行，避免占用 GIL 拖慢其他任务
+    'process': _ProcessPoolExecutor(PROCESS_POOL_SIZE, run_metrics=run_metrics),
+    # async def 任务在专用事件循环中并发运行，I/O 等待不占用线程
+    'asyncio': _AsyncIOLoopExecutor(ASYNC_EXECUTOR_MAX_CONCURRENCY, run_metrics=run_metrics),
 }
+if EXECUTOR_MODE == "remote":
+    executors['default'] = _RedisQueueExecutor(
+        get_redis,
+        stream=REMOTE_EXECUTOR_STREAM,
+        group=REMOTE_EXECUTOR_GROUP,
+        result_timeout=REMOTE_EXECUTOR_RESULT_TIMEOUT,
+        run_metrics=run_metrics,
+    )
 job_defaults = {
     'coalesce': True,
     'max_instances': 3,
     'misfire_grace_time': None
 }
 
-scheduler = BackgroundScheduler(jobstores=jobstores, executors=executors, job_defaults=job_defaults)
+
+class _Scheduler(BackgroundScheduler):
+    def _process_jobs(self):
+        # shutdown() 会在状态置为 STOPPED 后再唤醒一次调度线程，此时不应再提交任务；
+        # 备节点暂停期间积压的到期任务也不能在退出时被提交
+        if self.state == STATE_STOPPED:
+            return None
+        return super()._process_jobs()
+
+
+scheduler = _Scheduler(jobstores=jobstores, executors=executors, job_defaults=job_defaults)
+job_catalog = JobCatalog(scheduler)
 
 
 def log_to_db(job_id, status, message, duration=None, output=None):
-    try:
-        db = _session_factory()
-        new_log = JobLog(
-            job_id=job_id,
-            status=status,
-            message=message,
-            duration=duration,
-            output=output
-        )
-        db.add(new_log)
-        db.commit()
-    except Exception as e:
-        logger.error(f"日志记录失败: {e}")
-    finally:
-        try:
-            db.close()
-        except Exception:
-            pass
+    log_writer.write(job_id, status, message, duration, output)
 
 
-task_start_times = {}
+def _observe_run(job_id, record, result):
+    metrics.job_executions.inc(job_id, "success" if record['status'] else "failure")
+    duration_ms = result.get('elapsed_time') if isinstance(result, dict) else None
+    if duration_ms is None:
+        duration_ms = record['run_ms']
+    if duration_ms is not None:
+        metrics.job_duration.observe(duration_ms / 1000, job_id)
+    if record['schedule_lag_ms'] is not None:
+        metrics.job_schedule_lag.observe(record['schedule_lag_ms'] / 1000)
+    if record['queue_wait_ms'] is not None:
+        metrics.job_queue_wait.observe(record['queue_wait_ms'] / 1000)
 
 
 def job_listener(event):
     job_id = event.job_id
 
-    if event.code == EVENT_JOB_SUBMITTED:
-        task_start_times[job_id] = int(time.time() * 1000)
+    # 提交时间由执行器记录（SubmitTimingMixin），EVENT_JOB_SUBMITTED 发出时任务可能已经结束
+    if event.code == EVENT_JOB_MISSED:
+        run_metrics.discard(job_id, event.scheduled_run_time)
+        metrics.job_misfires.inc(job_id)
+
+    elif event.code == EVENT_JOB_MAX_INSTANCES:
+        metrics.job_max_instances.inc(job_id)
 
     elif event.code in (EVENT_JOB_EXECUTED, EVENT_JOB_ERROR):
-        end_time = int(time.time() * 1000)
-        start_time = task_start_times.pop(job_id, end_time)
-        execution_duration = end_time - start_time
+        result = getattr(event, 'retval', None)
+        started_at = result.get('started_at') if isinstance(result, dict) else None
+        succeeded = event.exception is None and (result.get('status', True) if isinstance(result, dict) else True)
+        record = run_metrics.finished(job_id, event.scheduled_run_time, bool(succeeded), started_at)
+        execution_duration = int(record['run_ms'] or 0)
+        _observe_run(job_id, record, result)
 
         if event.exception:
             log_to_db(job_id, False, str(event.exception), execution_duration, None)
             logger.error(f"任务 {job_id} 执行失败: {event.exception}")
             
-            from app.services.alert import check_and_alert
-            check_and_alert(job_id, False, execution_duration, str(event.exception))
+            submit_alert(job_id, False, execution_duration, str(event.exception))
         else:
             if hasattr(event, 'retval'):
                 result = event.retval
@@ -93,47 +200,107 @@ def job_listener(event):
                         log_to_db(job_id, True, '任务成功执行', duration, output)
                         logger.info(f"任务 {job_id} 执行成功: {output}. 执行时长: {duration}毫秒")
                         
-                        from app.services.alert import check_and_alert, reset_fail_count
-                        reset_fail_count(job_id)
-                        check_and_alert(job_id, True, duration, None)
+                        submit_alert(job_id, True, duration, None)
                     else:
                         log_to_db(job_id, False, error or '任务执行失败', duration, output)
                         logger.error(f"任务 {job_id} 执行失败: {error or '未知错误'}. 执行时长: {duration}毫秒")
                         
-                        from app.services.alert import check_and_alert
-                        check_and_alert(job_id, False, duration, error)
+                        submit_alert(job_id, False, duration, error)
                 elif isinstance(result, tuple) and len(result) == 2:
                     duration, output = result
                     log_to_db(job_id, True, '任务成功执行', duration, output)
                     logger.info(f"任务 {job_id} 执行成功: {output}. 执行时长: {duration}毫秒")
                     
-                    from app.services.alert import check_and_alert, reset_fail_count
-                    reset_fail_count(job_id)
-                    check_and_alert(job_id, True, duration, None)
+                    submit_alert(job_id, True, duration, None)
                 else:
                     log_to_db(job_id, True, '任务成功执行', execution_duration, str(result))
                     logger.info(f"任务 {job_id} 执行成功: {result}. 执行时长: {execution_duration}毫秒")
                     
-                    from app.services.alert import check_and_alert, reset_fail_count
-                    reset_fail_count(job_id)
-                    check_and_alert(job_id, True, execution_duration, None)
+                    submit_alert(job_id, True, execution_duration, None)
             else:
                 log_to_db(job_id, True, '任务成功执行', execution_duration, '无输出内容')
                 logger.info(f"任务 {job_id} 执行成功，无返回值. 执行时长: {execution_duration}毫秒")
                 
-                from app.services.alert import check_and_alert, reset_fail_count
-                reset_fail_count(job_id)
-                check_and_alert(job_id, True, execution_duration, None)
+                submit_alert(job_id, True, execution_duration, None)
+
+
+def _on_elected():
+    """成为主节点：恢复调度循环并以 jobstore 为准重建任务目录"""
+    scheduler.resume()
+    job_catalog.rebuild()
+    _cleanup_invalid_jobs()
+
+
+def _on_revoked():
+    """失去主节点身份：暂停调度循环，已在执行的任务不受影响"""
+    if scheduler.state == STATE_RUNNING:
+        scheduler.pause()
+
+
+_last_catalog_refresh = 0.0
+
+
+def _on_leader_tick(is_leader, jobs_changed):
+    global _last_catalog_refresh
+    if is_leader:
+        if jobs_changed:
+            job_catalog.rebuild()
+        # 备节点写入的任务不会唤醒主节点，每个周期唤醒一次以读取最新的下次执行时间
+        scheduler.wakeup()
+        return
+
+    # 备节点不执行任务，下次执行时间只能从 jobstore 重新读取
+    now = time.monotonic()
+    if jobs_changed or now - _last_catalog_refresh >= SCHEDULER_FOLLOWER_REFRESH_INTERVAL:
+        job_catalog.rebuild()
+        _last_catalog_refresh = now
+
+
+def _ha_job_listener(event):
+    leader_elector.notify_jobs_changed()
+
+
+leader_elector = LeaderElector(
+    get_redis,
+    key=SCHEDULER_LEADER_KEY,
+    ttl=SCHEDULER_LEADER_TTL,
+    renew_interval=SCHEDULER_LEADER_RENEW_INTERVAL,
+    on_elected=_on_elected,
+    on_revoked=_on_revoked,
+    on_tick=_on_leader_tick,
+) if SCHEDULER_HA_ENABLED else None
 
 
 def start_scheduler():
     import app.services.tasks
-    scheduler.add_listener(job_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+    log_writer.start()
+    alert_dispatcher.start()
+    scheduler.add_listener(
+        job_listener,
+        EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR,
+    )
+    scheduler.add_listener(job_catalog.listener, CATALOG_EVENTS)
+
+    if leader_elector is not None:
+        # 以暂停状态启动：jobstore 可读写，但只有选举成功的主节点才运行调度循环
+        scheduler.add_listener(_ha_job_listener, EVENT_JOB_ADDED | EVENT_JOB_MODIFIED | EVENT_JOB_REMOVED)
+        scheduler.start(paused=True)
+        job_catalog.rebuild()
+        logger.info("定时任务已以备用模式启动，等待主备选举")
+
+        setup_auto_cleanup()
+        setup_partition_maintenance()
+        _load_custom_tasks()
+        leader_elector.start()
+        return
+
     scheduler.start()
+    job_catalog.rebuild()
     logger.info("定时任务已启动")
     
     _cleanup_invalid_jobs()
     setup_auto_cleanup()
+    setup_partition_maintenance()
     _load_custom_tasks()
 
 
@@ -162,8 +329,7 @@ def _cleanup_invalid_jobs():
             except (LookupError, AttributeError):
                 logger.warning(f"发现无效任务引用: {job.id}, 正在移除...")
                 
-                from app.services.alert import check_and_alert
-                check_and_alert(job.id, False, None, "任务不存在或已被移除", job_exists=False)
+                submit_alert(job.id, False, None, "任务不存在或已被移除", job_exists=False)
                 
                 try:
                     scheduler.remove_job(job.id)
@@ -216,60 +382,106 @@ def setup_auto_cleanup():
     logger.info(f"已添加自动日志清理任务: 每天 {cleanup_hour}:00 执行")
 
 
+def setup_partition_maintenance():
+    """启用日志分区时每小时预建未来的分区，缺少分区会导致日志写入失败"""
+    from app.core.database import log_partitions
+    from app.services.tasks import get_task
+    
+    job_id = "maintain_log_partitions"
+    if log_partitions is None:
+        try:
+            if scheduler.get_job(job_id):
+                scheduler.remove_job(job_id)
+                logger.info("已移除日志分区维护任务")
+        except LookupError:
+            scheduler.remove_job(job_id)
+        return
+    
+    task_func = get_task(job_id)
+    if not task_func:
+        logger.warning("找不到 maintain_log_partitions 任务函数，跳过分区维护设置")
+        return
+    
+    scheduler.add_job(task_func, CronTrigger(minute=5), id=job_id, replace_existing=True)
+    logger.info("已添加日志分区维护任务: 每小时 5 分执行")
+
+
 def update_auto_cleanup_schedule():
     setup_auto_cleanup()
 
 
 def stop_scheduler():
+    if leader_elector is not None:
+        leader_elector.stop()
     scheduler.shutdown()
+    alert_dispatcher.stop()
+    log_writer.stop()
 
 
-def add_job(func_name, trigger, args=None, kwargs=None, job_id=None, name=None, **trigger_args):
-    from app.services.tasks import get_task, custom_task_dispatcher
-    from app.services.custom_tasks import get_custom_task as get_custom_task_from_db
-    
+def _build_trigger(trigger, trigger_args):
+    if trigger == "cron":
+        return CronTrigger(**trigger_args)
+    elif trigger == "interval":
+        return IntervalTrigger(**trigger_args)
+    elif trigger == "date":
+        return DateTrigger(**trigger_args)
+    raise ValueError(f"不支持的触发器类型 '{trigger}'")
+
+
+def _pick_executor(task_func, executor=None):
+    """未指定执行器时使用任务在 @task(executor=...) 中声明的执行器，async def 任务只能使用 asyncio 执行器"""
+    is_async = getattr(task_func, 'is_async', False)
+    executor = executor or getattr(task_func, 'task_executor', None) or ('asyncio' if is_async else 'default')
+    if executor not in executors:
+        raise ValueError(f"不支持的执行器 '{executor}'，可选: {', '.join(executors)}")
+    if is_async != (executor == 'asyncio'):
+        raise ValueError("async def 任务只能使用 asyncio 执行器" if is_async else "asyncio 执行器只能运行 async def 任务")
+    return executor
+
+
+def _resolve_job_target(func_name, args=None, executor=None):
+    """
+    返回 (调度函数, 调用参数, 是否自定义任务, 执行器)，自定义任务统一经 custom_task_dispatcher
+    （async def 任务经 async_task_dispatcher）调度
+    """
+    from app.services.tasks import get_task, custom_task_dispatcher, async_task_dispatcher
+
     task_func = get_task(func_name)
     if not task_func:
         raise ValueError(f"任务函数 '{func_name}' 找不到")
-    
-    if job_id and scheduler.get_job(job_id):
-        raise ValueError(f"任务 ID '{job_id}' 已存在")
 
-    if trigger == "cron":
-        aps_trigger = CronTrigger(**trigger_args)
-    elif trigger == "interval":
-        aps_trigger = IntervalTrigger(**trigger_args)
-    elif trigger == "date":
-        aps_trigger = DateTrigger(**trigger_args)
-    else:
-        raise ValueError(f"不支持的触发器类型 '{trigger}'")
+    executor = _pick_executor(task_func, executor)
 
     # 检查是否是自定义任务
     is_custom = hasattr(task_func, 'code') or (hasattr(task_func, 'task_name') and hasattr(task_func, 'task_category'))
-    
     if is_custom:
         # 自定义任务使用调度器，确保可以序列化
-        job = scheduler.add_job(
-            custom_task_dispatcher,
-            aps_trigger,
-            args=[func_name] + (args or []),
-            kwargs=kwargs or {},
-            id=job_id,
-            name=name,
-        )
-    else:
-        # 内置任务直接使用函数
-        job = scheduler.add_job(
-            task_func,
-            aps_trigger,
-            args=args,
-            kwargs=kwargs,
-            id=job_id,
-            name=name,
-        )
+        dispatcher = async_task_dispatcher if getattr(task_func, 'is_async', False) else custom_task_dispatcher
+        return dispatcher, [func_name] + (args or []), True, executor
+    # 内置任务直接使用函数
+    return task_func, args, False, executor
+
+
+def add_job(func_name, trigger, args=None, kwargs=None, job_id=None, name=None, executor=None, **trigger_args):
+    func, job_args, is_custom, executor = _resolve_job_target(func_name, args, executor)
+    
+    if job_id and scheduler.get_job(job_id):
+        raise ValueError(f"任务 ID '{job_id}' 已存在")
+
+    aps_trigger = _build_trigger(trigger, trigger_args)
+
+    job = scheduler.add_job(
+        func,
+        aps_trigger,
+        args=job_args,
+        kwargs=kwargs or {},
+        id=job_id,
+        name=name,
+        executor=executor,
+    )
     
     actual_job_id = job.id
-    logger.info(f'添加任务: {actual_job_id} ({name or "无名称"}) [自定义任务: {is_custom}]')
+    logger.info(f'添加任务: {actual_job_id} ({name or "无名称"}) [自定义任务: {is_custom}, 执行器: {executor}]')
     return actual_job_id
 
 
@@ -278,8 +490,9 @@ def remove_job(job_id):
     logger.info(f'移除任务: {job_id}')
 
 
-def update_job(func: str, job_id: str, trigger: str, trigger_args: dict, args: list, kwargs: dict, name: str = None):
-    from app.services.tasks import get_task, custom_task_dispatcher
+def update_job(func: str, job_id: str, trigger: str, trigger_args: dict, args: list, kwargs: dict, name: str = None,
+               executor: str = None):
+    from app.services.tasks import get_task, custom_task_dispatcher, async_task_dispatcher
     
     task_func = get_task(func)
     if not task_func:
@@ -308,13 +521,19 @@ def update_job(func: str, job_id: str, trigger: str, trigger_args: dict, args: l
     # 检查是否是自定义任务
     is_custom = hasattr(task_func, 'code') or (hasattr(task_func, 'task_name') and hasattr(task_func, 'task_category'))
     
+    is_async = getattr(task_func, 'is_async', False)
+    
     if is_custom:
-        modify_kwargs = {"args": [func] + (args or []), "kwargs": kwargs or {}, "func": custom_task_dispatcher}
+        dispatcher = async_task_dispatcher if is_async else custom_task_dispatcher
+        modify_kwargs = {"args": [func] + (args or []), "kwargs": kwargs or {}, "func": dispatcher}
     else:
         modify_kwargs = {"args": args, "kwargs": kwargs, "func": task_func}
     
     if name is not None:
         modify_kwargs["name"] = name
+    # 未指定执行器且原执行器与新任务函数兼容时保持不变
+    if executor is not None or (job.executor == 'asyncio') != is_async:
+        modify_kwargs["executor"] = _pick_executor(task_func, executor)
     job.modify(**modify_kwargs)
     scheduler.reschedule_job(job_id, trigger=trigger_obj)
     
@@ -334,17 +553,293 @@ def resume_job(job_id):
     logger.info(f'恢复任务: {job_id}')
 
 
+BULK_ACTIONS = ("add", "pause", "resume", "remove")
+_BULK_CHUNK_SIZE = 500
+
+
+def bulk_apply_jobs(operations: List[Dict[str, Any]], atomic: bool = True) -> Dict[str, Any]:
+    """
+    批量新增/暂停/恢复/删除任务
+
+    先逐项校验并在内存中构造最终的 Job 状态，再在同一个 jobstore 事务中
+    批量 INSERT/UPDATE/DELETE，整批只唤醒一次调度器。
+    atomic=True 时任一项校验失败整批都不写入；为 False 时跳过失败项，写入其余项。
+    操作项中带有 error 字段表示调用方预校验已失败。
+
+    直接写 jobstore 表，不经过 scheduler.add_job 等接口，因此不会分发 EVENT_JOB_ADDED / EVENT_JOB_MODIFIED /
+    EVENT_JOB_REMOVED：任务目录在写入后直接更新，主备部署下只递增一次任务版本号，
+    其他依赖这三个事件的监听器需要改用单个任务的接口。
+    依赖的 APScheduler 内部接口：scheduler._jobstores_lock、scheduler._job_defaults、
+    SQLAlchemyJobStore.jobs_t / _reconstitute_job（APScheduler 3.x）。
+    """
+    if scheduler.state == STATE_STOPPED:
+        raise ValueError("调度器未启动")
+
+    store = jobstores['default']
+    results = [
+        {
+            "index": index,
+            "action": op.get("action"),
+            "job_id": op.get("job_id"),
+            "success": False,
+            "msg": None,
+        }
+        for index, op in enumerate(operations)
+    ]
+
+    with scheduler._jobstores_lock:
+        existing, broken = _load_jobs(store, {r["job_id"] for r in results if r["job_id"]})
+        now = datetime.now(scheduler.timezone)
+        seen = set()
+        inserts, updates, removes = [], [], []
+
+        for result, op in zip(results, operations):
+            try:
+                kind, job, msg = _prepare_bulk_operation(op, existing, broken, seen, now)
+            except Exception as e:
+                result["msg"] = str(e)
+                continue
+            result["job_id"] = job.id
+            result["msg"] = msg
+            result["success"] = True
+            if kind == "insert":
+                inserts.append(job)
+            elif kind == "update":
+                updates.append(job)
+            else:
+                removes.append(job.id)
+
+        failed = sum(1 for r in results if not r["success"])
+        if atomic and failed:
+            for result in results:
+                if result["success"]:
+                    result["success"] = False
+                    result["msg"] = "存在校验失败的操作，整批未执行"
+            return _bulk_summary(results, applied=False)
+
+        try:
+            _write_bulk(store, inserts, updates, removes)
+        except Exception as e:
+            logger.error(f"批量写入任务失败: {e}")
+            for result in results:
+                if result["success"]:
+                    result["success"] = False
+                    result["msg"] = f"写入失败: {e}"
+            return _bulk_summary(results, applied=False)
+
+        for job in inserts:
+            job._jobstore_alias = 'default'
+        job_catalog.apply(inserts + updates, removes)
+
+    if scheduler.state == STATE_RUNNING:
+        scheduler.wakeup()
+    if leader_elector is not None:
+        leader_elector.notify_jobs_changed()
+
+    logger.info(f"批量任务操作: 新增 {len(inserts)}, 更新 {len(updates)}, 删除 {len(removes)}, 失败 {failed}")
+    return _bulk_summary(results, applied=bool(inserts or updates or removes))
+
+
+def _prepare_bulk_operation(op: Dict[str, Any], existing: Dict[str, Any], broken: Dict[str, str], seen: set,
+                            now: datetime):
+    """校验单个操作，返回 (写入类型, Job, 提示信息)；broken 为 jobstore 中存在但无法加载的任务"""
+    if op.get("error"):
+        raise ValueError(op["error"])
+
+    action = op.get("action")
+    if action not in BULK_ACTIONS:
+        raise ValueError(f"不支持的操作类型 '{action}'")
+
+    job_id = op.get("job_id")
+    if job_id:
+        if job_id in seen:
+            raise ValueError(f"任务 ID '{job_id}' 在本批次中重复出现")
+        seen.add(job_id)
+
+    if job_id in broken:
+        raise ValueError(f"任务 {job_id} 无法加载: {broken[job_id]}")
+
+    if action == "add":
+        if job_id and job_id in existing:
+            raise ValueError(f"任务 ID '{job_id}' 已存在")
+        func, job_args, _, executor = _resolve_job_target(op.get("func"), op.get("args"), op.get("executor"))
+        trigger = _build_trigger(op.get("trigger"), op.get("trigger_args") or {})
+        job_kwargs = dict(scheduler._job_defaults)
+        job_kwargs.update(
+            trigger=trigger,
+            executor=executor,
+            func=func,
+            args=tuple(job_args or ()),
+            kwargs=dict(op.get("kwargs") or {}),
+            id=job_id,
+            name=op.get("name"),
+            next_run_time=trigger.get_next_fire_time(None, now),
+        )
+        job = Job(scheduler, **job_kwargs)
+        # 提前序列化，无法持久化的任务在校验阶段即失败
+        job.__getstate__()
+        seen.add(job.id)
+        return "insert", job, "任务已添加"
+
+    if not job_id:
+        raise ValueError("缺少任务 ID")
+    job = existing.get(job_id)
+    if job is None:
+        raise ValueError(f"计划任务 {job_id} 不存在")
+
+    if action == "pause":
+        job._modify(next_run_time=None)
+        return "update", job, "任务已暂停"
+    if action == "resume":
+        next_run_time = job.trigger.get_next_fire_time(None, now)
+        if next_run_time is None:
+            return "remove", job, "任务已无后续执行时间，已移除"
+        job._modify(next_run_time=next_run_time)
+        return "update", job, "任务已恢复"
+    return "remove", job, "任务已移除"
+
+
+def _load_jobs(store: SQLAlchemyJobStore, job_ids) -> Tuple[Dict[str, Job], Dict[str, str]]:
+    """按 ID 分块批量读取任务，代替逐个 lookup_job；返回 (任务, 无法反序列化的任务 ID -> 错误信息)"""
+    jobs, broken = {}, {}
+    job_ids = list(job_ids)
+    with store.engine.connect() as conn:
+        for offset in range(0, len(job_ids), _BULK_CHUNK_SIZE):
+            chunk = job_ids[offset:offset + _BULK_CHUNK_SIZE]
+            rows = conn.execute(
+                select(store.jobs_t.c.id, store.jobs_t.c.job_state).where(store.jobs_t.c.id.in_(chunk))
+            )
+            for row in rows:
+                try:
+                    jobs[row.id] = store._reconstitute_job(row.job_state)
+                except Exception as e:
+                    logger.warning(f"无法加载任务 {row.id}: {e}")
+                    broken[row.id] = str(e)
+    return jobs, broken
+
+
+def _write_bulk(store: SQLAlchemyJobStore, inserts: List[Job], updates: List[Job], removes: List[str]):
+    """在单个事务中写入全部变更"""
+    table = store.jobs_t
+
+    def row(job):
+        return {
+            "b_id": job.id,
+            "b_next_run_time": datetime_to_utc_timestamp(job.next_run_time),
+            "b_job_state": pickle.dumps(job.__getstate__(), store.pickle_protocol),
+        }
+
+    with store.engine.begin() as conn:
+        if inserts:
+            conn.execute(
+                table.insert().values(
+                    id=bindparam("b_id"),
+                    next_run_time=bindparam("b_next_run_time"),
+                    job_state=bindparam("b_job_state"),
+                ),
+                [row(job) for job in inserts],
+            )
+        if updates:
+            conn.execute(
+                table.update()
+                .where(table.c.id == bindparam("b_id"))
+                .values(next_run_time=bindparam("b_next_run_time"), job_state=bindparam("b_job_state")),
+                [row(job) for job in updates],
+            )
+        for offset in range(0, len(removes), _BULK_CHUNK_SIZE):
+            conn.execute(table.delete().where(table.c.id.in_(removes[offset:offset + _BULK_CHUNK_SIZE])))
+
+
+def _bulk_summary(results: List[Dict[str, Any]], applied: bool) -> Dict[str, Any]:
+    succeeded = sum(1 for r in results if r["success"])
+    return {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "applied": applied,
+        "results": results,
+    }
+
+
 def run_job(job_id):
     job = scheduler.get_job(job_id)
     if not job:
         raise ValueError(f"任务 {job_id} 不存在")
 
     result = job.func(*job.args, **job.kwargs)
+    if inspect.isawaitable(result):
+        result = asyncio.run(result)
     
     return result
 
 
+def get_scheduler_status() -> Dict[str, Any]:
+    """当前节点的调度状态，启用主备调度时附带选举信息"""
+    status = {
+        "state": {STATE_STOPPED: "stopped", STATE_RUNNING: "running"}.get(scheduler.state, "paused"),
+        "ha_enabled": leader_elector is not None,
+        "is_leader": leader_elector.is_leader if leader_elector is not None else scheduler.state == STATE_RUNNING,
+    }
+    if leader_elector is not None:
+        status["leader"] = leader_elector.status()
+    return status
+
+
+def get_executor_stats() -> Dict[str, Any]:
+    executor = executors['default']
+    if isinstance(executor, RedisQueueExecutor):
+        stats = {"mode": "remote", **executor.stats()}
+    else:
+        stats = {"mode": "local"}
+    stats["asyncio"] = executors['asyncio'].stats()
+    return stats
+
+
+def get_run_latency(job_id: str = None, recent: int = 20, limit: int = 50) -> Dict[str, Any]:
+    """运行时延百分位统计：不指定 job_id 时返回全局统计和按 p95 排序的任务列表"""
+    if job_id:
+        return run_metrics.job_summary(job_id, recent)
+    return {"global": run_metrics.summary(), "jobs": run_metrics.jobs_summary(limit=limit)}
+
+
+def _executor_pool_state() -> List[Dict[str, Any]]:
+    """各执行器的容量、在途、占用和排队运行数，只读取内存计数"""
+    states = []
+    for alias, executor in executors.items():
+        with executor._lock:
+            in_flight = sum(executor._instances.values())
+        state = {"executor": alias, "in_flight": in_flight, "max_workers": None, "busy": None, "queued": None}
+        if isinstance(executor, AsyncIOLoopExecutor):
+            stats = executor.stats()
+            state["max_workers"] = stats["max_concurrency"]
+            state["busy"] = stats["running"]
+        elif getattr(executor, "_pool", None) is not None:
+            state["max_workers"] = executor._pool._max_workers
+            state["busy"] = min(in_flight, state["max_workers"])
+        if state["busy"] is not None:
+            state["queued"] = max(0, in_flight - state["busy"])
+        states.append(state)
+    return states
+
+
+def _executor_gauge(field):
+    return lambda: [({"executor": state["executor"]}, state[field]) for state in _executor_pool_state()]
+
+
+metrics.registry.gauge_callback(
+    "apscheduler_executor_max_workers", "执行器最大并发数（线程数 / 进程数 / 协程并发上限）", _executor_gauge("max_workers"))
+metrics.registry.gauge_callback(
+    "apscheduler_executor_in_flight", "已提交尚未结束的运行数", _executor_gauge("in_flight"))
+metrics.registry.gauge_callback(
+    "apscheduler_executor_busy", "正在执行的运行数", _executor_gauge("busy"))
+metrics.registry.gauge_callback(
+    "apscheduler_executor_queued", "在执行器中排队等待空闲线程 / 进程的运行数", _executor_gauge("queued"))
+
+
 def get_all_jobs():
+    if job_catalog.loaded:
+        return job_catalog.list()
+
     try:
         jobs = scheduler.get_jobs()
     except LookupError as e:
@@ -354,50 +849,14 @@ def get_all_jobs():
         logger.error(f"获取任务列表失败: {e}")
         return []
     
-    job_info = []
-    for job in jobs:
-        try:
-            next_run = getattr(job, 'next_run_time', None)
-            
-            # 处理自定义任务的 func 名称
-            func_name = job.func.__name__ if hasattr(job.func, '__name__') else str(job.func)
-            args = list(job.args) if job.args else []
-            kwargs = dict(job.kwargs) if job.kwargs else {}
-            
-            # 如果是 custom_task_dispatcher，从 args[0] 获取实际函数名
-            if func_name == 'custom_task_dispatcher' and args:
-                actual_func_name = args[0]
-                args = args[1:]  # 剩余的才是实际参数
-            else:
-                actual_func_name = func_name
-            
-            job_info.append({
-                "id": job.id,
-                "name": job.name,
-                "func": actual_func_name,
-                "next_run_time": str(next_run) if next_run else None,
-                "trigger": str(job.trigger),
-                "args": args,
-                "kwargs": kwargs,
-                "status": "已暂停" if next_run is None else "工作中"
-            })
-        except Exception as e:
-            logger.warning(f"解析任务 {job.id} 信息失败: {e}")
-            job_info.append({
-                "id": job.id,
-                "name": getattr(job, 'name', None),
-                "func": "unknown",
-                "next_run_time": None,
-                "trigger": str(getattr(job, 'trigger', 'unknown')),
-                "args": [],
-                "kwargs": {},
-                "status": "异常"
-            })
-    return job_info
+    return [job_to_info(job) for job in jobs]
 
 
 def get_job_by_id(job_id: str) -> Optional[Dict[str, Any]]:
     """获取单个任务详情"""
+    if job_catalog.loaded:
+        return job_catalog.get(job_id)
+
     try:
         job = scheduler.get_job(job_id)
     except LookupError:
@@ -406,27 +865,26 @@ def get_job_by_id(job_id: str) -> Optional[Dict[str, Any]]:
     if not job:
         return None
     
-    next_run = job.next_run_time
-    
-    # 处理自定义任务的 func 名称
-    func_name = job.func.__name__ if hasattr(job.func, '__name__') else str(job.func)
-    args = list(job.args) if job.args else []
-    kwargs = dict(job.kwargs) if job.kwargs else {}
-    
-    # 如果是 custom_task_dispatcher，从 args[0] 获取实际函数名
-    if func_name == 'custom_task_dispatcher' and args:
-        actual_func_name = args[0]
-        args = args[1:]  # 剩余的才是实际参数
-    else:
-        actual_func_name = func_name
-    
-    return {
-        "id": job.id,
-        "name": job.name,
-        "func": actual_func_name,
-        "next_run_time": str(next_run) if next_run else None,
-        "trigger": str(job.trigger),
-        "args": args,
-        "kwargs": kwargs,
-        "status": "已暂停" if next_run is None else "工作中"
-    }
+    return job_to_info(job)
+
+
+def get_jobs_by_func(func_name: str):
+    if job_catalog.loaded:
+        return job_catalog.by_func(func_name)
+    return [job for job in get_all_jobs() if job.get("func") == func_name]
+
+
+def search_jobs(keyword: str):
+    if job_catalog.loaded:
+        return job_catalog.search(keyword)
+    keyword = keyword.lower()
+    return [job for job in get_all_jobs() if keyword in job.get('id', '').lower() or keyword in (job.get('name') or '').lower()]
+
+
+def query_jobs(func: str = None, status: str = None, keyword: str = None, sort: str = "next_run_time",
+               page: int = 1, limit: int = None, cursor: str = None) -> Dict[str, Any]:
+    catalog = job_catalog
+    if not catalog.loaded:
+        catalog = JobCatalog(scheduler)
+        catalog.rebuild()
+    return catalog.query(func=func, status=status, keyword=keyword, sort=sort, page=page, limit=limit, cursor=cursor)
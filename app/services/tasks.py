@@ -2,10 +2,10 @@
 任务系统模块，提供任务注册、发现和执行功能。
 """
 
+import contextvars
 import functools
 import inspect
 import io
-import os
 import sys
 import time
 import importlib
@@ -23,69 +23,134 @@ _task_registry = {}
 _task_categories = {}
 
 
+_task_stdout: contextvars.ContextVar = contextvars.ContextVar("task_stdout", default=None)
+_task_stderr: contextvars.ContextVar = contextvars.ContextVar("task_stderr", default=None)
+
+
+class _ContextStream:
+    """
+    按 contextvar 分流的输出流：线程池中的任务和同一事件循环中的异步任务并发运行，
+    不能整体替换 sys.stdout，因此每次运行把输出写入自己上下文中的缓冲区，其余输出照常写到原始流
+    """
+
+    def __init__(self, stream, var: contextvars.ContextVar):
+        self._stream = stream
+        self._var = var
+
+    def _target(self):
+        buffer = self._var.get()
+        return buffer if buffer is not None else self._stream
+
+    def write(self, data):
+        return self._target().write(data)
+
+    def writelines(self, lines):
+        return self._target().writelines(lines)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def install_output_routing():
+    """
+    安装 sys.stdout/sys.stderr 分流，模块导入时调用；已安装时不做任何事。
+    只包装不还原，因此并发调用不会互相覆盖，sys.stdout 被其他代码替换后也可再次调用
+    """
+    if not isinstance(sys.stdout, _ContextStream):
+        sys.stdout = _ContextStream(sys.stdout, _task_stdout)
+    if not isinstance(sys.stderr, _ContextStream):
+        sys.stderr = _ContextStream(sys.stderr, _task_stderr)
+
+
 class OutputCapture:
-    """捕获所有输出，包括 stdout、stderr 和 subprocess 输出"""
-    
+    """捕获当前上下文（线程或异步任务）中写到 stdout、stderr 的输出，不影响并发运行的其他任务"""
+
     def __init__(self):
         self.stdout_capture = io.StringIO()
         self.stderr_capture = io.StringIO()
-        self._original_stdout = None
-        self._original_stderr = None
-        self._original_stdout_fd = None
-        self._original_stderr_fd = None
-        self._capture_file = None
-    
+        self._tokens = None
+
     def __enter__(self):
-        self._original_stdout = sys.stdout
-        self._original_stderr = sys.stderr
-        sys.stdout = self.stdout_capture
-        sys.stderr = self.stderr_capture
-        
-        if hasattr(sys.stdout, 'fileno') and hasattr(os, 'dup'):
-            try:
-                self._original_stdout_fd = os.dup(1)
-                self._original_stderr_fd = os.dup(2)
-                self._capture_file = io.StringIO()
-                capture_fd = self._capture_file.fileno() if hasattr(self._capture_file, 'fileno') else None
-            except (OSError, AttributeError):
-                pass
-        
+        install_output_routing()
+        self._tokens = (_task_stdout.set(self.stdout_capture), _task_stderr.set(self.stderr_capture))
         return self
-    
+
     def __exit__(self, exc_type, exc_val, exc_tb):
-        sys.stdout = self._original_stdout
-        sys.stderr = self._original_stderr
-        
-        if self._original_stdout_fd is not None:
-            try:
-                os.dup2(self._original_stdout_fd, 1)
-                os.close(self._original_stdout_fd)
-            except OSError:
-                pass
-        
-        if self._original_stderr_fd is not None:
-            try:
-                os.dup2(self._original_stderr_fd, 2)
-                os.close(self._original_stderr_fd)
-            except OSError:
-                pass
-        
+        stdout_token, stderr_token = self._tokens
+        _task_stdout.reset(stdout_token)
+        _task_stderr.reset(stderr_token)
         return False
-    
+
     def get_output(self) -> str:
         return self.stdout_capture.getvalue()
-    
+
     def get_error(self) -> str:
         return self.stderr_capture.getvalue()
 
 
-def task(category: str = "default", name: str = None, description: str = None):
+install_output_routing()
+
+
+def _build_task_result(result, status, error, output, start_time):
+    if isinstance(result, dict):
+        if result.get("output"):
+            output = result["output"]
+        if result.get("error"):
+            error = result["error"]
+        if "status" in result:
+            status = result["status"]
+        result = result.get("result")
+    
+    end_time = time.time()
+    elapsed_time = (end_time - start_time) * 1000
+    
+    return {
+        "elapsed_time": elapsed_time,
+        "started_at": start_time,
+        "output": output,
+        "result": result,
+        "status": status,
+        "error": error
+    }
+
+
+def task(category: str = "default", name: str = None, description: str = None, executor: str = None):
+    """
+    注册任务函数
+
+    executor 指定默认执行器：不填使用线程池，"process" 在独立进程中执行（适合 CPU 密集型任务，
+    参数和返回值需可 pickle）；创建任务时可通过 executor 字段覆盖。
+    async def 定义的任务自动使用 "asyncio" 执行器，在专用事件循环中并发运行
+    """
     def decorator(func):
         task_name = name or func.__name__
         task_desc = description or func.__doc__ or "无描述"
         
         sig = inspect.signature(func)
         
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start_time = time.time()
+                
+                with OutputCapture() as capture:
+                    try:
+                        result = await func(*args, **kwargs)
+                        status = True
+                        error = None
+                    except Exception as e:
+                        result = None
+                        status = False
+                        error = str(e)
+                        logger.error(f"任务 {task_name} 执行出错: {e}")
+                
+                return _build_task_result(result, status, error, capture.get_output(), start_time)
+            
+            return _register_task(async_wrapper, func, task_name, task_desc, category, executor or "asyncio", sig)
+        
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             start_time = time.time()
@@ -101,46 +166,32 @@ def task(category: str = "default", name: str = None, description: str = None):
                     error = str(e)
                     logger.error(f"任务 {task_name} 执行出错: {e}")
             
-            output = capture.get_output()
-            
-            if isinstance(result, dict):
-                if result.get("output"):
-                    output = result["output"]
-                if result.get("error"):
-                    error = result["error"]
-                if "status" in result:
-                    status = result["status"]
-                result = result.get("result")
-            
-            end_time = time.time()
-            elapsed_time = (end_time - start_time) * 1000
-            
-            return {
-                "elapsed_time": elapsed_time,
-                "output": output,
-                "result": result,
-                "status": status,
-                "error": error
-            }
-        
-        wrapper.original_func = func
-        wrapper.task_name = task_name
-        wrapper.task_desc = task_desc
-        wrapper.task_category = category
-        wrapper.signature = sig
-        
-        if category not in _task_categories:
-            _task_categories[category] = {}
+            return _build_task_result(result, status, error, capture.get_output(), start_time)
         
-        _task_registry[task_name] = wrapper
-        _task_categories[category][task_name] = wrapper
-        
-        logger.info(f"注册任务: {task_name} [分类: {category}]")
-        return wrapper
+        return _register_task(wrapper, func, task_name, task_desc, category, executor, sig)
     
     return decorator
 
 
+def _register_task(wrapper, func, task_name, task_desc, category, executor, sig):
+    wrapper.original_func = func
+    wrapper.task_name = task_name
+    wrapper.task_desc = task_desc
+    wrapper.task_category = category
+    wrapper.task_executor = executor
+    wrapper.is_async = inspect.iscoroutinefunction(func)
+    wrapper.signature = sig
+    
+    if category not in _task_categories:
+        _task_categories[category] = {}
+    
+    _task_registry[task_name] = wrapper
+    _task_categories[category][task_name] = wrapper
+    
+    logger.info(f"注册任务: {task_name} [分类: {category}]")
+    return wrapper
+
+
 @task(category="system", description="在操作系统终端执行命令")
 def run_os_command(command: str):
     import subprocess
@@ -165,28 +216,16 @@ def run_os_command(command: str):
 
 @task(category="system", description="执行Python代码并返回结果")
 def run_python_command(command: str):
-    old_stdout = sys.stdout
-    old_stderr = sys.stderr
-
-    new_stdout = io.StringIO()
-    new_stderr = io.StringIO()
-
-    sys.stdout = new_stdout
-    sys.stderr = new_stderr
-
     output = ''
     error = ''
 
-    try:
-        exec(command, globals())
-        output = new_stdout.getvalue()
-        error = new_stderr.getvalue()
-    except Exception as e:
-        error = str(e)
-
-    finally:
-        sys.stdout = old_stdout
-        sys.stderr = old_stderr
+    with OutputCapture() as capture:
+        try:
+            exec(command, globals())
+            output = capture.get_output()
+            error = capture.get_error()
+        except Exception as e:
+            error = str(e)
 
     return {"output": output, "error": error}
 
@@ -197,18 +236,28 @@ def auto_cleanup_logs():
     db = _session_factory()
     try:
         result = cleanup_old_logs(db)
-        print(f"日志清理完成: 按时间删除 {result['deleted_by_age']} 条, 按数量删除 {result['deleted_by_count']} 条")
+        print(f"日志清理{'已停止' if result['stopped'] else '完成'}: 按时间删除 {result['deleted_by_age']} 条, "
+              f"按数量删除 {result['deleted_by_count']} 条, 共 {result['batches']} 批, 耗时 {result['elapsed_ms']}ms")
         return result
     finally:
         db.close()
 
 
+@task(category="system", description="预建日志分区")
+def maintain_log_partitions():
+    from app.core.database import maintain_partitions
+    created = maintain_partitions()
+    for table, partitions in created.items():
+        print(f"{table}: 新建分区 {', '.join(partitions) if partitions else '无'}")
+    return created
+
+
 @task(category="system", description="获取日志统计信息")
 def get_logs_statistics():
     from app.core.database import _session_factory, get_log_stats
     db = _session_factory()
     try:
-        stats = get_log_stats(db)
+        stats = get_log_stats(db, include_expired=True)
         print(f"日志总数: {stats['total_count']}")
         print(f"成功日志: {stats['success_count']}")
         print(f"失败日志: {stats['fail_count']}")
@@ -322,7 +371,9 @@ def get_task_info(task_name: str = None) -> Union[Dict[str, Any], List[Dict[str,
             "description": func.task_desc,
             "category": func.task_category,
             "parameters": params,
-            "is_custom": is_custom
+            "is_custom": is_custom,
+            "is_async": getattr(func, 'is_async', False),
+            "executor": getattr(func, 'task_executor', None) or "default"
         }
     
     if task_name:
@@ -411,3 +462,17 @@ def custom_task_dispatcher(func_name: str, *args, **kwargs):
     from app.services.custom_tasks import execute_custom_task_code
     
     return execute_custom_task_code(func_name, args, kwargs)
+
+
+async def async_task_dispatcher(func_name: str, *args, **kwargs):
+    """
+    async def 任务的调度入口，与 custom_task_dispatcher 相同，保证任务可被 jobstore 序列化
+    """
+    wrapper = get_task(func_name)
+    if wrapper is None:
+        raise ValueError(f"任务函数 '{func_name}' 找不到")
+    
+    result = wrapper(*args, **kwargs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
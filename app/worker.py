@@ -0,0 +1,166 @@
+"""
+分布式任务执行 worker
+
+从 Redis Stream 消费调度器投递的任务运行，执行后把结果写回提交节点：
+
+    python -m app.worker --concurrency 8 --processes 4
+
+可在多台机器上启动任意数量的 worker，同一消费组内的消息只会被一个 worker 处理；
+worker 异常退出时，未确认的消息在 --claim-idle 秒后由其他 worker 接管重新执行。
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.conf import (
+    REMOTE_EXECUTOR_GROUP,
+    REMOTE_EXECUTOR_STREAM,
+    REMOTE_WORKER_CLAIM_IDLE,
+    REMOTE_WORKER_CONCURRENCY,
+)
+from app.core.database import get_redis
+from app.services.remote_executor import ensure_group, execute_run
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """单个 worker 进程：一个拉取循环 + 执行线程池"""
+
+    def __init__(self, client, stream: str, group: str, concurrency: int = 8, claim_idle: float = 600.0,
+                 consumer: str = None):
+        self.client = client
+        self.stream = stream
+        self.group = group
+        self.concurrency = max(1, concurrency)
+        self.claim_idle_ms = int(claim_idle * 1000)
+        self.consumer = consumer or f"{socket.gethostname()}:{os.getpid()}"
+        self._slots = threading.Semaphore(self.concurrency)
+        self._pool = ThreadPoolExecutor(self.concurrency, thread_name_prefix="worker-run")
+        self._stop_event = threading.Event()
+        self._last_claim = 0.0
+
+    def stop(self, *_):
+        self._stop_event.set()
+
+    def run(self):
+        from app.services.tasks import get_task
+        self._resolve_task = get_task
+
+        ensure_group(self.client, self.stream, self.group)
+        logger.info(f"worker {self.consumer} 已启动: 队列 {self.stream}, 并发 {self.concurrency}")
+
+        while not self._stop_event.is_set():
+            free = self._acquire_slots()
+            if not free:
+                continue
+            try:
+                messages = self._claim_stale(free) or self._read(free)
+            except Exception as e:
+                logger.warning(f"读取任务队列失败: {e}")
+                self._release_slots(free)
+                self._stop_event.wait(1)
+                continue
+
+            self._release_slots(free - len(messages))
+            for message_id, fields in messages:
+                self._pool.submit(self._handle, message_id, fields)
+
+        self._pool.shutdown(wait=True)
+        logger.info(f"worker {self.consumer} 已停止")
+
+    def _acquire_slots(self) -> int:
+        if not self._slots.acquire(timeout=1):
+            return 0
+        free = 1
+        while free < self.concurrency and self._slots.acquire(blocking=False):
+            free += 1
+        return free
+
+    def _release_slots(self, count: int):
+        for _ in range(count):
+            self._slots.release()
+
+    def _read(self, count: int):
+        response = self.client.xreadgroup(self.group, self.consumer, {self.stream: ">"}, count=count, block=1000)
+        return [message for _, messages in response or [] for message in messages]
+
+    def _claim_stale(self, count: int):
+        """接管其他 worker 长时间未确认的消息"""
+        now = time.monotonic()
+        if now - self._last_claim < self.claim_idle_ms / 1000 / 2:
+            return []
+        self._last_claim = now
+        result = self.client.xautoclaim(self.stream, self.group, self.consumer, self.claim_idle_ms,
+                                        start_id="0-0", count=count)
+        messages = [message for message in result[1] if message[1]]
+        if messages:
+            logger.warning(f"接管 {len(messages)} 个超时未确认的任务运行")
+        return messages
+
+    def _handle(self, message_id, fields):
+        try:
+            raw = fields.get(b"payload", fields.get("payload"))
+            payload = json.loads(raw)
+            result = execute_run(payload, self._resolve_task)
+            self.client.xadd(payload["reply_to"], {"payload": json.dumps(result, ensure_ascii=False, default=str)})
+        except Exception as e:
+            logger.error(f"处理任务运行 {message_id} 失败: {e}")
+        finally:
+            # 解析失败的消息同样确认，避免被反复接管
+            try:
+                self.client.xack(self.stream, self.group, message_id)
+                self.client.xdel(self.stream, message_id)
+            except Exception as e:
+                logger.warning(f"确认任务运行 {message_id} 失败: {e}")
+            self._slots.release()
+
+
+def run_worker(concurrency: int, claim_idle: float):
+    worker = Worker(get_redis(), REMOTE_EXECUTOR_STREAM, REMOTE_EXECUTOR_GROUP, concurrency, claim_idle)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分布式任务执行 worker")
+    parser.add_argument("--concurrency", type=int, default=REMOTE_WORKER_CONCURRENCY, help="每个进程的并发执行数")
+    parser.add_argument("--processes", type=int, default=1, help="启动的 worker 进程数，CPU 密集型任务建议设为 CPU 核数")
+    parser.add_argument("--claim-idle", type=float, default=REMOTE_WORKER_CLAIM_IDLE,
+                        help="消息未确认超过该秒数后由其他 worker 接管")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_worker(args.concurrency, args.claim_idle)
+        return
+
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(args.concurrency, args.claim_idle), name=f"worker-{i}")
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    def forward(signum, _):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+认证中间件性能测试
+
+直接调用 ASGI 应用（不经过网络），对比无中间件、旧版 BaseHTTPMiddleware 实现
+（每次请求打开会话查询三项配置）和当前纯 ASGI 实现的单次请求耗时。
+
+用法:
+  python scripts/bench_auth_middleware.py
+  python scripts/bench_auth_middleware.py --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from app.core.conf import API_KEY
+from app.core.database import _session_factory, init_db
+from app.middleware.auth import APIKeyMiddleware, PUBLIC_PATHS, _is_ai_path
+from app.models.sql_model import DEFAULT_CONFIG, SystemConfig
+
+
+def _legacy_get_config(db, key, default=None):
+    config = db.query(SystemConfig).filter(SystemConfig.key == key).first()
+    if config and config.value:
+        return config.value
+    return default or DEFAULT_CONFIG.get(key, {}).get("value", "")
+
+
+def _legacy_get_auth_config():
+    db = _session_factory()
+    try:
+        enabled = _legacy_get_config(db, "api_key_enabled", "true").lower() in ("true", "1", "yes")
+        key = _legacy_get_config(db, "api_key", API_KEY)
+        agent_key = _legacy_get_config(db, "ai_agent_api_key", "")
+        return enabled, key, agent_key
+    finally:
+        db.close()
+
+
+class LegacyAPIKeyMiddleware(BaseHTTPMiddleware):
+    """优化前的实现，仅用于对比"""
+
+    async def dispatch(self, request: Request, call_next):
+        auth_enabled, api_key, agent_api_key = _legacy_get_auth_config()
+        if not auth_enabled:
+            return await call_next(request)
+        path = request.url.path
+        for public_path in PUBLIC_PATHS:
+            if path.startswith(public_path):
+                return await call_next(request)
+        request_api_key = request.headers.get("X-API-Key")
+        if not request_api_key:
+            return JSONResponse(status_code=401, content={"code": 401, "msg": "未授权：缺少 API Key", "data": None})
+        if _is_ai_path(path) and agent_api_key and request_api_key == agent_api_key:
+            return await call_next(request)
+        if request_api_key != api_key:
+            return JSONResponse(status_code=401, content={"code": 401, "msg": "未授权：无效的 API Key", "data": None})
+        return await call_next(request)
+
+
+async def _endpoint(request):
+    return PlainTextResponse("ok")
+
+
+def build_app(middleware=None):
+    app = Starlette(routes=[Route("/jobs/", _endpoint)])
+    return middleware(app) if middleware is not None else app
+
+
+async def _request(app, api_key: str):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/jobs/",
+        "raw_path": b"/jobs/",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"localhost"), (b"x-api-key", api_key.encode())],
+        "client": ("127.0.0.1", 12345),
+        "server": ("localhost", 8000),
+    }
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def _bench(app, api_key: str, requests: int) -> float:
+    for _ in range(min(200, requests)):
+        await _request(app, api_key)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await _request(app, api_key)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="认证中间件性能测试")
+    parser.add_argument("--requests", type=int, default=5000, help="每种实现的请求次数")
+    args = parser.parse_args()
+
+    init_db()
+    from app.middleware.auth import _get_auth_config
+    api_key = asyncio.run(_get_auth_config())[1].decode()
+
+    results = {}
+    for name, middleware in (("无中间件", None), ("BaseHTTPMiddleware + 数据库", LegacyAPIKeyMiddleware),
+                             ("纯 ASGI + 配置缓存", APIKeyMiddleware)):
+        app = build_app(middleware)
+        assert asyncio.run(_request(app, api_key)) == 200
+        results[name] = asyncio.run(_bench(app, api_key, args.requests))
+
+    baseline = results["无中间件"]
+    print(f"\n{'实现':<28}{'单次请求(µs)':>14}{'中间件开销(µs)':>16}")
+    print("-" * 58)
+    for name, cost in results.items():
+        print(f"{name:<28}{cost:>14.1f}{cost - baseline:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
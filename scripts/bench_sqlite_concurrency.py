@@ -0,0 +1,169 @@
+"""
+SQLite 并发写入性能测试
+
+模拟任务集中完成时的数据库负载：多个线程同时写入执行日志并更新任务存储（apscheduler_jobs），
+另有线程持续执行日志列表和按任务汇总的报表查询（扫描整张日志表）。对比两种配置：
+
+  默认配置：应用引擎只开启外键约束（回滚日志模式，SQLAlchemy 默认连接池），任务存储使用 APScheduler 自建的第二个引擎
+  调优配置：WAL + busy_timeout + synchronous=NORMAL 等参数，应用与任务存储共用一个引擎（DB_POOL_SIZE / DB_MAX_OVERFLOW）
+
+输出每秒完成的任务数、单次完成耗时和 database is locked 错误数。测试数据写在临时目录，不影响业务库。
+
+用法:
+  python scripts/bench_sqlite_concurrency.py
+  python scripts/bench_sqlite_concurrency.py --writers 32 --readers 4 --duration 20
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import create_sqlite_engine
+from app.models.sql_model import JobLog
+
+JOBS = 200
+
+
+def seed(path: str, rows: int):
+    engine = create_sqlite_engine(f"sqlite:///{path}", tuned=False)
+    JobLog.__table__.create(engine)
+    jobs_t = SQLAlchemyJobStore(engine=engine).jobs_t
+    jobs_t.create(engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(jobs_t), [{"id": f"job-{i}", "next_run_time": 0.0, "job_state": b"x" * 600}
+                                      for i in range(JOBS)])
+        for offset in range(0, rows, 20000):
+            conn.execute(insert(JobLog.__table__), [
+                {"job_id": f"job-{i % JOBS}", "status": True, "message": "任务成功执行", "duration": 1.0,
+                 "output": "ok", "timestamp": now}
+                for i in range(offset, min(rows, offset + 20000))
+            ])
+    engine.dispose()
+
+
+def run(app_engine, jobstore_engine, writers: int, readers: int, duration: float) -> dict:
+    session_factory = sessionmaker(bind=app_engine)
+    jobs_t = SQLAlchemyJobStore(engine=jobstore_engine).jobs_t
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies, errors, reads = [], [0], [0]
+
+    def complete_jobs(worker: int):
+        n = 0
+        while not stop.is_set():
+            job_id = f"job-{(worker * 7 + n) % JOBS}"
+            n += 1
+            start = time.perf_counter()
+            try:
+                # 执行完成：写日志 + 更新任务存储中的下次运行时间
+                db = session_factory()
+                try:
+                    db.execute(insert(JobLog), [{"job_id": job_id, "status": True, "message": "任务成功执行",
+                                                 "duration": 1.0, "output": "ok",
+                                                 "timestamp": datetime.utcnow()}])
+                    db.commit()
+                finally:
+                    db.close()
+                with jobstore_engine.begin() as conn:
+                    conn.execute(update(jobs_t).where(jobs_t.c.id == job_id).values(next_run_time=time.time()))
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    def query_logs():
+        while not stop.is_set():
+            db = session_factory()
+            try:
+                db.execute(select(JobLog).order_by(JobLog.timestamp.desc(), JobLog.id.desc()).limit(20)).all()
+                db.execute(select(jobs_t.c.id).where(jobs_t.c.next_run_time <= time.time())).all()
+                # 报表类查询需要扫描整张日志表，回滚日志模式下扫描期间写入无法提交
+                db.execute(select(JobLog.job_id, func.count(), func.avg(JobLog.duration))
+                           .group_by(JobLog.job_id)).all()
+            except OperationalError:
+                pass
+            finally:
+                db.close()
+            with lock:
+                reads[0] += 1
+
+    threads = [threading.Thread(target=complete_jobs, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=query_logs) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        "completions": len(latencies) / duration,
+        "reads": reads[0] / duration,
+        "p50": statistics.median(latencies) if latencies else 0,
+        "p99": latencies[int(len(latencies) * 0.99)] if latencies else 0,
+        "max": latencies[-1] if latencies else 0,
+        "locked": errors[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 并发写入性能测试")
+    parser.add_argument("--writers", type=int, default=16, help="并发完成任务的线程数")
+    parser.add_argument("--readers", type=int, default=2, help="并发查询日志的线程数")
+    parser.add_argument("--duration", type=float, default=10, help="每种配置的测试时长（秒）")
+    parser.add_argument("--rows", type=int, default=500000, help="预先写入的日志条数")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_sqlite_")
+    try:
+        seed_path = os.path.join(workdir, "seed.db")
+        print(f"写入 {args.rows} 条日志...")
+        seed(seed_path, args.rows)
+
+        results = {}
+        default_path = os.path.join(workdir, "default.db")
+        shutil.copy(seed_path, default_path)
+        print("测量默认配置...")
+        app_engine = create_sqlite_engine(f"sqlite:///{default_path}", tuned=False, pool_size=5, max_overflow=10)
+        jobstore_engine = create_engine(f"sqlite:///{default_path}")
+        results["默认配置（两个引擎）"] = run(app_engine, jobstore_engine, args.writers, args.readers, args.duration)
+        app_engine.dispose()
+        jobstore_engine.dispose()
+
+        tuned_path = os.path.join(workdir, "tuned.db")
+        shutil.copy(seed_path, tuned_path)
+        print("测量调优配置...")
+        engine = create_sqlite_engine(f"sqlite:///{tuned_path}", tuned=True)
+        results["WAL 调优（共用引擎）"] = run(engine, engine, args.writers, args.readers, args.duration)
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{args.writers} 个写线程、{args.readers} 个读线程，各 {args.duration:.0f}s")
+    print(f"{'配置':<22}{'完成/s':>10}{'查询/s':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}{'locked':>8}")
+    print("-" * 80)
+    for name, r in results.items():
+        print(f"{name:<22}{r['completions']:>10.0f}{r['reads']:>10.1f}{r['p50']:>10.1f}{r['p99']:>10.1f}"
+              f"{r['max']:>10.0f}{r['locked']:>8}")
+
+
+if __name__ == "__main__":
+    main()
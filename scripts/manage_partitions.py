@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+"""
+日志分区管理脚本（仅 PostgreSQL）
+
+需要先配置 LOG_PARTITIONING=daily 或 monthly。已有的普通表也可以通过 alembic upgrade head 转换。
+
+用法:
+  python scripts/manage_partitions.py --status       # 查看 job_logs / alert_history 的分区
+  python scripts/manage_partitions.py --convert      # 把现有普通表转换为分区表（会扫描原表，请在维护窗口执行）
+  python scripts/manage_partitions.py --maintain     # 预建未来的分区
+  python scripts/manage_partitions.py --self-test    # 在临时 schema 中验证转换、分区清理、统计和还原
+"""
+import argparse
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.core.conf import DB_TYPE, LOG_PARTITIONING
+from app.core.database import (
+    _drop_expired_log_partitions,
+    _session_factory,
+    alert_partitions,
+    engine,
+    log_partitions,
+    maintain_partitions,
+)
+from app.core.log_search import restore_search_index
+from app.core.log_stats import reconcile_log_stats, record_logs
+from app.core.partitioning import TimePartitioning
+from app.models.sql_model import JobLog, LogStat
+
+
+def show_status():
+    db = _session_factory()
+    try:
+        for partitioning in (log_partitions, alert_partitions):
+            state = partitioning.is_partitioned(db)
+            if state is None:
+                print(f"{partitioning.name}: 表不存在")
+                continue
+            if not state:
+                print(f"{partitioning.name}: 普通表（未分区），可执行 --convert 转换")
+                continue
+            partitions = partitioning.partitions(db)
+            print(f"{partitioning.name}: {len(partitions)} 个分区")
+            for name, lower, upper in partitions:
+                print(f"  {name:<32} {lower or 'MINVALUE'} ~ {upper or 'MAXVALUE'}")
+    finally:
+        db.close()
+
+
+def convert():
+    db = _session_factory()
+    try:
+        for partitioning in (log_partitions, alert_partitions):
+            result = partitioning.convert(db)
+            db.commit()
+            if result["converted"]:
+                print(f"✓ {partitioning.name} 已转换，原数据分区覆盖到 {result['legacy_until']}，"
+                      f"新建分区 {', '.join(result['partitions']) or '无'}")
+            else:
+                print(f"- {partitioning.name} 已是分区表，跳过")
+        # 原表上的搜索索引直接挂载到父表的同名索引下
+        restore_search_index(db)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"✗ 转换失败: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+def self_test():
+    """在临时 schema 中建普通表并写入过去的日志，依次验证转换、写入新日志、移除过期分区、统计一致和还原"""
+    schema = f"partition_test_{uuid.uuid4().hex[:8]}"
+    with engine.begin() as conn:
+        conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+    test_engine = create_engine(engine.url.render_as_string(hide_password=False), poolclass=NullPool,
+                                connect_args={"options": f"-csearch_path={schema}"})
+    partitioning = TimePartitioning(JobLog, "timestamp", "daily", premake=2)
+    now = datetime.utcnow()
+
+    def check(condition: bool, message: str):
+        print(f"{'✓' if condition else '✗'} {message}")
+        if not condition:
+            raise AssertionError(message)
+
+    try:
+        JobLog.__table__.create(test_engine)
+        LogStat.__table__.create(test_engine)
+        db = Session(bind=test_engine)
+        try:
+            db.execute(insert(JobLog), [
+                {"job_id": f"job-{i % 3}", "status": i % 4 != 0, "message": "ok", "duration": 0.1,
+                 "timestamp": now - timedelta(days=10 - i % 5, minutes=i)}
+                for i in range(500)
+            ])
+            reconcile_log_stats(db)
+            db.commit()
+
+            result = partitioning.convert(db)
+            db.commit()
+            check(result["converted"] and partitioning.is_partitioned(db), "普通表转换为分区表")
+            check(db.execute(select(func.count()).select_from(JobLog)).scalar() == 500, "转换后日志条数不变")
+
+            rows = [{"job_id": "job-0", "status": True, "message": "new", "duration": 0.1, "timestamp": now}]
+            db.execute(insert(JobLog), rows)
+            record_logs(db, rows)
+            db.commit()
+            check(db.execute(select(func.max(JobLog.id))).scalar() == 501, "新日志写入当天分区，id 沿用原序列")
+
+            dropped = _drop_expired_log_partitions(db, partitioning, now - timedelta(days=3))
+            check(dropped["rows"] == 500 and dropped["partitions"] == [f"{JobLog.__tablename__}_legacy"],
+                  f"移除过期分区 {dropped['partitions']}，共 {dropped['rows']} 条")
+            check(reconcile_log_stats(db, dry_run=True)["drift_count"] == 0, "日志统计与分区数据一致")
+
+            check(partitioning.unconvert(db), "分区表还原为普通表")
+            db.commit()
+            check(partitioning.is_partitioned(db) is False
+                  and db.execute(select(func.count()).select_from(JobLog)).scalar() == 1, "还原后日志保留")
+        finally:
+            db.close()
+    except AssertionError:
+        sys.exit(1)
+    finally:
+        test_engine.dispose()
+        with engine.begin() as conn:
+            conn.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+    print("自检通过")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='日志分区管理工具')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--status', action='store_true', help='查看分区')
+    group.add_argument('--convert', action='store_true', help='把现有普通表转换为分区表')
+    group.add_argument('--maintain', action='store_true', help='预建未来的分区')
+    group.add_argument('--self-test', action='store_true', help='在临时 schema 中自检')
+    args = parser.parse_args()
+
+    if DB_TYPE == 'sqlite':
+        print("✗ 日志分区仅支持 PostgreSQL")
+        sys.exit(1)
+    if args.self_test:
+        self_test()
+        return
+    if not LOG_PARTITIONING:
+        print("✗ 未配置 LOG_PARTITIONING（daily / monthly）")
+        sys.exit(1)
+
+    if args.status:
+        show_status()
+    elif args.convert:
+        convert()
+    else:
+        for table, partitions in maintain_partitions().items():
+            print(f"{table}: 新建分区 {', '.join(partitions) if partitions else '无'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""
+日志统计校准脚本
+
+log_stats 汇总表由日志写入和日志清理增量维护；直接操作数据库删除 / 导入日志后，
+按 job_logs 全表重新计算并修正偏差。需要扫描整张日志表，建议在业务低峰执行。
+
+用法:
+  python scripts/reconcile_log_stats.py              # 校准并输出存在偏差的任务
+  python scripts/reconcile_log_stats.py --dry-run    # 只比较，不写入
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import _session_factory, engine
+from app.core.log_stats import reconcile_log_stats
+from app.models.sql_model import LogStat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='日志统计校准工具')
+    parser.add_argument('--dry-run', action='store_true', help='只比较汇总表与 job_logs，不写入')
+    parser.add_argument('--limit', type=int, default=20, help='最多显示的偏差任务数')
+    args = parser.parse_args()
+
+    LogStat.__table__.create(engine, checkfirst=True)
+    db = _session_factory()
+    try:
+        start = time.perf_counter()
+        result = reconcile_log_stats(db, dry_run=args.dry_run)
+        elapsed = time.perf_counter() - start
+    except Exception as e:
+        db.rollback()
+        print(f"✗ 校准失败: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    print(f"\n共 {result['jobs']} 个任务，{result['drift_count']} 行存在偏差，耗时 {elapsed:.2f}s")
+    for item in result['drift'][:args.limit]:
+        recorded, actual = item['recorded'], item['actual']
+        print(f"  {item['job_id']}: 记录 {recorded['total_count']}/{recorded['success_count']}/{recorded['fail_count']}"
+              f" -> 实际 {actual['total_count']}/{actual['success_count']}/{actual['fail_count']}")
+    if result['drift_count'] > args.limit:
+        print(f"  ... 其余 {result['drift_count'] - args.limit} 行未显示")
+    if result['drift_count']:
+        print("（总数/成功/失败）" + ("，--dry-run 未写入" if args.dry_run else "，已修正"))
+
+
+if __name__ == '__main__':
+    main()
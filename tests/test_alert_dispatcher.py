@@ -0,0 +1,118 @@
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app.models.sql_model import AlertChannel, AlertConfig, Base
+from app.services import alert
+from app.services.alert import AlertDispatcher
+
+
+class AlertDispatcherTest(unittest.TestCase):
+    def test_same_job_is_processed_in_order(self):
+        dispatcher = AlertDispatcher(workers=4, queue_size=100)
+        seen = []
+        lock = threading.Lock()
+
+        def process(job_id, status, duration, error, job_exists):
+            with lock:
+                seen.append((job_id, duration))
+
+        dispatcher._process = process
+        dispatcher.start()
+        try:
+            for i in range(50):
+                for job_id in ("a", "b", "c"):
+                    self.assertTrue(dispatcher.submit(job_id, False, i))
+        finally:
+            dispatcher.stop(timeout=5)
+        for job_id in ("a", "b", "c"):
+            self.assertEqual([d for j, d in seen if j == job_id], list(range(50)))
+        self.assertEqual(dispatcher.stats()["submitted"], 150)
+
+    def test_full_queue_drops(self):
+        dispatcher = AlertDispatcher(workers=1, queue_size=1, enqueue_timeout=0.01)
+        release = threading.Event()
+        dispatcher._process = lambda *args: release.wait(5)
+        dispatcher.start()
+        try:
+            results = [dispatcher.submit("job", False) for _ in range(5)]
+            self.assertIn(False, results)
+            self.assertGreater(dispatcher.stats()["dropped"], 0)
+        finally:
+            release.set()
+            dispatcher.stop(timeout=5)
+
+    def test_stop_with_full_queue_respects_timeout(self):
+        dispatcher = AlertDispatcher(workers=1, queue_size=3, enqueue_timeout=0.01)
+        dispatcher._process = lambda *args: time.sleep(0.2)
+        dispatcher.start()
+        threads = list(dispatcher._threads)
+        for _ in range(4):
+            dispatcher.submit("job", False)
+
+        start = time.monotonic()
+        dispatcher.stop(timeout=0.1)
+        self.assertLess(time.monotonic() - start, 0.5)
+        # 正在处理的一条结束后线程退出，剩余的告警计入丢弃
+        threads[0].join(1)
+        self.assertFalse(threads[0].is_alive())
+        self.assertGreater(dispatcher.stats()["dropped"], 0)
+        self.assertEqual(dispatcher.stats()["queue_depth"], 0)
+
+
+class CheckAndAlertTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=1, max_overflow=0)
+        Base.metadata.create_all(self.engine, tables=[AlertChannel.__table__, AlertConfig.__table__])
+        factory = sessionmaker(bind=self.engine)
+        with factory() as db:
+            channel = AlertChannel(name="hook", type="webhook", config=json.dumps({"url": "http://example.invalid"}))
+            db.add(channel)
+            db.flush()
+            db.add(AlertConfig(rule_type="single_fail", channels=json.dumps([channel.id]), cooldown_minutes=0))
+            db.commit()
+        patches = [
+            mock.patch.object(alert, "_session_factory", factory),
+            mock.patch.object(alert, "get_config_bool", lambda db, key, default=False: True),
+            mock.patch.dict(alert._job_last_alert_time, clear=True),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_session_closed_before_send(self):
+        sends = []
+
+        def send_to_channels(channels, job_id, rule_type, message):
+            sends.append((self.engine.pool.checkedout(), [channel.name for channel in channels], rule_type))
+            return []
+
+        with mock.patch.object(alert.alert_dispatcher, "send_to_channels", send_to_channels):
+            alert.check_and_alert("job", False, 10, "boom")
+
+        self.assertEqual(sends, [(0, ["hook"], "single_fail")])
+
+    def test_success_resets_fail_count_once(self):
+        dispatcher = AlertDispatcher(workers=1)
+        with mock.patch.dict(alert._job_fail_counts, clear=True), \
+                mock.patch.object(alert.alert_dispatcher, "send_to_channels", return_value=[]), \
+                mock.patch.object(alert, "reset_fail_count", wraps=alert.reset_fail_count) as reset:
+            alert.increment_fail_count("job")
+            dispatcher._process("job", True, 10, None, True)
+            self.assertEqual(reset.call_count, 1)
+            self.assertEqual(alert.get_fail_count("job"), 0)
+            dispatcher._process("job", False, 10, "boom", True)
+            self.assertEqual(reset.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from app.core import conf, database
+from app.core.database import ThreadedSession, async_database_url, create_async_db_engine, create_sqlite_engine
+from app.core.replicas import USE_PRIMARY
+from app.models.sql_model import JobLog
+
+try:
+    import aiosqlite
+except ImportError:
+    aiosqlite = None
+
+
+def _count_logs(session):
+    return session.execute(select(func.count()).select_from(JobLog)).scalar()
+
+
+def _request(headers=None):
+    return Request({"type": "http", "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]})
+
+
+async def _read(factory, sync_factory, headers=None):
+    """按路由的方式使用 get_async_read_db，返回 (会话, 查询结果)"""
+    with mock.patch.object(database, "_async_read_session_factory", factory), \
+            mock.patch.object(database, "_read_session_factory", sync_factory):
+        sessions = database.get_async_read_db(_request(headers))
+        db = await sessions.__anext__()
+        try:
+            return db, await db.run_sync(_count_logs)
+        finally:
+            await sessions.aclose()
+
+
+class AsyncDatabaseUrlTest(unittest.TestCase):
+    def test_drivers(self):
+        self.assertEqual(async_database_url("sqlite:///./data/scheduler.db"), "sqlite+aiosqlite:///./data/scheduler.db")
+        self.assertEqual(async_database_url("postgresql://u:p%40ss@db:5432/app"),
+                         "postgresql+asyncpg://u:p%40ss@db:5432/app")
+        self.assertEqual(async_database_url("postgresql+psycopg2://u@db/app"), "postgresql+asyncpg://u@db/app")
+        with self.assertRaises(ValueError):
+            async_database_url("mysql://u@db/app")
+
+
+class AsyncSessionTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.url = f"sqlite:///{os.path.join(directory.name, 'test.db')}"
+        self.engine = create_sqlite_engine(self.url)
+        self.addCleanup(self.engine.dispose)
+        JobLog.__table__.create(self.engine)
+        with self.engine.begin() as conn:
+            conn.execute(insert(JobLog), [{"job_id": f"job-{i}", "status": True, "message": "ok",
+                                           "timestamp": datetime(2024, 1, 1)} for i in range(3)])
+        self.sync_factory = sessionmaker(bind=self.engine, autoflush=False)
+
+    def test_threaded_fallback(self):
+        closed = []
+        threads = []
+
+        def factory():
+            session = self.sync_factory()
+            session.close = mock.Mock(side_effect=lambda: closed.append(threading.get_ident()))
+            return session
+
+        def query(session):
+            threads.append(threading.get_ident())
+            return _count_logs(session)
+
+        async def run():
+            with mock.patch.object(database, "_async_read_session_factory", None), \
+                    mock.patch.object(database, "_read_session_factory", factory):
+                async for db in database.get_async_read_db(_request()):
+                    self.assertIsInstance(db, ThreadedSession)
+                    self.assertEqual(await db.run_sync(query), 3)
+                    self.assertFalse(closed)
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(run())
+        # 同步查询和关闭会话都在线程池中执行，不阻塞事件循环
+        self.assertNotEqual(threads[0], loop_thread)
+        self.assertEqual(len(closed), 1)
+        self.assertNotEqual(closed[0], loop_thread)
+
+    def test_primary_header(self):
+        for headers, expected in (({}, False), ({"X-DB-Primary": "true"}, True), ({"X-DB-Primary": "1"}, True),
+                                  ({"X-DB-Primary": "no"}, False)):
+            db, count = asyncio.run(_read(None, self.sync_factory, headers))
+            self.assertEqual(count, 3)
+            self.assertEqual(db.session.info.get(USE_PRIMARY, False), expected, headers)
+
+    @unittest.skipIf(aiosqlite is None, "需要 aiosqlite")
+    def test_async_engine(self):
+        async def run():
+            async_engine = create_async_db_engine(async_database_url(self.url), pool_size=2, max_overflow=0)
+            try:
+                async with async_engine.connect() as conn:
+                    journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+                    foreign_keys = (await conn.execute(text("PRAGMA foreign_keys"))).scalar()
+                factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+                plain = await _read(factory, self.sync_factory)
+                primary = await _read(factory, self.sync_factory, {"X-DB-Primary": "yes"})
+                return journal_mode, foreign_keys, plain, primary
+            finally:
+                await async_engine.dispose()
+
+        journal_mode, foreign_keys, (db, count), (primary_db, primary_count) = asyncio.run(run())
+        # 异步连接与同步引擎使用相同的 PRAGMA
+        self.assertEqual(journal_mode, "wal" if conf.SQLITE_TUNED else "delete")
+        self.assertEqual(foreign_keys, 1)
+        self.assertIsInstance(db, AsyncSession)
+        self.assertEqual((count, primary_count), (3, 3))
+        self.assertNotIn(USE_PRIMARY, db.info)
+        self.assertTrue(primary_db.info[USE_PRIMARY])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.config_cache import ConfigCache
+from app.middleware import auth
+from app.middleware.auth import APIKeyMiddleware
+
+
+def _build_app():
+    app = FastAPI()
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    @app.get("/metrics")
+    def metrics():
+        return "metrics"
+
+    @app.get("/jobs/")
+    def jobs():
+        return []
+
+    @app.post("/ai/chat")
+    def ai_chat():
+        return {"reply": "hi"}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((f"chunk {i}\n" for i in range(5)), media_type="text/plain")
+
+    app.add_middleware(APIKeyMiddleware)
+    return app
+
+
+class APIKeyMiddlewareTest(unittest.TestCase):
+    def setUp(self):
+        self.config = {"api_key": "secret", "ai_agent_api_key": "agent", "api_key_enabled": "true"}
+        self.loads_on_loop = []
+        self.cache = ConfigCache(self._loader, ttl=30)
+        patches = [
+            mock.patch.object(auth, "config_cache", self.cache),
+            mock.patch.object(auth, "API_KEY_ENABLED", True),
+            mock.patch.object(auth, "METRICS_PUBLIC", False),
+            mock.patch.object(auth, "_auth_config", auth._AuthConfig()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.client = TestClient(_build_app())
+
+    def _loader(self, db=None):
+        try:
+            asyncio.get_running_loop()
+            self.loads_on_loop.append(True)
+        except RuntimeError:
+            self.loads_on_loop.append(False)
+        return dict(self.config)
+
+    def _status(self, path, key=None, method="get"):
+        headers = {"X-API-Key": key} if key is not None else {}
+        response = getattr(self.client, method)(path, headers=headers)
+        return response.status_code, response.json().get("msg") if response.status_code == 401 else None
+
+    def test_public_paths(self):
+        self.assertEqual(self._status("/health")[0], 200)
+        self.assertEqual(self._status("/openapi.json")[0], 200)
+        self.assertEqual(self._status("/metrics")[0], 401)
+
+    def test_metrics_public_option(self):
+        # 中间件在首个请求时构建，开关在构建时读取
+        with mock.patch.object(auth, "METRICS_PUBLIC", True):
+            client = TestClient(_build_app())
+            self.assertEqual(client.get("/metrics").status_code, 200)
+        self.assertEqual(client.get("/metrics").status_code, 200)
+        self.assertEqual(client.get("/jobs/").status_code, 401)
+
+    def test_api_keys(self):
+        self.assertEqual(self._status("/jobs/"), (401, "未授权：缺少 API Key"))
+        self.assertEqual(self._status("/jobs/", "wrong"), (401, "未授权：无效的 API Key"))
+        self.assertEqual(self._status("/jobs/", "secret")[0], 200)
+        self.assertEqual(self.client.get("/jobs/", headers={"x-api-key": "secret"}).status_code, 200)
+        # AI Agent Key 只能访问 AI 接口
+        self.assertEqual(self._status("/ai/chat", "agent", method="post")[0], 200)
+        self.assertEqual(self._status("/ai/chat", "secret", method="post")[0], 200)
+        self.assertEqual(self._status("/jobs/", "agent")[0], 401)
+
+    def test_disabled_auth(self):
+        self.config["api_key_enabled"] = "false"
+        self.assertEqual(self._status("/jobs/")[0], 200)
+        with mock.patch.object(auth, "API_KEY_ENABLED", False):
+            self.config["api_key_enabled"] = "true"
+            self.cache.invalidate()
+            self.assertEqual(self._status("/jobs/")[0], 200)
+
+    def test_config_loaded_off_event_loop(self):
+        self.cache.ttl = 0
+        for _ in range(3):
+            self.assertEqual(self._status("/jobs/", "secret")[0], 200)
+        self.assertEqual(self.loads_on_loop, [False] * 3)
+
+        self.cache.ttl = 30
+        self.config["api_key"] = "rotated"
+        self.cache.invalidate()
+        self.assertEqual(self._status("/jobs/", "secret")[0], 401)
+        self.assertEqual(self._status("/jobs/", "rotated")[0], 200)
+        self.assertEqual(len(self.loads_on_loop), 4)
+
+    def test_load_failure_falls_back_to_env_key(self):
+        self.cache = ConfigCache(mock.Mock(side_effect=RuntimeError("db down")), ttl=30)
+        with mock.patch.object(auth, "config_cache", self.cache), mock.patch.object(auth, "API_KEY", "env-key"):
+            self.assertEqual(self._status("/jobs/", "env-key")[0], 200)
+            self.assertEqual(self._status("/jobs/", "secret")[0], 401)
+
+    def test_streaming_response_passes_through(self):
+        inner = _build_app()
+        messages = []
+        requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            # 响应发送完之前客户端不断开
+            while not messages or messages[-1].get("more_body", True):
+                await asyncio.sleep(0.01)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/stream", "raw_path": b"/stream", "query_string": b"",
+                 "headers": [(b"x-api-key", b"secret")], "root_path": "", "scheme": "http",
+                 "server": ("test", 80), "client": ("test", 1), "http_version": "1.1", "asgi": {"version": "3.0"}}
+        asyncio.run(inner(scope, receive, send))
+
+        self.assertEqual(messages[0]["status"], 200)
+        bodies = [message["body"] for message in messages if message["type"] == "http.response.body" and message["body"]]
+        # 每个分块单独发送，没有被中间件缓冲合并
+        self.assertEqual(bodies, [f"chunk {i}\n".encode() for i in range(5)])
+
+
+if __name__ == "__main__":
+    unittest.main()
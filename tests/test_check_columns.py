@@ -0,0 +1,39 @@
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.core import database
+from app.models.sql_model import Base
+
+
+class CheckColumnsTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", poolclass=StaticPool)
+        self.addCleanup(self.engine.dispose)
+        patch = mock.patch.object(database, "engine", self.engine)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_complete_schema(self):
+        Base.metadata.create_all(self.engine)
+        database._check_columns()
+
+    def test_missing_columns_fail_fast(self):
+        # 升级前的 job_logs 结构，启动时不再自动补列
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE job_logs (id INTEGER PRIMARY KEY, job_id VARCHAR(128) NOT NULL, "
+                              "status BOOLEAN NOT NULL, message TEXT NOT NULL, duration FLOAT, output TEXT, "
+                              "timestamp DATETIME NOT NULL)"))
+        with self.assertRaises(RuntimeError) as raised:
+            database._check_columns()
+        self.assertIn("job_logs.output_ref", str(raised.exception))
+        self.assertIn("alembic upgrade head", str(raised.exception))
+        with self.engine.connect() as conn:
+            columns = [row[1] for row in conn.execute(text("PRAGMA table_info(job_logs)"))]
+        self.assertNotIn("output_ref", columns)
+
+
+if __name__ == "__main__":
+    unittest.main()
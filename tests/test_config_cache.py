@@ -0,0 +1,143 @@
+import queue
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+from app.core import config_cache as config_cache_module
+from app.core.config_cache import ConfigCache, RedisConfigInvalidator
+
+
+class ConfigCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.store = {"a": "1"}
+        self.loads = 0
+
+    def _loader(self, db=None):
+        self.loads += 1
+        return dict(self.store)
+
+    def test_hit_and_ttl(self):
+        cache = ConfigCache(self._loader, ttl=30)
+        clock = [0.0]
+        with mock.patch.object(config_cache_module.time, "monotonic", lambda: clock[0]):
+            self.assertEqual(cache.get("a"), "1")
+            self.store["a"] = "2"
+            self.assertEqual(cache.get("a"), "1")
+            clock[0] = 31
+            self.assertEqual(cache.get("a"), "2")
+        self.assertEqual(self.loads, 2)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_invalidate_during_load_is_not_lost(self):
+        loading, release = threading.Event(), threading.Event()
+
+        def slow_loader(db=None):
+            snapshot = dict(self.store)
+            loading.set()
+            release.wait(5)
+            return snapshot
+
+        cache = ConfigCache(slow_loader, ttl=30)
+        results = []
+        reader = threading.Thread(target=lambda: results.append(cache.get("a")))
+        reader.start()
+        self.assertTrue(loading.wait(5))
+        # 加载读到旧值后发生写入和失效
+        self.store["a"] = "2"
+        cache.invalidate()
+        release.set()
+        reader.join(5)
+
+        self.assertEqual(results, ["1"])
+        self.assertEqual(cache.stats()["cached_keys"], 0)
+        self.assertEqual(cache.get("a"), "2")
+
+    def test_hooks(self):
+        cache = ConfigCache(self._loader, ttl=30)
+        calls = []
+        cache.add_invalidation_hook(lambda: calls.append("ok"))
+        cache.add_invalidation_hook(mock.Mock(side_effect=RuntimeError("down")))
+        cache.get("a")
+        cache.invalidate()
+        cache.invalidate(broadcast=False)
+        self.assertEqual(calls, ["ok"])
+        stats = cache.stats()
+        self.assertEqual((stats["invalidations"], stats["remote_invalidations"]), (1, 1))
+
+    def test_concurrent_stats(self):
+        cache = ConfigCache(self._loader, ttl=30)
+        cache.get("a")
+        # 缩短线程切换间隔，放大计数竞争
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+
+        def read():
+            for _ in range(5000):
+                cache.get("a")
+                cache.peek()
+
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(cache.stats()["hits"], 8 * 5000 * 2)
+        self.assertEqual(cache.stats()["loads"], 1)
+
+
+class _FakePubSub:
+    def __init__(self, messages):
+        self.messages = messages
+
+    def subscribe(self, channel):
+        pass
+
+    def get_message(self, timeout=None):
+        try:
+            return self.messages.get(timeout=0.05)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        pass
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.messages = queue.Queue()
+
+    def publish(self, channel, data):
+        self.messages.put({"data": data.encode()})
+
+    def pubsub(self, ignore_subscribe_messages=True):
+        return _FakePubSub(self.messages)
+
+
+class RedisConfigInvalidatorTest(unittest.TestCase):
+    def test_remote_invalidation(self):
+        cache = ConfigCache(lambda db=None: {"a": "1"}, ttl=30)
+        client = _FakeRedis()
+        invalidator = RedisConfigInvalidator(cache, lambda: client, "config")
+        invalidator.start()
+        self.addCleanup(invalidator.stop)
+
+        deadline = time.monotonic() + 5
+        while cache.stats()["remote_invalidations"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        cache.get("a")
+
+        # 本进程发出的通知被忽略，其他节点的通知使缓存失效
+        cache.invalidate()
+        client.publish("config", "other-node")
+        while cache.stats()["remote_invalidations"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        self.assertEqual(cache.stats()["remote_invalidations"], 2)
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import threading
+import unittest
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED
+
+from app.services import scheduler as scheduler_module
+from app.services import tasks as tasks_module
+from app.services.scheduler import _pick_executor, _resolve_job_target
+
+RUN_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _crash():
+    os._exit(1)
+
+
+def _square(x):
+    return x * x
+
+
+def _job(job_id, func, args=()):
+    return SimpleNamespace(id=job_id, func=func, args=args, kwargs={}, misfire_grace_time=None,
+                           _jobstore_alias="default", max_instances=1)
+
+
+class ProcessPoolRecoveryTest(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.received = threading.Condition()
+        scheduler = mock.Mock(_create_lock=threading.RLock, _dispatch_event=self._dispatch)
+        self.executor = scheduler_module._ProcessPoolExecutor(1)
+        self.executor.start(scheduler, "process")
+        self.addCleanup(lambda: self.executor.shutdown(wait=True))
+
+    def _dispatch(self, event):
+        with self.received:
+            self.events.append(event)
+            self.received.notify_all()
+
+    def _wait_events(self, count, timeout=30):
+        with self.received:
+            self.assertTrue(self.received.wait_for(lambda: len(self.events) >= count, timeout))
+
+    def test_crash_reports_error_and_pool_is_replaced(self):
+        self.executor.submit_job(_job("crash", _crash), [RUN_TIME])
+        self._wait_events(1)
+        event = self.events[0]
+        self.assertEqual((event.code, event.job_id, event.scheduled_run_time), (EVENT_JOB_ERROR, "crash", RUN_TIME))
+        self.assertIsInstance(event.exception, BrokenProcessPool)
+        self.assertEqual(self.executor._instances["crash"], 0)
+
+        # 损坏的进程池在下一次提交时重建，任务照常执行
+        broken_pool = self.executor._pool
+        self.executor.submit_job(_job("square", _square, (7,)), [RUN_TIME])
+        self._wait_events(2)
+        self.assertIsNot(self.executor._pool, broken_pool)
+        self.assertEqual((self.events[1].code, self.events[1].retval), (EVENT_JOB_EXECUTED, 49))
+
+
+class PickExecutorTest(unittest.TestCase):
+    def _task(self, is_async=False, executor=None):
+        return SimpleNamespace(is_async=is_async, task_executor=executor)
+
+    def test_defaults(self):
+        self.assertEqual(_pick_executor(self._task()), "default")
+        self.assertEqual(_pick_executor(self._task(executor="process")), "process")
+        self.assertEqual(_pick_executor(self._task(is_async=True)), "asyncio")
+        # 创建任务时指定的执行器优先于 @task 中声明的执行器
+        self.assertEqual(_pick_executor(self._task(executor="process"), "default"), "default")
+        self.assertEqual(_pick_executor(self._task(is_async=True, executor="asyncio"), "asyncio"), "asyncio")
+
+    def test_mismatch_and_unknown(self):
+        with self.assertRaisesRegex(ValueError, "async def 任务只能使用 asyncio 执行器"):
+            _pick_executor(self._task(is_async=True), "default")
+        with self.assertRaisesRegex(ValueError, "asyncio 执行器只能运行 async def 任务"):
+            _pick_executor(self._task(), "asyncio")
+        with self.assertRaisesRegex(ValueError, "async def 任务只能使用 asyncio 执行器"):
+            _pick_executor(self._task(is_async=True, executor="process"))
+        with self.assertRaisesRegex(ValueError, "不支持的执行器 'gpu'"):
+            _pick_executor(self._task(), "gpu")
+
+    def test_resolve_registered_tasks(self):
+        patches = [mock.patch.dict(tasks_module._task_registry), mock.patch.dict(tasks_module._task_categories)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        @tasks_module.task(category="test", executor="process")
+        def crunch(n):
+            return n
+
+        @tasks_module.task(category="test")
+        async def fetch():
+            return None
+
+        func, args, _, executor = _resolve_job_target("crunch", [1])
+        self.assertEqual((func, args, executor), (tasks_module.custom_task_dispatcher, ["crunch", 1], "process"))
+        self.assertEqual(_resolve_job_target("crunch", [1], "default")[3], "default")
+        func, _, _, executor = _resolve_job_target("fetch")
+        self.assertEqual((func, executor), (tasks_module.async_task_dispatcher, "asyncio"))
+        with self.assertRaises(ValueError):
+            _resolve_job_target("fetch", executor="process")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+from unittest import mock
+
+from apscheduler.events import EVENT_JOB_ADDED, EVENT_JOB_MODIFIED, EVENT_JOB_REMOVED
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+import app.services.tasks  # noqa: F401  注册内置任务
+from app.services import scheduler as scheduler_module
+from app.services.job_catalog import JobCatalog
+
+
+def _add(job_id, func="auto_cleanup_logs", **extra):
+    return {"action": "add", "job_id": job_id, "func": func, "trigger": "interval",
+            "trigger_args": {"hours": 1}, **extra}
+
+
+class BulkApplyJobsTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        self.addCleanup(self.engine.dispose)
+        self.store = SQLAlchemyJobStore(engine=self.engine)
+        self.scheduler = scheduler_module._Scheduler(
+            jobstores={"default": self.store}, executors={"default": ThreadPoolExecutor(2)},
+            job_defaults=scheduler_module.job_defaults)
+        self.scheduler.start()
+        self.addCleanup(self.scheduler.shutdown, wait=False)
+        self.catalog = JobCatalog(self.scheduler)
+        self.catalog.rebuild()
+
+        self.events = []
+        self.scheduler.add_listener(lambda event: self.events.append(event.code),
+                                    EVENT_JOB_ADDED | EVENT_JOB_MODIFIED | EVENT_JOB_REMOVED)
+        self.wakeup = mock.Mock(wraps=self.scheduler.wakeup)
+        patches = [
+            mock.patch.object(scheduler_module, "scheduler", self.scheduler),
+            mock.patch.dict(scheduler_module.jobstores, {"default": self.store}),
+            mock.patch.object(scheduler_module, "job_catalog", self.catalog),
+            mock.patch.object(scheduler_module, "leader_elector", None),
+            mock.patch.object(self.scheduler, "wakeup", self.wakeup),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _apply(self, operations, atomic=True):
+        return scheduler_module.bulk_apply_jobs(operations, atomic=atomic)
+
+    def _assert_catalog_matches_store(self):
+        fresh = JobCatalog(self.scheduler)
+        fresh.rebuild()
+        self.assertEqual(self.catalog.list(), fresh.list())
+
+    def test_single_write_and_wakeup(self):
+        result = self._apply([_add(f"job-{i}") for i in range(50)])
+        self.assertEqual((result["succeeded"], result["failed"], result["applied"]), (50, 0, True))
+        self.assertEqual(self.wakeup.call_count, 1)
+        self.assertEqual(len(self.scheduler.get_jobs()), 50)
+        self._assert_catalog_matches_store()
+
+        result = self._apply([{"action": "pause", "job_id": "job-1"}, {"action": "remove", "job_id": "job-2"},
+                              {"action": "resume", "job_id": "job-3"}])
+        self.assertEqual(result["succeeded"], 3)
+        self.assertEqual(self.wakeup.call_count, 2)
+        self.assertIsNone(self.scheduler.get_job("job-1").next_run_time)
+        self.assertIsNone(self.scheduler.get_job("job-2"))
+        self._assert_catalog_matches_store()
+
+        self._apply([{"action": "resume", "job_id": "job-1"}])
+        self.assertIsNotNone(self.scheduler.get_job("job-1").next_run_time)
+        self._assert_catalog_matches_store()
+        # 批量写入不分发任务新增 / 修改 / 删除事件
+        self.assertEqual(self.events, [])
+
+    def test_validation_atomic(self):
+        self._apply([_add("existing")])
+        operations = [
+            _add("new"),
+            _add("existing"),
+            _add("dup"),
+            _add("dup"),
+            _add("bad-func", func="no_such_task"),
+            _add("bad-trigger", trigger="weekly"),
+            _add("precheck", error="触发器参数错误: x"),
+            {"action": "pause", "job_id": "missing"},
+            {"action": "pause"},
+            {"action": "explode", "job_id": "x"},
+        ]
+        result = self._apply(operations)
+        self.assertFalse(result["applied"])
+        self.assertEqual(result["failed"], len(operations))
+        self.assertEqual(result["results"][0]["msg"], "存在校验失败的操作，整批未执行")
+        messages = [item["msg"] for item in result["results"]]
+        self.assertIn("已存在", messages[1])
+        self.assertIn("重复", messages[3])
+        self.assertIn("找不到", messages[4])
+        self.assertIn("触发器", messages[5])
+        self.assertEqual(messages[6], "触发器参数错误: x")
+        self.assertIn("不存在", messages[7])
+        self.assertEqual(messages[8], "缺少任务 ID")
+        self.assertIn("不支持的操作类型", messages[9])
+        self.assertIsNone(self.scheduler.get_job("new"))
+        self.assertEqual(self.wakeup.call_count, 1)
+        self._assert_catalog_matches_store()
+
+    def test_non_atomic_applies_valid_items(self):
+        result = self._apply([_add("a"), _add("a"), {"action": "remove", "job_id": "missing"}, _add("b")],
+                             atomic=False)
+        self.assertTrue(result["applied"])
+        self.assertEqual([item["success"] for item in result["results"]], [True, False, False, True])
+        self.assertEqual(sorted(job.id for job in self.scheduler.get_jobs()), ["a", "b"])
+        self._assert_catalog_matches_store()
+
+    def test_undecodable_row_counts_as_existing(self):
+        with self.engine.begin() as conn:
+            conn.execute(self.store.jobs_t.insert().values(id="broken", next_run_time=None, job_state=b"garbage"))
+
+        for index, operation in enumerate((_add("broken"), {"action": "pause", "job_id": "broken"},
+                                           {"action": "remove", "job_id": "broken"})):
+            result = self._apply([operation, _add(f"ok-{index}")], atomic=False)
+            self.assertEqual([item["success"] for item in result["results"]], [False, True])
+            self.assertIn("无法加载", result["results"][0]["msg"])
+        self.assertEqual(len(self.catalog.list()), 3)
+
+    def test_stopped_scheduler(self):
+        with mock.patch.object(scheduler_module, "scheduler", mock.Mock(state=scheduler_module.STATE_STOPPED)):
+            with self.assertRaises(ValueError):
+                self._apply([_add("a")])
+
+
+if __name__ == "__main__":
+    unittest.main()
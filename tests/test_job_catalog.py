@@ -0,0 +1,109 @@
+import itertools
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from apscheduler.events import EVENT_JOB_ADDED, EVENT_JOB_EXECUTED, EVENT_JOB_REMOVED, JobExecutionEvent, JobEvent
+from apscheduler.triggers.interval import IntervalTrigger
+
+from app.services.job_catalog import STATUS_PAUSED, STATUS_RUNNING, JobCatalog
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+FUNCS = ("backup", "report", "cleanup")
+
+
+def _func(name):
+    def func():
+        pass
+    func.__name__ = name
+    return func
+
+
+def _job(n: int, paused: bool = False):
+    return SimpleNamespace(
+        id=f"job-{n:03d}", name=f"{'Alpha' if n % 2 else 'beta'} {n % 7}", func=_func(FUNCS[n % 3]),
+        args=(), kwargs={}, trigger=IntervalTrigger(minutes=10, start_date=BASE), executor="default",
+        next_run_time=None if paused else BASE + timedelta(minutes=(n * 37) % 50),
+    )
+
+
+class _Scheduler:
+    def __init__(self, jobs):
+        self.jobs = {job.id: job for job in jobs}
+
+    def get_jobs(self):
+        return list(self.jobs.values())
+
+    def get_job(self, job_id):
+        return self.jobs.get(job_id)
+
+
+class JobCatalogQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = _Scheduler([_job(n, paused=n % 5 == 0) for n in range(60)])
+        self.catalog = JobCatalog(self.scheduler)
+        self.catalog.rebuild()
+
+    def _expected(self, func=None, status=None, keyword=None, sort="next_run_time"):
+        jobs = [job for job in self.scheduler.jobs.values()
+                if (func is None or job.func.__name__ == func)
+                and (status is None or (STATUS_PAUSED if job.next_run_time is None else STATUS_RUNNING) == status)
+                and (keyword is None or keyword.lower() in job.id.lower() or keyword.lower() in job.name.lower())]
+        if sort == "name":
+            jobs.sort(key=lambda job: (job.name.lower(), job.id))
+        else:
+            jobs.sort(key=lambda job: (job.next_run_time is None,
+                                       job.next_run_time.timestamp() if job.next_run_time else 0.0, job.id))
+        return [job.id for job in jobs]
+
+    def test_matches_brute_force(self):
+        for func, status, keyword, sort in itertools.product(
+                (None, "backup", "missing"), (None, "running", STATUS_PAUSED), (None, "alpha", "job-01"),
+                ("next_run_time", "name")):
+            expected = self._expected(func, STATUS_RUNNING if status == "running" else status, keyword, sort)
+            case = (func, status, keyword, sort)
+
+            result = self.catalog.query(func, status, keyword, sort)
+            self.assertEqual([job["id"] for job in result["jobs"]], expected, case)
+            self.assertEqual(result["count"], len(expected), case)
+
+            seen, cursor = [], None
+            while True:
+                page = self.catalog.query(func, status, keyword, sort, limit=7, cursor=cursor)
+                seen += [job["id"] for job in page["jobs"]]
+                cursor = page["next_cursor"]
+                if not cursor:
+                    break
+            self.assertEqual(seen, expected, case)
+
+            page = self.catalog.query(func, status, keyword, sort, page=3, limit=4)
+            self.assertEqual([job["id"] for job in page["jobs"]], expected[8:12], case)
+
+    def test_invalid_sort_and_cursor(self):
+        with self.assertRaises(ValueError):
+            self.catalog.query(sort="id")
+        cursor = self.catalog.query(sort="name", limit=5)["next_cursor"]
+        with self.assertRaises(ValueError):
+            self.catalog.query(sort="next_run_time", limit=5, cursor=cursor)
+
+    def test_events_keep_indexes_consistent(self):
+        removed = self.scheduler.jobs.pop("job-001")
+        self.catalog.listener(JobEvent(EVENT_JOB_REMOVED, removed.id, "default"))
+        added = _job(100)
+        self.scheduler.jobs[added.id] = added
+        self.catalog.listener(JobEvent(EVENT_JOB_ADDED, added.id, "default"))
+
+        job = self.scheduler.jobs["job-002"]
+        run_time = job.next_run_time
+        self.catalog.listener(JobExecutionEvent(EVENT_JOB_EXECUTED, job.id, "default", run_time))
+        # 索引中的下次执行时间按触发器推算，与 jobstore 中更新后的值一致
+        job.next_run_time = run_time + timedelta(minutes=10)
+        self.assertEqual(self.catalog.get(job.id)["next_run_time"], str(job.next_run_time))
+
+        for sort in ("next_run_time", "name"):
+            self.assertEqual([job["id"] for job in self.catalog.query(sort=sort)["jobs"]], self._expected(sort=sort))
+        self.assertEqual(len(self.catalog.by_func("report")), len(self._expected(func="report")))
+
+
+if __name__ == "__main__":
+    unittest.main()
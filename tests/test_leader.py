@@ -0,0 +1,115 @@
+import unittest
+from unittest import mock
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.services import leader as leader_module
+from app.services.leader import LeaderElector
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+@unittest.skipIf(fakeredis is None, "需要 fakeredis")
+class LeaderElectorTest(unittest.TestCase):
+    def setUp(self):
+        self.server = fakeredis.FakeServer()
+        self.clock = [1000.0]
+        patch = mock.patch.object(leader_module.time, "monotonic", lambda: self.clock[0])
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.events = []
+
+    def _elector(self, name, **kwargs):
+        timeouts = []
+
+        def client_factory(socket_timeout=None):
+            timeouts.append(socket_timeout)
+            return fakeredis.FakeRedis(server=self.server)
+
+        elector = LeaderElector(
+            client_factory, key="test:leader", ttl=6, renew_interval=2, node_id=name,
+            on_elected=lambda: self.events.append((name, "elected")),
+            on_revoked=lambda: self.events.append((name, "revoked")),
+            **kwargs,
+        )
+        elector.timeouts = timeouts
+        return elector
+
+    def _redis(self):
+        return fakeredis.FakeRedis(server=self.server)
+
+    def test_acquire_and_renew(self):
+        first, second = self._elector("a"), self._elector("b")
+        first.tick()
+        second.tick()
+        self.assertTrue(first.is_leader)
+        self.assertFalse(second.is_leader)
+        self.assertEqual(second.leader_id(), "a")
+        self.assertEqual(first.timeouts, [1.0])
+
+        self._redis().pexpire("test:leader", 100)
+        first.tick()
+        self.assertTrue(first.is_leader)
+        self.assertGreater(self._redis().pttl("test:leader"), 5000)
+        self.assertEqual(self.events, [("a", "elected")])
+
+    def test_lease_lost_to_other_node(self):
+        first, second = self._elector("a"), self._elector("b")
+        first.tick()
+        # 租约过期后被其他节点抢占
+        self._redis().delete("test:leader")
+        second.tick()
+        first.tick()
+        self.assertFalse(first.is_leader)
+        self.assertTrue(second.is_leader)
+        self.assertEqual(first.status()["renew_failures"], 1)
+        self.assertEqual(self.events, [("a", "elected"), ("b", "elected"), ("a", "revoked")])
+
+    def test_redis_error_demotes_before_lease_expires(self):
+        first = self._elector("a")
+        first.tick()
+        client = first._get_client()
+        with mock.patch.object(client, "pipeline", side_effect=RedisConnectionError("timeout")):
+            # 还有不止一个续约间隔时保持主节点
+            self.clock[0] += 3.9
+            first.tick()
+            self.assertTrue(first.is_leader)
+            # 剩余租约不足一个续约间隔，下次续约前可能被接管，立即降级
+            self.clock[0] += 0.1
+            first.tick()
+            self.assertFalse(first.is_leader)
+        self.assertEqual(first.status()["redis_errors"], 2)
+
+        # Redis 恢复且租约仍由本节点持有时，续约失败后重新抢占
+        first.tick()
+        self.assertFalse(first.is_leader)
+        self._redis().delete("test:leader")
+        first.tick()
+        self.assertTrue(first.is_leader)
+
+    def test_follower_takes_over_after_release(self):
+        first, second = self._elector("a"), self._elector("b")
+        first.tick()
+        second.tick()
+        first.stop()
+        self.assertFalse(first.is_leader)
+        self.assertIsNone(self._redis().get("test:leader"))
+        second.tick()
+        self.assertTrue(second.is_leader)
+
+    def test_jobs_version(self):
+        changes = []
+        first = self._elector("a")
+        second = self._elector("b", on_tick=lambda is_leader, changed: changes.append(changed))
+        second.tick()
+        second.tick()
+        first.notify_jobs_changed()
+        second.tick()
+        self.assertEqual(changes, [False, False, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zlib
+from datetime import datetime, timedelta
+from unittest import mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core import database
+from app.core.log_archive import LogArchive, job_log_record
+from app.core.log_output import OUTPUT_ENCODING_FILE, OUTPUT_ENCODING_ZLIB, unpack_output
+from app.core.output_store import OutputStore
+from app.core.pagination import encode_cursor
+from app.models.sql_model import JobLog
+
+BASE = datetime(2024, 1, 1)
+
+
+def _rows(count: int, start_id: int = 1):
+    return [
+        {"id": i, "job_id": f"job-{i % 3}", "status": i % 5 != 0, "message": f"msg {i}", "duration": 1.0,
+         "output": f"out {i}", "output_ref": None, "output_encoding": None, "output_size": None,
+         "output_stored_size": None, "output_truncated": False, "timestamp": BASE + timedelta(hours=i)}
+        for i in range(start_id, start_id + count)
+    ]
+
+
+class LogArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.archive = LogArchive(self.root, segment_rows=10)
+        self.rows = _rows(100)
+        self.archive.write("job_logs", self.rows)
+
+    def _keys(self, rows):
+        return [(row["timestamp"], row["id"]) for row in rows]
+
+    def test_segments_by_day_and_size(self):
+        stats = self.archive.stats()["job_logs"]
+        self.assertEqual(stats["rows"], 100)
+        # 100 小时跨 5 天，每天最多 10 条一段
+        self.assertEqual(stats["segments"], 13)
+        self.assertEqual(stats["earliest"], self.rows[0]["timestamp"])
+
+    def test_scan_matches_sorted_rows(self):
+        expected = sorted(self._keys(self.rows), reverse=True)
+        self.assertEqual(self._keys(self.archive.scan("job_logs")), expected)
+        self.assertEqual(self._keys(self.archive.scan("job_logs", limit=7)), expected[:7])
+        before = expected[30]
+        self.assertEqual(self._keys(self.archive.scan("job_logs", before=before, limit=5)), expected[31:36])
+
+    def test_scan_time_range_and_match(self):
+        start, end = BASE + timedelta(hours=20), BASE + timedelta(hours=40)
+        rows = self.archive.scan("job_logs", lambda row: not row["status"], start, end)
+        self.assertEqual([row["id"] for row in rows], [40, 35, 30, 25, 20])
+        self.assertEqual(self.archive.count("job_logs", lambda row: not row["status"], start, end), 5)
+        self.assertEqual(self.archive.count("job_logs", None, start, end), 21)
+        self.assertEqual(self.archive.count("job_logs"), 100)
+
+    def test_reexport_overwrites_segment(self):
+        self.archive.write("job_logs", self.rows[:5])
+        self.assertEqual(len(self.archive.scan("job_logs")), 100)
+
+    def test_find_and_rebuild(self):
+        self.assertEqual(self.archive.find("job_logs", 42)["message"], "msg 42")
+        self.assertIsNone(self.archive.find("job_logs", 1000))
+        os.remove(os.path.join(self.root, "manifest.jsonl"))
+        self.assertEqual(self.archive.rebuild_manifest(), 13)
+        self.assertEqual(self.archive.stats()["job_logs"]["rows"], 100)
+
+    def test_compressed_output_kept(self):
+        row = {**_rows(1, 500)[0], "output": "pre", "output_encoding": OUTPUT_ENCODING_ZLIB,
+               "output_data": zlib.compress("完整输出".encode("utf-8"))}
+        self.archive.write("job_logs", [job_log_record(row)])
+        archived = self.archive.find("job_logs", 500)
+        self.assertEqual(archived["output"], "pre")
+        self.assertEqual(archived["output_full"], "完整输出")
+        self.assertNotIn("output_data", archived)
+
+
+class ArchiveQueryThroughTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.archive = LogArchive(os.path.join(self.root, "archive"), segment_rows=10)
+        self.store = OutputStore(os.path.join(self.root, "outputs"))
+        for target, value in (("log_archive", self.archive), ("output_store", self.store)):
+            patch = mock.patch.object(database, target, value)
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _live(self, rows, limit):
+        logs = [JobLog(**row) for row in sorted(rows, key=lambda r: (r["timestamp"], r["id"]), reverse=True)]
+        more = len(logs) > limit
+        return {"count": len(rows), "logs": logs[:limit], "next_cursor": "more" if more else None}
+
+    def test_merge_pages_with_cursor(self):
+        rows = _rows(60)
+        self.archive.write("job_logs", [job_log_record(row) for row in rows[:40]])
+        live_rows = rows[40:]
+        expected = [row["id"] for row in reversed(rows)]
+
+        seen, cursor = [], None
+        while True:
+            live = self._live([row for row in live_rows if cursor is None or
+                               (row["timestamp"], row["id"]) < cursor], 15)
+            archived = database.list_archived_job_logs(
+                limit=16, cursor=encode_cursor((cursor[0].isoformat(), cursor[1])) if cursor else None)
+            page = database.merge_archived_logs(live, archived, 15)
+            seen += [log.id for log in page["logs"]]
+            if not page["next_cursor"]:
+                break
+            last = page["logs"][-1]
+            cursor = (last.timestamp, last.id)
+        self.assertEqual(seen, expected)
+
+        first = database.merge_archived_logs(self._live(live_rows, 15), database.list_archived_job_logs(limit=16), 15)
+        self.assertEqual(first["count"], 60)
+        offset = database.merge_archived_logs(self._live(live_rows, 30), database.list_archived_job_logs(limit=31),
+                                              10, offset=20)
+        self.assertEqual([log.id for log in offset["logs"]], expected[20:30])
+        self.assertTrue(all(log.archived for log in offset["logs"][0:10] if log.id <= 40))
+
+    def test_archive_filters(self):
+        self.archive.write("job_logs", [job_log_record(row) for row in _rows(30)])
+        result = database.list_archived_job_logs(job_id="job-1", exact=True, status=False, limit=100)
+        self.assertEqual([log.id for log in result["logs"]], [25, 10])
+        self.assertEqual(result["count"], 2)
+        # 多个关键词须同时出现在 job_id、消息或输出中（不区分大小写）
+        expected = [i for i in range(30, 0, -1) if "2" in f"job-{i % 3} {i}"]
+        result = database.list_archived_job_logs(q="MSG 2", limit=100)
+        self.assertEqual([log.id for log in result["logs"]], expected)
+        self.assertEqual(result["count"], len(expected))
+        with self.assertRaises(ValueError):
+            database.list_archived_job_logs(cursor="not-a-cursor")
+
+    def test_archived_spill_files_survive_sweep(self):
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        self.addCleanup(engine.dispose)
+        JobLog.__table__.create(engine)
+        archived_ref = self.store.put(b"archived output")
+        orphan_ref = self.store.put(b"orphan output")
+        row = {**_rows(1)[0], "output_ref": archived_ref, "output_encoding": OUTPUT_ENCODING_FILE}
+        self.archive.write("job_logs", [job_log_record(row)])
+
+        with sessionmaker(bind=engine)() as db:
+            removed = database.cleanup_output_store(db, min_age=0)
+        self.assertEqual(removed["files"], 1)
+        self.assertIsNotNone(self.store.size(archived_ref))
+        self.assertIsNone(self.store.size(orphan_ref))
+
+    def test_get_archived_job_log_restores_full_output(self):
+        row = {**_rows(1)[0], "output": "pre", "output_encoding": OUTPUT_ENCODING_ZLIB,
+               "output_data": zlib.compress(b"full output")}
+        self.archive.write("job_logs", [job_log_record(row)])
+        log = database.get_archived_job_log(1)
+        self.assertTrue(log.archived)
+        self.assertEqual(unpack_output(log), "full output")
+        self.assertIsNone(database.get_archived_job_log(2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.log_cleanup import LogCleanup
+from app.core.log_stats import ensure_log_stats, reconcile_log_stats, record_logs
+from app.models.sql_model import JobLog, LogStat
+
+_logs = JobLog.__table__
+
+
+class LogCleanupTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        JobLog.__table__.create(self.engine)
+        LogStat.__table__.create(self.engine)
+        self.addCleanup(self.engine.dispose)
+        self.db = sessionmaker(bind=self.engine)()
+        self.addCleanup(self.db.close)
+        ensure_log_stats(self.db)
+
+        now = datetime.utcnow()
+        # 40 条过期日志 + 60 条未过期日志，部分时间戳相同
+        rows = [{"job_id": f"job-{i % 4}", "status": True, "message": f"old {i}",
+                 "timestamp": now - timedelta(days=20, minutes=i // 3)} for i in range(40)]
+        rows += [{"job_id": f"job-{i % 4}", "status": i % 2 == 0, "message": f"new {i}",
+                  "timestamp": now - timedelta(hours=i // 2)} for i in range(60)]
+        self.db.execute(insert(_logs), rows)
+        record_logs(self.db, rows)
+        self.db.commit()
+        self.keep = sorted(((row["timestamp"], i) for i, row in enumerate(rows[40:])), reverse=True)
+
+    def _remaining(self):
+        return self.db.execute(select(func.count()).select_from(_logs)).scalar()
+
+    def _assert_final(self, result, max_count=50):
+        self.assertTrue(result["completed"])
+        self.assertEqual(result["deleted_by_age"], 40)
+        self.assertEqual(result["deleted_by_count"], 60 - max_count)
+        self.assertEqual(self._remaining(), max_count)
+        oldest_kept = self.db.execute(select(func.min(_logs.c.timestamp))).scalar()
+        self.assertEqual(oldest_kept, self.keep[max_count - 1][0])
+        self.assertEqual(reconcile_log_stats(self.db, dry_run=True)["drift"], [])
+
+    def test_batched_run(self):
+        cleanup = LogCleanup(batch_size=7, pause=0)
+        result = cleanup.run(self.db, retention_days=10, max_count=50)
+        self._assert_final(result)
+        # 不足一批时删除剩余部分并结束：40 条分 6 批，10 条分 2 批
+        self.assertEqual(result["batches"], 6 + 2)
+
+    def test_stop_and_resume(self):
+        batches = []
+
+        def archive(db, condition):
+            batches.append(db.execute(select(func.count()).select_from(_logs).where(condition)).scalar())
+            if len(batches) == 3:
+                cleanup.stop()
+            return batches[-1]
+
+        cleanup = LogCleanup(batch_size=7, pause=0, archive=archive)
+        result = cleanup.run(self.db, retention_days=10, max_count=50)
+        self.assertTrue(result["stopped"])
+        self.assertFalse(result["completed"])
+        self.assertEqual(result["deleted_by_age"], 21)
+        self.assertEqual(self._remaining(), 79)
+        self.assertEqual(reconcile_log_stats(self.db, dry_run=True)["drift"], [])
+
+        # 继续时沿用原来的清理目标，不重复删除
+        result = cleanup.run(self.db, retention_days=1, max_count=10, resume=True)
+        self._assert_final(result)
+        self.assertEqual(result["archived"], 50)
+        self.assertEqual(sum(batches), 50)
+
+        result = cleanup.run(self.db, retention_days=10, max_count=50, resume=True)
+        self.assertEqual((result["deleted_by_age"], result["deleted_by_count"]), (0, 0))
+
+    def test_archive_failure_keeps_logs(self):
+        def archive(db, condition):
+            raise OSError("disk full")
+
+        cleanup = LogCleanup(batch_size=7, pause=0, archive=archive)
+        with self.assertRaises(OSError):
+            cleanup.run(self.db, retention_days=10, max_count=50)
+        self.assertEqual(self._remaining(), 100)
+        self.assertEqual(cleanup.progress()["error"], "disk full")
+        self.assertFalse(cleanup.progress()["running"])
+
+    def test_single_run_at_a_time(self):
+        started, release = threading.Event(), threading.Event()
+
+        def archive(db, condition):
+            started.set()
+            release.wait(5)
+            return 0
+
+        cleanup = LogCleanup(batch_size=100, pause=0, archive=archive)
+        worker = threading.Thread(target=cleanup.run, args=(sessionmaker(bind=self.engine)(), 10, 50))
+        worker.start()
+        self.assertTrue(started.wait(5))
+        try:
+            with self.assertRaises(ValueError):
+                cleanup.run(self.db, retention_days=10, max_count=50)
+        finally:
+            release.set()
+            worker.join(5)
+        self.assertFalse(cleanup.stop())
+
+
+if __name__ == "__main__":
+    unittest.main()
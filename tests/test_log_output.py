@@ -0,0 +1,154 @@
+import shutil
+import tempfile
+import unittest
+import zlib
+from types import SimpleNamespace
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core import log_output
+from app.core.log_output import (
+    OUTPUT_ENCODING_FILE,
+    OUTPUT_ENCODING_ZLIB,
+    RangeNotSatisfiable,
+    pack_output,
+    parse_range,
+    truncate_output,
+    unpack_output,
+)
+from app.core.output_store import OutputStore
+from app.models.sql_model import JobLog
+
+
+class ParseRangeTest(unittest.TestCase):
+    def test_ranges(self):
+        self.assertIsNone(parse_range(None, 100))
+        self.assertEqual(parse_range("bytes=0-9", 100), (0, 9))
+        self.assertEqual(parse_range("bytes=90-", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=90-200", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=-10", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=-500", 100), (0, 99))
+
+    def test_unsupported_ranges_return_full_content(self):
+        for header in ("bytes=0-1,5-6", "items=0-1", "bytes=-", "bytes=9-3"):
+            self.assertIsNone(parse_range(header, 100), header)
+
+    def test_out_of_range(self):
+        for header, size in (("bytes=100-", 100), ("bytes=200-300", 100), ("bytes=-0", 100), ("bytes=-5", 0)):
+            with self.assertRaises(RangeNotSatisfiable, msg=header):
+                parse_range(header, size)
+
+
+class PackOutputTest(unittest.TestCase):
+    def test_small_output_stored_as_is(self):
+        packed = pack_output("hello")
+        self.assertIsNone(packed["output_encoding"])
+        self.assertEqual(packed["output"], "hello")
+        self.assertEqual(packed["output_size"], 5)
+        self.assertFalse(packed["output_truncated"])
+
+    def test_none(self):
+        self.assertIsNone(pack_output(None)["output"])
+
+    def test_compressed_round_trip(self):
+        output = "第 1 行输出\n" * 2000
+        packed = pack_output(output)
+        self.assertEqual(packed["output_encoding"], OUTPUT_ENCODING_ZLIB)
+        self.assertLess(packed["output_stored_size"], packed["output_size"])
+        self.assertEqual(len(packed["output"]), log_output.LOG_OUTPUT_PREVIEW_CHARS)
+        self.assertEqual(unpack_output(SimpleNamespace(**packed)), output)
+
+    def test_truncate_keeps_head_and_tail_on_character_boundaries(self):
+        data = ("头" * 1000 + "尾" * 1000).encode("utf-8")
+        truncated, was_truncated = truncate_output(data, max_bytes=1001, tail_bytes=500)
+        self.assertTrue(was_truncated)
+        text = truncated.decode("utf-8")
+        self.assertTrue(text.startswith("头"))
+        self.assertTrue(text.endswith("尾"))
+        self.assertIn("输出已截断", text)
+        self.assertEqual(truncate_output(b"abc", max_bytes=0), (b"abc", False))
+
+    def test_spill_to_store(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, True)
+        output = "x" * 5000
+        with mock.patch.object(log_output, "output_store", OutputStore(root)), \
+                mock.patch.object(log_output, "LOG_OUTPUT_SPILL_MIN_BYTES", 1000):
+            packed = pack_output(output)
+            self.assertEqual(packed["output_encoding"], OUTPUT_ENCODING_FILE)
+            self.assertIsNone(packed["output_data"])
+            self.assertEqual(b"".join(log_output.output_store.iter_range(packed["output_ref"])), output.encode())
+            # 相同内容只保存一份
+            self.assertEqual(pack_output(output)["output_ref"], packed["output_ref"])
+
+
+class LogOutputRouteTest(unittest.TestCase):
+    def setUp(self):
+        from app.api.routes import router
+        from app.core.database import get_db
+
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        store_patch = mock.patch.object(log_output, "output_store", OutputStore(self.root))
+        store_patch.start()
+        self.addCleanup(store_patch.stop)
+
+        self.engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        JobLog.__table__.create(self.engine)
+        self.addCleanup(self.engine.dispose)
+        factory = sessionmaker(bind=self.engine)
+
+        def override_get_db():
+            db = factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app = FastAPI()
+        app.include_router(router)
+        app.dependency_overrides[get_db] = override_get_db
+        self.client = TestClient(app)
+
+        self.content = "0123456789" * 10
+        ref = log_output.output_store.put(self.content.encode())
+        with factory() as db:
+            db.add_all([
+                JobLog(id=1, job_id="job", status=True, message="ok", output=self.content[:10], output_ref=ref,
+                       output_encoding=OUTPUT_ENCODING_FILE, output_size=100),
+                JobLog(id=2, job_id="job", status=True, message="ok", output="", output_ref="0" * 64,
+                       output_encoding=OUTPUT_ENCODING_FILE, output_size=100),
+                JobLog(id=3, job_id="job", status=True, message="ok", output="abc",
+                       output_data=zlib.compress(b"abcdef"), output_encoding=OUTPUT_ENCODING_ZLIB),
+            ])
+            db.commit()
+
+    def test_full_and_partial_output(self):
+        response = self.client.get("/logs/1/output")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text, self.content)
+        response = self.client.get("/logs/1/output", headers={"Range": "bytes=-5"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers["Content-Range"], "bytes 95-99/100")
+        self.assertEqual(response.text, "56789")
+        self.assertEqual(self.client.get("/logs/3/output", headers={"Range": "bytes=3-"}).text, "def")
+
+    def test_out_of_range(self):
+        response = self.client.get("/logs/1/output", headers={"Range": "bytes=100-"})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers["Content-Range"], "bytes */100")
+
+    def test_missing_spill_file(self):
+        response = self.client.get("/logs/2/output")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["code"], 404)
+        self.assertEqual(self.client.get("/logs/9/output").json()["code"], 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core import log_search
+from app.core.log_search import create_search_index, drop_search_index, search_condition
+from app.models.sql_model import JobLog
+
+MESSAGES = [
+    'say "hello" to them',
+    "progress 100% done",
+    "progress 100 percent",
+    "file_name.txt saved",
+    "filename.txt saved",
+    "path C:\\temp\\x failed",
+    "a OR b AND NOT c",
+    "NEAR(alpha beta) *star* ^caret",
+    "message:column filter",
+    "数据库连接超时",
+    "it's a 'quoted' value",
+    "ab_c 50%_off",
+]
+
+QUERIES = [
+    '"hello"', 'say "hello', '100%', '%', '0%', 'file_name', '_', 'e_n', 'C:\\temp', '\\', 'OR', 'AND NOT',
+    'NEAR(alpha', '*star*', '^caret', 'message:column', '连接', '数据库 超时', "'quoted'", "it's", '50%_', 'PROGRESS',
+    'progress %', 'ab_ %_', 'missing',
+]
+
+
+class LogSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", poolclass=StaticPool)
+        JobLog.__table__.create(self.engine)
+        self.addCleanup(self.engine.dispose)
+        self.db = sessionmaker(bind=self.engine)()
+        self.addCleanup(self.db.close)
+        patch = mock.patch.object(log_search, "_fts_ready", None)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def _insert(self):
+        self.db.execute(insert(JobLog.__table__), [
+            {"id": i, "job_id": f"job-{i}", "status": True, "message": message, "output": None}
+            for i, message in enumerate(MESSAGES, 1)
+        ])
+        self.db.commit()
+
+    def _expected(self, q):
+        terms = q.lower().split()
+        return [i for i, message in enumerate(MESSAGES, 1)
+                if all(term in f"job-{i}\n{message}".lower() for term in terms)]
+
+    def _search(self, q):
+        condition = search_condition(self.db, q)
+        return list(self.db.scalars(select(JobLog.id).where(condition).order_by(JobLog.id)))
+
+    def _check_all(self):
+        for q in QUERIES:
+            self.assertEqual(self._search(q), self._expected(q), q)
+
+    def test_like_fallback(self):
+        self._insert()
+        self.assertFalse(log_search.has_search_index(self.db))
+        self._check_all()
+
+    @unittest.skipUnless(log_search.sqlite_trigram_supported(), "SQLite 不支持 FTS5 trigram 分词")
+    def test_fts(self):
+        create_search_index(self.db)
+        self.db.commit()
+        # 建索引后写入的日志由触发器同步
+        self._insert()
+        self._check_all()
+
+        self.db.execute(JobLog.__table__.delete().where(JobLog.id == 1))
+        self.db.commit()
+        self.assertEqual(self._search('"hello"'), [])
+
+        drop_search_index(self.db)
+        self.db.commit()
+        self.assertEqual(self._search("saved"), [4, 5])
+
+    def test_empty_query(self):
+        self.assertIsNone(search_condition(self.db, "   "))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from sqlalchemy import create_engine, delete, event, insert, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core import database
+from app.core.log_stats import (
+    clear_log_stats,
+    delete_logs,
+    ensure_log_stats,
+    read_log_stats,
+    reconcile_log_stats,
+    record_logs,
+)
+from app.models.sql_model import JobLog, LOG_STATS_ALL, LogStat
+
+BASE = datetime(2024, 1, 1)
+_logs = JobLog.__table__
+
+
+class LogStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", poolclass=StaticPool)
+        JobLog.__table__.create(self.engine)
+        LogStat.__table__.create(self.engine)
+        self.addCleanup(self.engine.dispose)
+        self.db = sessionmaker(bind=self.engine)()
+        self.addCleanup(self.db.close)
+        self.random = random.Random(7)
+        ensure_log_stats(self.db)
+
+    def _write(self, count: int):
+        rows = []
+        for _ in range(count):
+            size = self.random.choice((None, 10, 5000))
+            rows.append({
+                "job_id": f"job-{self.random.randrange(6)}", "status": self.random.random() < 0.7, "message": "m",
+                "output_size": size, "output_stored_size": size // 2 if size else None,
+                "timestamp": BASE + timedelta(minutes=self.random.randrange(10000)),
+            })
+        self.db.execute(insert(_logs), rows)
+        record_logs(self.db, rows)
+        self.db.commit()
+
+    def _assert_consistent(self):
+        result = reconcile_log_stats(self.db, dry_run=True)
+        self.assertEqual(result["drift"], [])
+
+    def test_increments_and_decrements_match_recount(self):
+        for step in range(20):
+            self._write(self.random.randrange(1, 40))
+            if step % 3 == 2:
+                cutoff = BASE + timedelta(minutes=self.random.randrange(10000))
+                condition = _logs.c.timestamp < cutoff
+                if step % 2:
+                    condition = condition & (_logs.c.job_id == f"job-{self.random.randrange(6)}")
+                delete_logs(self.db, condition)
+                self.db.commit()
+            self._assert_consistent()
+
+        delete_logs(self.db, _logs.c.job_id == "job-1")
+        self.db.commit()
+        self._assert_consistent()
+        self.assertIsNone(self.db.get(LogStat, "job-1"))
+        self.assertEqual(delete_logs(self.db, _logs.c.job_id == "job-1"), 0)
+
+        total = self.db.execute(select(_logs.c.id)).all()
+        self.assertEqual(read_log_stats(self.db)["total_count"], len(total))
+
+    def test_reconcile_repairs_drift(self):
+        self._write(50)
+        # 绕过统计直接删除日志
+        self.db.execute(delete(_logs).where(_logs.c.job_id == "job-2"))
+        self.db.commit()
+        result = reconcile_log_stats(self.db, dry_run=True)
+        self.assertEqual({item["job_id"] for item in result["drift"]}, {LOG_STATS_ALL, "job-2"})
+        self.assertIsNotNone(self.db.get(LogStat, "job-2"))
+
+        reconcile_log_stats(self.db)
+        self._assert_consistent()
+        self.assertIsNone(self.db.get(LogStat, "job-2"))
+
+    def test_clear(self):
+        self._write(20)
+        self.db.execute(delete(_logs))
+        clear_log_stats(self.db)
+        self.db.commit()
+        self._assert_consistent()
+        self.assertEqual(read_log_stats(self.db)["total_count"], 0)
+
+    def test_get_log_stats_reads_summary_only(self):
+        self._write(30)
+        now = datetime.utcnow()
+        rows = [{"job_id": "job-1", "status": True, "message": "m", "timestamp": now - timedelta(days=days)}
+                for days in (0, 1, 40)]
+        self.db.execute(insert(_logs), rows)
+        record_logs(self.db, rows)
+        self.db.commit()
+
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        with mock.patch.object(database, "get_config_int", lambda db, key, default=0: default):
+            stats = database.get_log_stats(self.db)
+            self.assertIsNone(stats["expired_count"])
+            self.assertFalse([sql for sql in statements if "FROM job_logs" in sql])
+            self.assertEqual(stats["total_count"], 33)
+
+            # BASE 开始的 30 条和 40 天前的 1 条超过 30 天保留期
+            self.assertEqual(database.get_log_stats(self.db, include_expired=True)["expired_count"], 31)
+            job_1 = self.db.execute(select(_logs.c.id).where(_logs.c.job_id == "job-1",
+                                                           _logs.c.timestamp < now - timedelta(days=30))).all()
+            self.assertEqual(database.get_log_stats(self.db, "job-1", include_expired=True)["expired_count"],
+                             len(job_1))
+
+
+if __name__ == "__main__":
+    unittest.main()
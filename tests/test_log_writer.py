@@ -0,0 +1,144 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.log_output import OUTPUT_ENCODING_ZLIB
+from app.models.sql_model import JobLog, LogStat
+from app.services import log_writer as log_writer_module
+from app.services.log_writer import LogWriter
+
+
+class LogWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        JobLog.__table__.create(self.engine)
+        LogStat.__table__.create(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def _count(self):
+        with self.session_factory() as db:
+            return db.execute(select(func.count()).select_from(JobLog)).scalar()
+
+    def test_output_packed_on_writer_thread(self):
+        threads = []
+        pack_output = log_writer_module.pack_output
+
+        def tracking_pack_output(output):
+            threads.append(threading.current_thread().name)
+            return pack_output(output)
+
+        writer = LogWriter(self.session_factory, queue_size=100, batch_size=10, flush_interval=0.05)
+        with mock.patch.object(log_writer_module, "pack_output", tracking_pack_output):
+            writer.start()
+            try:
+                writer.write("job", True, "ok", 1.0, "x" * 100000)
+            finally:
+                writer.stop()
+
+        self.assertEqual(threads, ["job-log-writer"])
+        with self.session_factory() as db:
+            log = db.query(JobLog).one()
+            self.assertEqual(log.output_encoding, OUTPUT_ENCODING_ZLIB)
+            self.assertEqual(log.output_size, 100000)
+            total = db.query(LogStat).filter(LogStat.job_id == "job").one().total_count
+        self.assertEqual(total, 1)
+
+    def test_stats_shape_stable_before_and_after_flush(self):
+        writer = LogWriter(self.session_factory, queue_size=10, batch_size=10, flush_interval=60)
+        before = writer.stats()
+        self.assertNotIn("total_flush_ms", before)
+        self.assertEqual(before["avg_flush_ms"], 0)
+
+        # 后台线程未启动时同步写入，同样计入批次统计
+        writer.write("job", True, "ok")
+        after = writer.stats()
+        self.assertEqual(set(after), set(before))
+        self.assertEqual(after["batches"], 1)
+        self.assertEqual(after["avg_batch_size"], 1)
+
+    def test_overflow_writes_synchronously(self):
+        writer = LogWriter(self.session_factory, queue_size=1, batch_size=10, flush_interval=60)
+        # 后台线程未启动时直接写入；模拟运行中且队列已满
+        writer._queue.put_nowait({"job_id": "queued", "status": True, "message": "m", "duration": None,
+                                  "output": None, "timestamp": log_writer_module.datetime.utcnow()})
+        with mock.patch.object(LogWriter, "running", new_callable=mock.PropertyMock, return_value=True):
+            writer.write("job", True, "ok")
+        self.assertEqual(writer.stats()["overflow"], 1)
+        self.assertEqual(self._count(), 1)
+        self.assertEqual(writer.flush(), 1)
+        self.assertEqual(self._count(), 2)
+
+    def _row(self, job_id, status=True, output=None):
+        return {"job_id": job_id, "status": status, "message": "m", "duration": None, "output": output,
+                "timestamp": log_writer_module.datetime.utcnow()}
+
+    def test_failed_batch_falls_back_to_single_rows(self):
+        writer = LogWriter(self.session_factory, queue_size=10, batch_size=10, flush_interval=60)
+        for row in (self._row("a"), self._row("bad", status=None), self._row("b"), self._row("c")):
+            writer._queue.put_nowait(row)
+        writer.flush()
+
+        # 违反非空约束的一条被丢弃，其余逐条写入成功
+        self.assertEqual(self._count(), 3)
+        stats = writer.stats()
+        self.assertEqual((stats["written"], stats["failed"], stats["batches"]), (3, 1, 1))
+        with self.session_factory() as db:
+            self.assertEqual(db.query(LogStat).filter(LogStat.job_id == "bad").count(), 0)
+            self.assertEqual(db.query(LogStat).filter(LogStat.job_id == "a").one().total_count, 1)
+
+    def test_output_failure_keeps_log(self):
+        pack_output = log_writer_module.pack_output
+
+        def failing_pack_output(output):
+            if output == "broken":
+                raise OSError("disk full")
+            return pack_output(output)
+
+        writer = LogWriter(self.session_factory, queue_size=10, batch_size=10, flush_interval=60)
+        writer._queue.put_nowait(self._row("a", output="broken"))
+        writer._queue.put_nowait(self._row("b", output="fine"))
+        with mock.patch.object(log_writer_module, "pack_output", failing_pack_output):
+            writer.flush()
+
+        with self.session_factory() as db:
+            outputs = dict(db.query(JobLog.job_id, JobLog.output).all())
+        self.assertEqual(outputs, {"a": None, "b": "fine"})
+        self.assertEqual(writer.stats()["failed"], 0)
+
+    def test_writer_thread_survives_errors(self):
+        writer = LogWriter(self.session_factory, queue_size=10, batch_size=1, flush_interval=0.01)
+        write_batch = writer._write_batch
+        calls = []
+
+        def flaky_write_batch(rows):
+            calls.append(rows[0]["job_id"])
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            write_batch(rows)
+
+        writer._write_batch = flaky_write_batch
+        writer.start()
+        try:
+            writer.write("lost", True, "m")
+            writer.write("kept", True, "m")
+            for _ in range(500):
+                if len(calls) == 2:
+                    break
+                time.sleep(0.01)
+            self.assertTrue(writer.running)
+        finally:
+            writer.stop()
+        self.assertEqual(calls, ["lost", "kept"])
+        self.assertEqual(self._count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
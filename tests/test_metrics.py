@@ -0,0 +1,123 @@
+import os
+import re
+import unittest
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import conf
+from app.middleware import metrics as metrics_middleware
+from app.middleware.auth import APIKeyMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.services.metrics import Histogram, MetricsRegistry
+
+# 文本格式 0.0.4：注释行或 "名称{标签} 值"
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{([a-zA-Z_][a-zA-Z0-9_]*="(\\.|[^"\\])*",?)*\})? (\S+)$')
+
+
+def _samples(text):
+    result = {}
+    for line in text.rstrip("\n").split("\n"):
+        if line.startswith("#"):
+            continue
+        match = _SAMPLE.match(line)
+        assert match, line
+        name_and_labels, value = line.rsplit(" ", 1)
+        result[name_and_labels] = value
+    return result
+
+
+class ExpositionFormatTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_and_escaping(self):
+        counter = self.registry.counter("jobs_total", "任务数", ("job_id", "status"))
+        counter.inc('say "hi"\\\n', "ok")
+        counter.inc("b", "ok", value=2.5)
+        text = self.registry.render()
+
+        self.assertTrue(text.startswith("# HELP jobs_total 任务数\n# TYPE jobs_total counter\n"))
+        self.assertTrue(text.endswith("\n"))
+        samples = _samples(text)
+        self.assertEqual(samples['jobs_total{job_id="say \\"hi\\"\\\\\\n",status="ok"}'], "1")
+        self.assertEqual(samples['jobs_total{job_id="b",status="ok"}'], "2.5")
+        with self.assertRaises(ValueError):
+            counter.inc("only-one-label")
+
+    def test_histogram_buckets(self):
+        histogram = self.registry.histogram("run_seconds", "耗时", ("job_id",), buckets=(0.5, 0.1, 1))
+        for value in (0.05, 0.1, 0.3, 2):
+            histogram.observe(value, "a")
+        samples = _samples(self.registry.render())
+
+        # 桶按上界排序且累计计数，le 包含等于上界的值
+        self.assertEqual([samples[f'run_seconds_bucket{{job_id="a",le="{le}"}}'] for le in ("0.1", "0.5", "1", "+Inf")],
+                         ["2", "3", "3", "4"])
+        self.assertEqual(samples['run_seconds_count{job_id="a"}'], "4")
+        self.assertEqual(float(samples['run_seconds_sum{job_id="a"}']), 2.45)
+
+    def test_callbacks(self):
+        self.registry.gauge_callback("queue_depth", "队列深度", lambda: [({"queue": "a"}, 3), ({"queue": "b"}, None)])
+        self.registry.counter_callback("broken_total", "采集失败", mock.Mock(side_effect=RuntimeError("down")))
+        self.registry.gauge_callback("plain", "无标签", lambda: [({}, 0.25)])
+        text = self.registry.render()
+
+        self.assertEqual(_samples(text), {'queue_depth{queue="a"}': "3", "plain": "0.25"})
+        self.assertIn("# TYPE queue_depth gauge", text)
+        # 采集失败的指标整体省略，不输出没有样本的 HELP / TYPE
+        self.assertNotIn("broken_total", text)
+
+    def test_reregistering_reuses_metric(self):
+        first = self.registry.counter("dup_total", "重复", ())
+        self.assertIs(self.registry.counter("dup_total", "重复", ()), first)
+
+
+class MetricsMiddlewareTest(unittest.TestCase):
+    def setUp(self):
+        self.histogram = Histogram("http_request_duration_seconds", "HTTP 请求耗时", ("method", "route", "status"))
+        patch = mock.patch.object(metrics_middleware, "http_request_duration", self.histogram)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        app = FastAPI()
+
+        @app.get("/jobs/{job_id}")
+        def get_job(job_id: str):
+            return {"id": job_id}
+
+        @app.get("/boom")
+        def boom():
+            raise RuntimeError("boom")
+
+        app.add_middleware(MetricsMiddleware)
+        self.client = TestClient(app, raise_server_exceptions=False)
+
+    def _counts(self):
+        # 每组标签的取值为 [各桶计数..., +Inf 计数, 总和]
+        return {key: sum(values[:-1]) for key, values in self.histogram._values.items()}
+
+    def test_route_template_labels(self):
+        for job_id in ("1", "2", "3"):
+            self.assertEqual(self.client.get(f"/jobs/{job_id}").status_code, 200)
+        self.client.get("/missing/path")
+        self.client.get("/boom")
+
+        self.assertEqual(self._counts(), {
+            ("GET", "/jobs/{job_id}", "200"): 3,
+            ("GET", "<unmatched>", "404"): 1,
+            ("GET", "/boom", "500"): 1,
+        })
+
+
+class MetricsAuthDefaultTest(unittest.TestCase):
+    @unittest.skipIf("METRICS_PUBLIC" in os.environ, "环境中设置了 METRICS_PUBLIC")
+    def test_metrics_requires_api_key_by_default(self):
+        self.assertFalse(conf.METRICS_PUBLIC)
+        middleware = APIKeyMiddleware(FastAPI())
+        self.assertNotIn("/metrics", middleware._public_prefixes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core import pagination
+from app.core.pagination import CountCache, decode_cursor, encode_cursor, keyset_page, page_count
+from app.models.sql_model import JobLog
+
+BASE = datetime(2024, 1, 1)
+
+
+class CursorTest(unittest.TestCase):
+    def test_round_trip(self):
+        for key in (("2024-01-01T00:00:00", 1), ("任务", 2**40), ("a/b+c", 0)):
+            cursor = encode_cursor(key)
+            self.assertNotIn("/", cursor)
+            self.assertNotIn("+", cursor)
+            self.assertEqual(decode_cursor(cursor), key)
+
+    def test_invalid(self):
+        for cursor in ("", "not base64!", encode_cursor(("x",))[:-2], "5Lu75Yqh"):
+            with self.assertRaises(ValueError, msg=cursor):
+                decode_cursor(cursor)
+
+
+class KeysetPageTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", poolclass=StaticPool)
+        JobLog.__table__.create(self.engine)
+        self.addCleanup(self.engine.dispose)
+        self.db = sessionmaker(bind=self.engine)()
+        self.addCleanup(self.db.close)
+        # 每两条共用一个时间戳，验证同一时间内按 id 排序
+        self.db.add_all([JobLog(id=i, job_id="job", status=True, message="m", timestamp=BASE + timedelta(minutes=i // 2))
+                         for i in range(1, 24)])
+        self.db.commit()
+        self.expected = [log.id for log in sorted(self.db.query(JobLog).all(),
+                                                  key=lambda log: (log.timestamp, log.id), reverse=True)]
+
+    def _page(self, cursor=None, page=1):
+        return keyset_page(self.db.query(JobLog), JobLog.timestamp, JobLog.id, 5, cursor, page)
+
+    def test_cursor_walks_all_rows_once(self):
+        seen, cursor = [], None
+        while True:
+            rows, cursor = self._page(cursor)
+            seen += [row.id for row in rows]
+            if cursor is None:
+                break
+            if len(seen) == 5:
+                # 翻页期间新写入的日志不会让后续页重复或遗漏
+                self.db.add(JobLog(id=100, job_id="job", status=True, message="new", timestamp=BASE + timedelta(days=1)))
+                self.db.commit()
+        self.assertEqual(seen, self.expected)
+
+    def test_page_offset_and_last_page(self):
+        rows, cursor = self._page(page=2)
+        self.assertEqual([row.id for row in rows], self.expected[5:10])
+        self.assertIsNotNone(cursor)
+        rows, cursor = self._page(page=5)
+        self.assertEqual([row.id for row in rows], self.expected[20:])
+        self.assertIsNone(cursor)
+
+    def test_invalid_cursor(self):
+        for cursor in ("garbage", encode_cursor(("not a time", 1)), encode_cursor((1, 2, 3))):
+            with self.assertRaises(ValueError, msg=cursor):
+                self._page(cursor)
+
+    def test_page_count_modes(self):
+        cache = CountCache(ttl=60)
+        query = self.db.query(JobLog)
+        self.assertIsNone(page_count(self.db, JobLog, query, "none", (None,), cache))
+        self.assertEqual(page_count(self.db, JobLog, query, "estimate", (None,), cache), 23)
+        self.assertEqual(page_count(self.db, JobLog, query.filter(JobLog.id < 5), "estimate", ("x",), cache), 4)
+        with self.assertRaises(ValueError):
+            page_count(self.db, JobLog, query, "fast", (None,), cache)
+
+
+class CountCacheTest(unittest.TestCase):
+    def test_ttl_and_eviction(self):
+        query = mock.Mock()
+        query.count.side_effect = range(100)
+        cache = CountCache(ttl=10, max_entries=2)
+        clock = [0.0]
+        with mock.patch.object(pagination.time, "monotonic", lambda: clock[0]):
+            self.assertEqual(cache.get_or_count("a", query), 0)
+            self.assertEqual(cache.get_or_count("a", query), 0)
+            clock[0] = 11
+            self.assertEqual(cache.get_or_count("a", query), 1)
+            cache.get_or_count("b", query)
+            cache.get_or_count("c", query)
+            self.assertLessEqual(len(cache._values), 2)
+        # ttl 为 0 时不缓存
+        no_cache = CountCache(ttl=0)
+        first = no_cache.get_or_count("a", query)
+        self.assertEqual(no_cache.get_or_count("a", query), first + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,211 @@
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from app.core import partitioning as partitioning_module
+from app.core.partitioning import TimePartitioning
+from app.models.sql_model import JobLog
+
+
+class _Result:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+    def all(self):
+        return self.value
+
+    def scalars(self):
+        return self
+
+
+class _RecordingSession:
+    """记录执行的 SQL；查询按语句中的关键字返回预设结果（PostgreSQL 系统表不能在 SQLite 上模拟）"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        for keyword, value in self.responses.items():
+            if keyword in sql:
+                return _Result(value(params) if callable(value) else value)
+        self.statements.append(sql)
+        return _Result(None)
+
+    def connection(self):
+        return None
+
+
+def _bounds(name, start, end):
+    lower = "MINVALUE" if start is None else f"'{start}'"
+    upper = "MAXVALUE" if end is None else f"'{end}'"
+    return name, f"FOR VALUES FROM ({lower}) TO ({upper})"
+
+
+class PeriodTest(unittest.TestCase):
+    def test_daily_and_monthly(self):
+        daily = TimePartitioning(JobLog, "timestamp", "daily")
+        self.assertEqual(daily.period_start(datetime(2024, 2, 29, 13, 5)), datetime(2024, 2, 29))
+        self.assertEqual(daily.next_period(datetime(2024, 2, 29)), datetime(2024, 3, 1))
+        self.assertEqual(daily.partition_name(datetime(2024, 3, 1)), "job_logs_p20240301")
+
+        monthly = TimePartitioning(JobLog, "timestamp", "monthly")
+        self.assertEqual(monthly.period_start(datetime(2024, 12, 31, 23, 59)), datetime(2024, 12, 1))
+        self.assertEqual(monthly.next_period(datetime(2024, 12, 1)), datetime(2025, 1, 1))
+        self.assertEqual(monthly.partition_name(datetime(2024, 12, 1)), "job_logs_p202412")
+
+        with self.assertRaises(ValueError):
+            TimePartitioning(JobLog, "timestamp", "weekly")
+
+
+class PartitionSqlTest(unittest.TestCase):
+    def setUp(self):
+        self.partitioning = TimePartitioning(JobLog, "timestamp", "monthly", premake=2)
+        self.existing = []
+        self.db = _RecordingSession({"pg_inherits": lambda params: list(self.existing)})
+
+    def test_create(self):
+        self.partitioning.create(self.db)
+        create_table, *rest = self.db.statements
+        self.assertIn("CREATE TABLE job_logs", create_table)
+        self.assertIn("id SERIAL NOT NULL", create_table)
+        self.assertIn("CONSTRAINT job_logs_pkey PRIMARY KEY (id, timestamp)", create_table)
+        self.assertTrue(create_table.endswith('PARTITION BY RANGE ("timestamp")'))
+        indexes = [sql for sql in rest if sql.startswith("CREATE INDEX")]
+        self.assertEqual(len(indexes), len(JobLog.__table__.indexes))
+        self.assertIn("CREATE INDEX ix_job_logs_output_ref ON job_logs (output_ref) WHERE output_ref IS NOT NULL",
+                      indexes)
+        # 当前周期及之后 premake 个周期
+        self.assertEqual(len([sql for sql in rest if "PARTITION OF" in sql]), 3)
+
+    def test_ensure_partitions_skips_existing_and_overlapping(self):
+        self.existing = [
+            _bounds("job_logs_legacy", None, "2024-02-01 00:00:00"),
+            _bounds("job_logs_p202403", "2024-03-01 00:00:00", "2024-04-01 00:00:00"),
+        ]
+        created = self.partitioning.ensure_partitions(self.db, now=datetime(2024, 1, 15))
+        self.assertEqual(created, ["job_logs_p202402"])
+        self.assertEqual(self.db.statements, [
+            'CREATE TABLE IF NOT EXISTS "job_logs_p202402" PARTITION OF "job_logs" '
+            "FOR VALUES FROM ('2024-02-01 00:00:00') TO ('2024-03-01 00:00:00')"
+        ])
+
+    def test_partitions_parsing_and_expired_boundary(self):
+        self.existing = [
+            _bounds("job_logs_p202402", "2024-02-01 00:00:00", "2024-03-01 00:00:00"),
+            _bounds("job_logs_legacy", None, "2024-01-01 00:00:00"),
+            _bounds("job_logs_p202401", "2024-01-01 00:00:00", "2024-02-01 00:00:00"),
+            _bounds("job_logs_future", "2024-03-01 00:00:00", None),
+            ("job_logs_default", "DEFAULT"),
+        ]
+        partitions = self.partitioning.partitions(self.db)
+        self.assertEqual([name for name, _, _ in partitions],
+                         ["job_logs_legacy", "job_logs_p202401", "job_logs_p202402", "job_logs_future"])
+        self.assertEqual(partitions[0][1:], (None, datetime(2024, 1, 1)))
+        self.assertIsNone(partitions[-1][2])
+
+        def expired(cutoff):
+            return [name for name, _, _ in self.partitioning.expired(self.db, cutoff)]
+
+        # 上界不晚于 cutoff 的分区中数据全部早于 cutoff
+        self.assertEqual(expired(datetime(2024, 2, 1)), ["job_logs_legacy", "job_logs_p202401"])
+        self.assertEqual(expired(datetime(2024, 1, 31, 23, 59, 59)), ["job_logs_legacy"])
+        self.assertEqual(expired(datetime(2023, 12, 31)), [])
+        # 上界为 MAXVALUE 的分区永不过期
+        self.assertEqual(expired(datetime(2030, 1, 1)), ["job_logs_legacy", "job_logs_p202401", "job_logs_p202402"])
+
+    def test_remove(self):
+        self.partitioning.remove(self.db, "job_logs_p202401")
+        self.partitioning.remove(self.db, "job_logs_p202402", mode="detach")
+        self.assertEqual(self.db.statements, [
+            'DROP TABLE "job_logs_p202401"',
+            'ALTER TABLE "job_logs" DETACH PARTITION "job_logs_p202402"',
+        ])
+        with self.assertRaises(ValueError):
+            self.partitioning.remove(self.db, "job_logs_p202401", mode="truncate")
+
+
+class ConvertTest(unittest.TestCase):
+    def setUp(self):
+        self.partitioning = TimePartitioning(JobLog, "timestamp", "monthly", premake=1)
+        self.relkind = "r"
+        self.columns = [column.name for column in JobLog.__table__.columns if column.name != "output_ref"]
+        self.db = _RecordingSession({
+            "relkind": lambda params: self.relkind,
+            "pg_get_serial_sequence": "public.job_logs_id_seq",
+            "max(job_logs.timestamp)": datetime(2024, 5, 20, 8, 0),
+            "contype = 'p'": "job_logs_pkey",
+            "pg_indexes": ["ix_job_logs_timestamp_id", "custom_idx"],
+            "pg_inherits": lambda params: self._attached(),
+        })
+        inspector = mock.Mock()
+        inspector.get_columns.side_effect = lambda name: [{"name": column} for column in self.columns]
+        patch = mock.patch.object(partitioning_module, "inspect", return_value=inspector)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def _attached(self):
+        attached = [sql for sql in self.db.statements if "ATTACH PARTITION" in sql]
+        return [_bounds("job_logs_legacy", None, "2024-06-01 00:00:00")] if attached else []
+
+    def test_convert(self):
+        with mock.patch.object(partitioning_module, "datetime", wraps=datetime) as clock:
+            clock.utcnow.return_value = datetime(2024, 5, 25)
+            result = self.partitioning.convert(self.db)
+
+        self.assertEqual(result, {"table": "job_logs", "converted": True, "legacy_until": "2024-06-01T00:00:00",
+                                  "partitions": ["job_logs_p202406"]})
+        statements = self.db.statements
+        self.assertEqual(statements[:5], [
+            'ALTER TABLE "job_logs" ADD COLUMN output_ref VARCHAR(64)',
+            'ALTER TABLE "job_logs" RENAME TO "job_logs_legacy"',
+            'ALTER TABLE "job_logs_legacy" DROP CONSTRAINT "job_logs_pkey"',
+            'ALTER INDEX "ix_job_logs_timestamp_id" RENAME TO "ix_job_logs_legacy_timestamp_id"',
+            'ALTER INDEX "custom_idx" RENAME TO "job_logs_legacy_custom_idx"',
+        ])
+        create_table = statements[5]
+        self.assertIn("id INTEGER DEFAULT nextval('public.job_logs_id_seq'::regclass) NOT NULL", create_table)
+        self.assertIn('PARTITION BY RANGE ("timestamp")', create_table)
+        self.assertIn('ALTER SEQUENCE public.job_logs_id_seq OWNED BY "job_logs".id', statements)
+        # 原表覆盖到最新日志所在周期结束，当前周期已被覆盖，只预建下一周期
+        self.assertIn('ALTER TABLE "job_logs" ATTACH PARTITION "job_logs_legacy" '
+                      "FOR VALUES FROM (MINVALUE) TO ('2024-06-01 00:00:00')", statements)
+        self.assertTrue(statements[-1].startswith('CREATE TABLE IF NOT EXISTS "job_logs_p202406"'))
+
+    def test_convert_skips_partitioned_and_missing(self):
+        self.relkind = "p"
+        self.assertFalse(self.partitioning.convert(self.db)["converted"])
+        self.relkind = None
+        with self.assertRaises(ValueError):
+            self.partitioning.convert(self.db)
+        self.assertEqual(self.db.statements, [])
+
+    def test_unconvert(self):
+        self.assertFalse(self.partitioning.unconvert(self.db))
+        self.relkind = "p"
+        self.columns.append("output_ref")
+        self.assertTrue(self.partitioning.unconvert(self.db))
+
+        statements = self.db.statements
+        self.assertIn("CREATE TABLE job_logs_plain", statements[0])
+        # 未命名的主键由 PostgreSQL 命名为 job_logs_plain_pkey，改名后恢复为 job_logs_pkey
+        self.assertIn("PRIMARY KEY (id)", statements[0])
+        self.assertNotIn("PARTITION BY", statements[0])
+        columns = ", ".join(f'"{name}"' for name in self.columns)
+        self.assertEqual(statements[1:6], [
+            f'INSERT INTO "job_logs_plain" ({columns}) SELECT {columns} FROM "job_logs"',
+            "ALTER SEQUENCE public.job_logs_id_seq OWNED BY NONE",
+            'DROP TABLE "job_logs" CASCADE',
+            'ALTER TABLE "job_logs_plain" RENAME TO "job_logs"',
+            'ALTER INDEX "job_logs_plain_pkey" RENAME TO "job_logs_pkey"',
+        ])
+        self.assertEqual(len([sql for sql in statements if sql.startswith("CREATE INDEX")]),
+                         len(JobLog.__table__.indexes))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import json
+import threading
+import time
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED
+
+from app.services.remote_executor import RedisQueueExecutor, RemoteJobError, encode_run, execute_run
+from app.worker import Worker
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+RUN_TIME = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def _job(job_id="job", func_ref="operator:add", args=(2, 3)):
+    return SimpleNamespace(id=job_id, _jobstore_alias="default", func=object(), func_ref=func_ref, args=args,
+                           kwargs={}, misfire_grace_time=None, max_instances=1)
+
+
+def _wait(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class EncodeRunTest(unittest.TestCase):
+    def test_round_trip(self):
+        message = encode_run(_job(), [RUN_TIME], "replies", "run-1")
+        payload = json.loads(message["payload"])
+        self.assertEqual((payload["job_id"], payload["task"], payload["reply_to"]), ("job", None, "replies"))
+
+        result = execute_run(payload, lambda name: None)
+        self.assertEqual((result["run_id"], result["job_id"]), ("run-1", "job"))
+        [event] = result["events"]
+        self.assertEqual((event["code"], event["retval"], event["exception"]), (EVENT_JOB_EXECUTED, 5, None))
+        self.assertEqual(event["scheduled_run_time"], RUN_TIME.isoformat())
+
+    def test_registered_task_and_error(self):
+        payload = json.loads(encode_run(_job(func_ref="operator:truediv", args=(1, 0)), [RUN_TIME], "r", "run-2")["payload"])
+        [event] = execute_run(payload, lambda name: None)["events"]
+        self.assertEqual((event["code"], event["exc_type"]), (EVENT_JOB_ERROR, "ZeroDivisionError"))
+        self.assertIn("job.func", event["traceback"])
+
+        # 任务名能在 worker 的注册表中找到时优先使用注册的函数
+        payload["task"] = "double"
+        [event] = execute_run(payload, {"double": lambda a, b: a * 2}.get)["events"]
+        self.assertEqual(event["retval"], 2)
+
+
+@unittest.skipIf(fakeredis is None, "需要 fakeredis")
+class RedisQueueExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self.server = fakeredis.FakeServer()
+        self.events = []
+        self.scheduler = mock.Mock(_create_lock=threading.RLock, _dispatch_event=self.events.append)
+
+    def _client(self):
+        return fakeredis.FakeRedis(server=self.server)
+
+    def _executor(self, **kwargs):
+        executor = RedisQueueExecutor(self._client, stream="test:runs", group="workers", **kwargs)
+        executor.start(self.scheduler, "remote")
+        self.addCleanup(executor.shutdown)
+        return executor
+
+    def _worker(self, **kwargs):
+        worker = Worker(self._client(), "test:runs", "workers", concurrency=2, consumer="worker-1", **kwargs)
+        thread = threading.Thread(target=worker.run, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(worker.stop)
+        return worker
+
+    def test_results_become_job_events(self):
+        executor = self._executor()
+        self._worker()
+        executor.submit_job(_job("ok"), [RUN_TIME])
+        executor.submit_job(_job("fail", func_ref="operator:truediv", args=(1, 0)), [RUN_TIME])
+
+        self.assertTrue(_wait(lambda: len(self.events) == 2))
+        events = {event.job_id: event for event in self.events}
+        self.assertEqual((events["ok"].code, events["ok"].retval, events["ok"].jobstore), (EVENT_JOB_EXECUTED, 5, "default"))
+        self.assertEqual(events["ok"].scheduled_run_time, RUN_TIME)
+        self.assertEqual(events["fail"].code, EVENT_JOB_ERROR)
+        self.assertIsInstance(events["fail"].exception, RemoteJobError)
+        self.assertEqual(events["fail"].exception.exc_type, "ZeroDivisionError")
+
+        stats = executor.stats()
+        self.assertEqual((stats["submitted"], stats["completed"], stats["in_flight"]), (2, 2, 0))
+        # max_instances 占用随结果释放
+        self.assertEqual(executor._instances["ok"], 0)
+        # worker 确认并删除已处理的消息
+        client = self._client()
+        self.assertTrue(_wait(lambda: client.xlen("test:runs") == 0))
+        self.assertEqual(client.xpending("test:runs", "workers")["pending"], 0)
+
+    def test_pending_run_times_out(self):
+        executor = self._executor(result_timeout=0.05)
+        executor.submit_job(_job("lost"), [RUN_TIME])
+
+        self.assertTrue(_wait(lambda: self.events))
+        [event] = self.events
+        self.assertEqual((event.code, event.job_id), (EVENT_JOB_ERROR, "lost"))
+        self.assertEqual(event.exception.exc_type, "TimeoutError")
+        self.assertEqual(executor.stats()["timed_out"], 1)
+        self.assertEqual(executor._instances["lost"], 0)
+
+        # 超时后才到达的结果被忽略，不再分发事件
+        run_id = json.loads(self._client().xrange("test:runs")[0][1][b"payload"])["run_id"]
+        self._client().xadd(executor.reply_stream, {"payload": json.dumps(
+            {"run_id": run_id, "job_id": "lost", "events": []})})
+        self.assertTrue(_wait(lambda: self._client().xlen(executor.reply_stream) == 0))
+        self.assertEqual(len(self.events), 1)
+        self.assertEqual(executor.stats()["completed"], 0)
+
+
+@unittest.skipIf(fakeredis is None, "需要 fakeredis")
+class WorkerTest(unittest.TestCase):
+    def setUp(self):
+        self.client = fakeredis.FakeRedis()
+        self.client.xgroup_create("test:runs", "workers", id="0", mkstream=True)
+
+    def _submit(self, job_id, run_id):
+        self.client.xadd("test:runs", encode_run(_job(job_id), [RUN_TIME], "test:replies", run_id))
+
+    def _run(self, worker):
+        """运行 worker 直到任务队列中的消息全部确认删除"""
+        thread = threading.Thread(target=worker.run, daemon=True)
+        thread.start()
+        try:
+            return _wait(lambda: self.client.xlen("test:runs") == 0)
+        finally:
+            worker.stop()
+            thread.join(5)
+
+    def _replies(self):
+        return sorted(json.loads(fields[b"payload"])["run_id"] for _, fields in self.client.xrange("test:replies"))
+
+    def test_reads_executes_and_acks(self):
+        for i in range(3):
+            self._submit(f"job-{i}", f"run-{i}")
+        self.client.xadd("test:runs", {"payload": "not json"})
+
+        worker = Worker(self.client, "test:runs", "workers", concurrency=2, consumer="worker-1")
+        # 无法解析的消息同样确认删除，不会被反复接管
+        self.assertTrue(self._run(worker))
+        self.assertEqual(self._replies(), ["run-0", "run-1", "run-2"])
+        self.assertEqual(self.client.xpending("test:runs", "workers")["pending"], 0)
+
+    def test_claims_stale_messages(self):
+        self._submit("orphan", "run-orphan")
+        # 另一个 worker 读取后崩溃，消息停留在其待确认列表中
+        self.client.xreadgroup("workers", "crashed", {"test:runs": ">"}, count=1)
+        self.assertEqual(self.client.xpending("test:runs", "workers")["pending"], 1)
+
+        time.sleep(0.05)
+        worker = Worker(self.client, "test:runs", "workers", concurrency=1, claim_idle=0.01, consumer="worker-2")
+        self.assertTrue(self._run(worker))
+        self.assertEqual(self._replies(), ["run-orphan"])
+        self.assertEqual(self.client.xpending("test:runs", "workers")["pending"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,190 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core import replicas as replicas_module
+from app.core.database import async_database_url, create_async_db_engine, create_sqlite_engine
+from app.core.replicas import ReplicaSet, is_read_only, routing_session_class, use_primary
+from app.models.sql_model import JobLog
+
+try:
+    import aiosqlite
+except ImportError:
+    aiosqlite = None
+
+
+def _count_logs(session):
+    return session.execute(select(func.count()).select_from(JobLog)).scalar()
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ReplicaTestCase(unittest.TestCase):
+    """主库 3 条日志，每个副本的日志条数不同，由查询结果判断语句发往哪个库"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.primary = self._database("primary", 3)
+        self.clock = _Clock()
+        patch = mock.patch.object(replicas_module.time, "monotonic", self.clock)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def _url(self, name, driver="sqlite"):
+        return f"{driver}:///{os.path.join(self.directory, name, 'test.db')}"
+
+    def _database(self, name, rows):
+        os.makedirs(os.path.join(self.directory, name), exist_ok=True)
+        engine = create_sqlite_engine(self._url(name))
+        self.addCleanup(engine.dispose)
+        JobLog.__table__.create(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(JobLog), [{"job_id": name, "status": True, "message": "ok",
+                                           "timestamp": datetime(2024, 1, 1)} for _ in range(rows)])
+        return engine
+
+    def _offline(self, name):
+        """所在目录不存在，建立连接时失败"""
+        engine = create_sqlite_engine(self._url(name))
+        self.addCleanup(engine.dispose)
+        return engine
+
+    def _session(self, replica_set):
+        return routing_session_class(self.primary, replica_set)(autoflush=False)
+
+
+class RoutingSessionTest(ReplicaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.replicas = ReplicaSet([self._database("replica-a", 1), self._database("replica-b", 2)], retry_after=30)
+
+    def test_reads_use_one_replica_per_session(self):
+        counts = []
+        for _ in range(3):
+            with self._session(self.replicas) as db:
+                # 同一会话内的查询固定使用同一个副本
+                counts.append((_count_logs(db), _count_logs(db)))
+        self.assertEqual(counts, [(1, 1), (2, 2), (1, 1)])
+        self.assertEqual(self.replicas.stats()["replica_sessions"], 3)
+
+    def test_writes_and_locking_reads_use_primary(self):
+        with self._session(self.replicas) as db:
+            self.assertEqual(_count_logs(db), 1)
+            db.add(JobLog(job_id="new", status=True, message="ok", timestamp=datetime(2024, 1, 2)))
+            db.flush()
+            # 写入后的查询发往主库，读到刚写入的数据
+            self.assertEqual(_count_logs(db), 4)
+            db.rollback()
+
+        with self._session(self.replicas) as db:
+            self.assertEqual(len(db.execute(select(JobLog.id).with_for_update()).all()), 3)
+            self.assertEqual(_count_logs(db), 3)
+
+    def test_use_primary(self):
+        with self._session(self.replicas) as db:
+            use_primary(db)
+            self.assertEqual(_count_logs(db), 3)
+        self.assertEqual(self.replicas.stats()["replica_sessions"], 0)
+
+    def test_is_read_only(self):
+        self.assertTrue(is_read_only(select(JobLog)))
+        self.assertTrue(is_read_only(text("  select 1")))
+        self.assertFalse(is_read_only(select(JobLog).with_for_update()))
+        self.assertFalse(is_read_only(text("DELETE FROM job_logs")))
+        self.assertFalse(is_read_only(insert(JobLog)))
+
+
+class ReplicaFailoverTest(ReplicaTestCase):
+    def test_unreachable_replica_falls_back_to_primary(self):
+        replicas = ReplicaSet([self._offline("replica")], retry_after=30)
+        with self._session(replicas) as db:
+            self.assertEqual(_count_logs(db), 3)
+        stats = replicas.stats()
+        self.assertEqual((stats["failures"], stats["primary_sessions"], stats["replica_sessions"]), (1, 1, 0))
+        self.assertEqual(stats["down"], [self._url("replica")])
+
+        # 恢复后在 retry_after 秒内仍使用主库，之后重新使用副本
+        self._database("replica", 1)
+        self.clock.now += 29
+        with self._session(replicas) as db:
+            self.assertEqual(_count_logs(db), 3)
+        self.assertEqual(replicas.stats()["failures"], 1)
+        self.clock.now += 2
+        with self._session(replicas) as db:
+            self.assertEqual(_count_logs(db), 1)
+        self.assertEqual(replicas.stats()["down"], [])
+
+    def test_skips_down_replica(self):
+        replicas = ReplicaSet([self._offline("replica-a"), self._database("replica-b", 2)], retry_after=30)
+        for _ in range(3):
+            with self._session(replicas) as db:
+                self.assertEqual(_count_logs(db), 2)
+        stats = replicas.stats()
+        self.assertEqual((stats["failures"], stats["replica_sessions"], stats["primary_sessions"]), (1, 3, 0))
+
+    def test_disconnect_during_query_marks_replica_down(self):
+        replica = self._database("replica", 1)
+        replicas = ReplicaSet([replica], retry_after=30)
+        with mock.patch.object(replica.dialect, "is_disconnect", return_value=True):
+            with self.assertRaises(Exception), replica.connect() as conn:
+                conn.execute(text("SELECT * FROM missing_table"))
+        self.assertEqual(replicas.stats()["down"], [self._url("replica")])
+        with self._session(replicas) as db:
+            self.assertEqual(_count_logs(db), 3)
+
+
+@unittest.skipIf(aiosqlite is None, "需要 aiosqlite")
+class AsyncRoutingSessionTest(ReplicaTestCase):
+    def _run(self, replica_names):
+        async def run():
+            async_primary = create_async_db_engine(async_database_url(self._url("primary")))
+            async_replicas = [create_async_db_engine(self._url(name, "sqlite+aiosqlite")) for name in replica_names]
+            replica_set = ReplicaSet([replica.sync_engine for replica in async_replicas], retry_after=30)
+            factory = async_sessionmaker(
+                async_primary, sync_session_class=routing_session_class(async_primary.sync_engine, replica_set),
+                autoflush=False, expire_on_commit=False)
+            try:
+                counts = []
+                for _ in replica_names:
+                    async with factory() as db:
+                        counts.append(await db.run_sync(_count_logs))
+                async with factory() as db:
+                    use_primary(db)
+                    counts.append(await db.run_sync(_count_logs))
+                return counts, replica_set.stats()
+            finally:
+                for engine in (async_primary, *async_replicas):
+                    await engine.dispose()
+
+        return asyncio.run(run())
+
+    def test_async_reads_use_replicas(self):
+        self._database("replica-a", 1)
+        self._database("replica-b", 2)
+        counts, stats = self._run(["replica-a", "replica-b"])
+        self.assertEqual(counts, [1, 2, 3])
+        self.assertEqual(stats["replica_sessions"], 2)
+
+    def test_async_unreachable_replica_falls_back_to_primary(self):
+        self._database("replica-b", 2)
+        counts, stats = self._run(["replica-a", "replica-b"])
+        self.assertEqual(counts, [2, 2, 3])
+        self.assertEqual((stats["failures"], stats["down"]), (1, [self._url("replica-a", "sqlite+aiosqlite")]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_SUBMITTED
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from app.services.run_metrics import RunMetrics, SubmitTimingMixin, percentile
+
+JOBSTORE_UPDATE_DELAY = 0.3
+
+
+class _SlowJobStore(MemoryJobStore):
+    """写回下次执行时间很慢的 jobstore，EVENT_JOB_SUBMITTED 会晚于任务结束"""
+
+    def update_job(self, job):
+        time.sleep(JOBSTORE_UPDATE_DELAY)
+        super().update_job(job)
+
+
+class _Executor(SubmitTimingMixin, ThreadPoolExecutor):
+    pass
+
+
+def _quick_job():
+    return {"started_at": time.time()}
+
+
+class RunMetricsTest(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7.0], 95), 7.0)
+        self.assertIsNone(percentile([], 50))
+
+    def test_latencies(self):
+        metrics = RunMetrics()
+        scheduled = datetime(2024, 1, 1, 12, 0, 0)
+        base = scheduled.timestamp()
+        metrics.submitted("job", [scheduled], submitted_at=base + 0.1)
+        self.assertEqual(metrics.summary()["in_flight"], 1)
+        record = metrics.finished("job", scheduled, True, started_at=base + 0.3, finished_at=base + 1.3)
+        self.assertAlmostEqual(record["schedule_lag_ms"], 100, places=1)
+        self.assertAlmostEqual(record["queue_wait_ms"], 200, places=1)
+        self.assertAlmostEqual(record["run_ms"], 1000, places=1)
+        self.assertAlmostEqual(record["total_ms"], 1300, places=1)
+        self.assertEqual(metrics.summary()["in_flight"], 0)
+
+    def test_late_submitted_after_finish_is_dropped(self):
+        metrics = RunMetrics()
+        scheduled = datetime(2024, 1, 1)
+        metrics.finished("job", scheduled, True, started_at=scheduled.timestamp())
+        metrics.submitted("job", [scheduled])
+        self.assertEqual(metrics.summary()["in_flight"], 0)
+        self.assertEqual(metrics.job_summary("job")["in_flight"], 0)
+
+    def test_discard(self):
+        metrics = RunMetrics()
+        scheduled = datetime(2024, 1, 1)
+        metrics.submitted("job", [scheduled])
+        metrics.discard("job", scheduled)
+        self.assertEqual(metrics.summary()["in_flight"], 0)
+
+    def test_job_faster_than_jobstore_update(self):
+        metrics = RunMetrics()
+        records, submitted_events = [], []
+        done = threading.Event()
+
+        def listener(event):
+            if event.code == EVENT_JOB_SUBMITTED:
+                submitted_events.append(time.time())
+                # 与 job_listener 迟到的提交事件相同，不应产生进行中的运行
+                metrics.submitted(event.job_id, event.scheduled_run_times)
+                if records:
+                    done.set()
+                return
+            record = metrics.finished(event.job_id, event.scheduled_run_time, event.exception is None,
+                                      event.retval["started_at"] if event.retval else None)
+            records.append(record)
+            if submitted_events:
+                done.set()
+
+        scheduler = BackgroundScheduler(jobstores={"default": _SlowJobStore()},
+                                        executors={"default": _Executor(4, run_metrics=metrics)})
+        scheduler.add_listener(listener, EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+        scheduler.start()
+        try:
+            scheduler.add_job(_quick_job, "interval", seconds=60, id="quick",
+                              next_run_time=datetime.now() + timedelta(milliseconds=50))
+            self.assertTrue(done.wait(5))
+        finally:
+            scheduler.shutdown(wait=True)
+
+        record = records[0]
+        # 任务在 jobstore 写回之前已经结束
+        self.assertLess(record["finished_at"], submitted_events[0])
+        self.assertIsNotNone(record["submitted_at"])
+        self.assertLessEqual(record["submitted_at"], record["started_at"])
+        self.assertLess(record["queue_wait_ms"], JOBSTORE_UPDATE_DELAY * 1000)
+        self.assertLess(record["schedule_lag_ms"], JOBSTORE_UPDATE_DELAY * 1000)
+        self.assertEqual(metrics.summary()["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
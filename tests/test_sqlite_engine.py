@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import text
+
+from app.core import conf
+from app.core.database import create_db_engine, create_sqlite_engine
+
+
+class SqliteEngineTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.url = f"sqlite:///{os.path.join(directory.name, 'test.db')}"
+
+    def _pragmas(self, engine, *names):
+        self.addCleanup(engine.dispose)
+        with engine.connect() as conn:
+            return {name: conn.execute(text(f"PRAGMA {name}")).scalar() for name in names}
+
+    def test_tuned_pragmas(self):
+        pragmas = self._pragmas(create_sqlite_engine(self.url, tuned=True), "journal_mode", "synchronous",
+                                "busy_timeout", "cache_size", "temp_store", "foreign_keys")
+        self.assertEqual(pragmas, {
+            "journal_mode": "wal",
+            "synchronous": 1,  # NORMAL
+            "busy_timeout": conf.SQLITE_BUSY_TIMEOUT,
+            "cache_size": conf.SQLITE_CACHE_SIZE,
+            "temp_store": 2,  # MEMORY
+            "foreign_keys": 1,
+        })
+
+    def test_mmap_size(self):
+        mmap_size = self._pragmas(create_sqlite_engine(self.url, tuned=True), "mmap_size")["mmap_size"]
+        # 编译时禁用 mmap 的 SQLite 不返回结果
+        if mmap_size is None:
+            self.skipTest("SQLite 未启用 mmap")
+        self.assertEqual(mmap_size, conf.SQLITE_MMAP_SIZE)
+
+    def test_untuned_keeps_defaults(self):
+        pragmas = self._pragmas(create_sqlite_engine(self.url, tuned=False), "journal_mode", "synchronous",
+                                "foreign_keys")
+        self.assertEqual(pragmas, {"journal_mode": "delete", "synchronous": 2, "foreign_keys": 1})
+
+    def test_every_pooled_connection(self):
+        engine = create_sqlite_engine(self.url, tuned=True, pool_size=2, max_overflow=0)
+        self.addCleanup(engine.dispose)
+        # 每个新建连接都执行 PRAGMA（busy_timeout 等是连接级设置，不写入数据库文件）
+        with engine.connect() as first, engine.connect() as second:
+            for conn in (first, second):
+                self.assertEqual(conn.execute(text("PRAGMA busy_timeout")).scalar(), conf.SQLITE_BUSY_TIMEOUT)
+        self.assertEqual(engine.pool.checkedin(), 2)
+
+    def test_create_db_engine_uses_sqlite_settings(self):
+        engine = create_db_engine(self.url)
+        self.assertEqual(self._pragmas(engine, "foreign_keys")["foreign_keys"], 1)
+        self.assertEqual(engine.pool.size(), conf.DB_POOL_SIZE)
+        self.assertTrue(engine.pool._pre_ping)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import asyncio
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services import tasks
+from app.services.tasks import OutputCapture, task
+
+
+@task(category="test", name="_test_sync_output")
+def sync_output(marker: str, lines: int = 50):
+    for i in range(lines):
+        print(f"{marker}-{i}")
+        if i % 10 == 0:
+            threading.Event().wait(0.001)
+
+
+@task(category="test", name="_test_async_output")
+async def async_output(marker: str, lines: int = 50):
+    for i in range(lines):
+        print(f"{marker}-{i}")
+        if i % 10 == 0:
+            await asyncio.sleep(0.001)
+
+
+def _expected(marker: str, lines: int = 50) -> str:
+    return "".join(f"{marker}-{i}\n" for i in range(lines))
+
+
+class TaskOutputTest(unittest.TestCase):
+    def test_stdout_not_swapped_per_run(self):
+        tasks.install_output_routing()
+        stdout, stderr = sys.stdout, sys.stderr
+        self.assertIsInstance(stdout, tasks._ContextStream)
+        sync_output("s")
+        asyncio.run(async_output("a"))
+        self.assertIs(sys.stdout, stdout)
+        self.assertIs(sys.stderr, stderr)
+
+    def test_concurrent_sync_and_async_capture(self):
+        async def run_async():
+            return await asyncio.gather(*(async_output(f"async{n}") for n in range(5)))
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        with ThreadPoolExecutor(6) as pool:
+            sync_futures = [pool.submit(sync_output, f"sync{n}") for n in range(5)]
+            async_future = pool.submit(loop.run_until_complete, run_async())
+            sync_results = [future.result() for future in sync_futures]
+            async_results = async_future.result()
+
+        for n, result in enumerate(sync_results):
+            self.assertEqual(result["output"], _expected(f"sync{n}"))
+        for n, result in enumerate(async_results):
+            self.assertEqual(result["output"], _expected(f"async{n}"))
+
+    def test_nested_capture_and_stderr(self):
+        with OutputCapture() as outer:
+            print("outer")
+            with OutputCapture() as inner:
+                print("inner")
+                print("err", file=sys.stderr)
+            print("outer again")
+        self.assertEqual(outer.get_output(), "outer\nouter again\n")
+        self.assertEqual(inner.get_output(), "inner\n")
+        self.assertEqual(inner.get_error(), "err\n")
+
+    def test_run_python_command(self):
+        result = tasks.run_python_command("print('hi')")
+        self.assertEqual(result["output"], "hi\n")
+        self.assertTrue(result["status"])
+
+
+if __name__ == "__main__":
+    unittest.main()